@@ -0,0 +1,64 @@
+import sys
+
+import psycopg2
+
+# Recalcula desde cero la tabla EstadisticaValoracion a partir de Valoracion + Paquete.
+# Se usa una vez tras aplicar la migración 002 (o para reparar los agregados si se tocan
+# las valoraciones a mano). Es idempotente.
+
+BACKFILL_SQL = """
+    DELETE FROM EstadisticaValoracion;
+    INSERT INTO EstadisticaValoracion (
+        id_mensajero, num_valoraciones, suma_puntuacion,
+        estrellas_1, estrellas_2, estrellas_3, estrellas_4, estrellas_5,
+        fecha_ultima_valoracion
+    )
+    SELECT
+        p.id_mensajero,
+        COUNT(*),
+        SUM(v.puntuacion),
+        COUNT(*) FILTER (WHERE v.puntuacion = 1),
+        COUNT(*) FILTER (WHERE v.puntuacion = 2),
+        COUNT(*) FILTER (WHERE v.puntuacion = 3),
+        COUNT(*) FILTER (WHERE v.puntuacion = 4),
+        COUNT(*) FILTER (WHERE v.puntuacion = 5),
+        MAX(v.fecha)
+    FROM Valoracion v
+    JOIN Paquete p ON v.id_paquete = p.id
+    WHERE p.id_mensajero IS NOT NULL
+    GROUP BY p.id_mensajero;
+"""
+
+
+def backfill_rating_stats(conn) -> int:
+    """Rellena EstadisticaValoracion en una transacción. Devuelve el nº de mensajeros."""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(BACKFILL_SQL)
+            rows = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+
+def main():
+    from init_db_postgres import DB_HOST, DB_NAME, DB_USER, DB_PASS, DB_PORT
+
+    print("--- RECALCULANDO ESTADÍSTICAS DE VALORACIONES (MOVAL) ---")
+    try:
+        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT)
+    except Exception as e:
+        print(f"ERROR DE CONEXIÓN: {e}")
+        sys.exit(1)
+
+    try:
+        rows = backfill_rating_stats(conn)
+        print(f" > Estadísticas recalculadas para {rows} mensajeros.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import os
+import sys
+import time
+
+import psycopg2
+import psycopg2.extras
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(CURRENT_DIR)
+sys.path.append(os.path.join(CURRENT_DIR, '..', 'src'))
+
+from seed_large_dataset import seed, bench_conn_info
+from moval.persistence.repositories import CourierRepo
+
+# Benchmark + regresión del informe de repartidores (pestaña "Repartidores" del admin).
+# Compara la consulta original (subconsultas correlacionadas) con CourierRepo.list_all_with_workday_info
+# sobre 1k mensajeros y 1M de valoraciones, y comprueba que devuelven exactamente lo mismo.
+
+LEGACY_QUERY = """
+    SELECT 
+        u.id, u.nombre, u.apellidos, u.email,
+        j.fecha_inicio,
+        j.fecha_fin,
+        j.estado as estado_jornada,
+        (SELECT AVG(puntuacion) FROM Valoracion v 
+        JOIN Paquete p ON v.id_paquete = p.id 
+        WHERE p.id_mensajero = u.id) as media
+    FROM Usuario u
+    LEFT JOIN (
+        SELECT id, id_mensajero, fecha_inicio, fecha_fin, estado
+        FROM Jornada j1
+        WHERE id = (SELECT MAX(id) FROM Jornada j2 WHERE j2.id_mensajero = j1.id_mensajero)
+    ) j ON u.id = j.id_mensajero
+    WHERE u.rol = 'COURIER'
+"""
+
+REPEAT = 3
+
+
+def run_legacy(conn_info):
+    conn = psycopg2.connect(**conn_info)
+    try:
+        with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+            cursor.execute(LEGACY_QUERY)
+            return [dict(row) for row in cursor.fetchall()]
+    finally:
+        conn.close()
+
+
+def normalize(rows):
+    out = []
+    for r in sorted(rows, key=lambda r: r["id"]):
+        r = dict(r)
+        r["media"] = round(float(r["media"]), 6) if r["media"] is not None else None
+        out.append(r)
+    return out
+
+
+def timed(fn):
+    best = None
+    result = None
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    if "--no-seed" in sys.argv:
+        conn_info = bench_conn_info()
+    else:
+        conn_info = seed(couriers=1000, customers=50000, shipments=1100000, ratings=1000000)
+
+    repo = CourierRepo(conn_info)
+
+    print("--- INFORME DE REPARTIDORES (1k mensajeros, 1M valoraciones) ---")
+    legacy_time, legacy_rows = timed(lambda: run_legacy(conn_info))
+    new_time, new_rows = timed(repo.list_all_with_workday_info)
+
+    print(f" > Consulta original:  {legacy_time * 1000:10.1f} ms ({len(legacy_rows)} filas)")
+    print(f" > Consulta nueva:     {new_time * 1000:10.1f} ms ({len(new_rows)} filas)")
+    if new_time > 0:
+        print(f" > Mejora: x{legacy_time / new_time:.1f}")
+
+    if normalize(legacy_rows) != normalize(new_rows):
+        print("\nERROR: los resultados de la consulta nueva no coinciden con los de la original")
+        sys.exit(1)
+    print("\nRegresión OK: ambos informes son idénticos.")
+
+
+if __name__ == "__main__":
+    main()
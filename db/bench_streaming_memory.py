@@ -0,0 +1,98 @@
+import os
+import subprocess
+import sys
+import time
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(CURRENT_DIR)
+sys.path.append(os.path.join(CURRENT_DIR, '..', 'src'))
+
+# Benchmark de memoria: pico de RSS al recorrer ~1M de filas con los listados actuales
+# (fetchall + lista de dicts) frente a las variantes en streaming (cursor del lado del servidor).
+# Cada medición se hace en un subproceso aparte para que los picos no se mezclen.
+#
+#   python db/bench_streaming_memory.py            -> siembra moval_bench y mide
+#   python db/bench_streaming_memory.py --no-seed  -> reutiliza los datos ya sembrados
+
+CASES = {
+    "shipments": ("ShipmentRepo", "list_all", "iter_all", ()),
+    "ratings": ("RatingRepo", "list_all", "iter_all", ()),
+    "customers": ("UserRepo", "list_by_role", "iter_by_role", ("CUSTOMER",)),
+}
+
+
+def peak_rss_mb() -> float:
+    """Pico de memoria residente del proceso actual, en MB."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux lo da en KB, macOS en bytes
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024 * 1024)
+
+
+def run_case(case: str, mode: str) -> None:
+    """Se ejecuta en el subproceso: recorre el listado y escribe 'filas segundos mb'."""
+    from seed_large_dataset import bench_conn_info
+    import moval.persistence.repositories as repositories
+
+    repo_name, list_method, iter_method, args = CASES[case]
+    repo = getattr(repositories, repo_name)(bench_conn_info())
+    baseline = peak_rss_mb()
+
+    started = time.perf_counter()
+    rows = 0
+    if mode == "list":
+        for _ in getattr(repo, list_method)(*args):
+            rows += 1
+    else:
+        for _ in getattr(repo, iter_method)(*args):
+            rows += 1
+    elapsed = time.perf_counter() - started
+
+    print(f"{rows} {elapsed:.3f} {peak_rss_mb() - baseline:.1f}")
+
+
+def measure(case: str, mode: str) -> tuple:
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--run", case, mode],
+        check=True, capture_output=True, text=True
+    ).stdout.split()
+    return int(out[0]), float(out[1]), float(out[2])
+
+
+def main():
+    if "--run" in sys.argv:
+        i = sys.argv.index("--run")
+        run_case(sys.argv[i + 1], sys.argv[i + 2])
+        return
+
+    if "--no-seed" not in sys.argv:
+        from seed_large_dataset import seed
+        seed(couriers=1000, customers=1000000, shipments=1000000, ratings=900000)
+
+    print("--- PICO DE MEMORIA: LISTADO COMPLETO vs STREAMING ---")
+    print(f"{'listado':<10} {'modo':<8} {'filas':>9} {'tiempo':>9} {'pico RSS':>10}")
+    for case in CASES:
+        for mode in ("list", "iter"):
+            rows, elapsed, peak = measure(case, mode)
+            print(f"{case:<10} {mode:<8} {rows:>9} {elapsed:>8.2f}s {peak:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import os
+import sys
+
+import psycopg2
+import psycopg2.extensions
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(CURRENT_DIR)
+sys.path.append(os.path.join(CURRENT_DIR, '..', 'src'))
+
+from seed_large_dataset import seed, bench_conn_info
+from moval.domain.enums import ShipmentStatus
+from moval.persistence.repositories import UserRepo, ShipmentRepo, CourierRepo, WorkdayRepo, RatingRepo, IncidentRepo
+
+# Comprueba con EXPLAIN que las consultas REALES de los repositorios usan índices sobre un
+# conjunto de datos grande. En lugar de copiar el SQL aquí, se ejecutan los métodos de los
+# repositorios con una conexión que antepone "EXPLAIN (FORMAT JSON)" a cada sentencia
+# (EXPLAIN sin ANALYZE no ejecuta nada, ni siquiera los UPDATE).
+
+INDEX_NODES = {"Index Scan", "Index Only Scan", "Bitmap Index Scan"}
+
+
+class ExplainCollector:
+    plans = []
+
+
+def _explain_cursor_class(base):
+    class ExplainCursor(base):
+        def execute(self, query, vars=None):
+            super().execute("EXPLAIN (FORMAT JSON) " + query, vars)
+            plan = self.fetchone()[0]
+            ExplainCollector.plans.append((query, plan[0]["Plan"]))
+            # Se repite el EXPLAIN para que el repositorio pueda hacer su fetch normalmente
+            super().execute("EXPLAIN (FORMAT JSON) " + query, vars)
+    return ExplainCursor
+
+
+class ExplainConnection(psycopg2.extensions.connection):
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get("cursor_factory") or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = _explain_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+
+def walk(plan):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from walk(child)
+
+
+def check(label, call):
+    """Ejecuta `call` capturando sus planes; falla si algún nodo hace Seq Scan."""
+    ExplainCollector.plans = []
+    call()
+    ok = bool(ExplainCollector.plans)
+    for query, plan in ExplainCollector.plans:
+        nodes = list(walk(plan))
+        seq = [n.get("Relation Name") for n in nodes if n["Node Type"] == "Seq Scan"]
+        idx = [n.get("Index Name") for n in nodes if n["Node Type"] in INDEX_NODES]
+        if seq or not idx:
+            ok = False
+            print(f"   [FALLO] {label}: seq scan en {seq or '-'}, índices {idx or '-'}")
+            print("           " + " ".join(query.split())[:200])
+        else:
+            print(f"   [OK]    {label}: {', '.join(sorted(set(idx)))}")
+    return ok
+
+
+def main():
+    if "--no-seed" in sys.argv:
+        conn_info = bench_conn_info()
+    else:
+        conn_info = seed()
+
+    conn_info = dict(conn_info, connection_factory=ExplainConnection)
+    users = UserRepo(conn_info)
+    shipments = ShipmentRepo(conn_info)
+    couriers = CourierRepo(conn_info)
+    workdays = WorkdayRepo(conn_info)
+    ratings = RatingRepo(conn_info)
+    incidents = IncidentRepo(conn_info)
+
+    courier_id, customer_id, shipment_id = 2, 2000, 5000
+
+    checks = [
+        ("UserRepo.get_by_email", lambda: users.get_by_email("u10@bench.moval")),
+        ("UserRepo.get", lambda: users.get(10)),
+        ("UserRepo.list_by_role(COURIER)", lambda: users.list_by_role("COURIER")),
+        ("ShipmentRepo.get", lambda: shipments.get(shipment_id)),
+        ("ShipmentRepo.get_many", lambda: shipments.get_many([1, 2, 3, shipment_id])),
+        ("ShipmentRepo.list_pending", lambda: shipments.list_pending()),
+        ("ShipmentRepo.list_all (página por estado)", lambda: shipments.list_all(
+            page_size=50, after_id=250000, descending=True, statuses=[ShipmentStatus.PENDING.value])),
+        ("ShipmentRepo.list_by_courier (página)", lambda: shipments.list_by_courier(courier_id, page_size=50, descending=True)),
+        ("ShipmentRepo.list_by_customer", lambda: shipments.list_by_customer(customer_id)),
+        ("ShipmentRepo.count_by_courier", lambda: shipments.count_by_courier(courier_id, {"estado": ShipmentStatus.DELIVERED.value})),
+        ("ShipmentRepo.count_by_status(courier)", lambda: shipments.count_by_status(courier_id=courier_id)),
+        ("ShipmentRepo.count_by_status(customer)", lambda: shipments.count_by_status(customer_id=customer_id)),
+        ("ShipmentRepo.get_customer_notifications", lambda: shipments.get_customer_notifications(customer_id)),
+        ("ShipmentRepo.mark_notifications_as_read", lambda: shipments.mark_notifications_as_read(customer_id)),
+        ("ShipmentRepo.update", lambda: shipments.update(shipment_id, {"estado": ShipmentStatus.INCIDENT.value})),
+        ("ShipmentRepo.set_status", lambda: shipments.set_status(shipment_id, ShipmentStatus.DELIVERED)),
+        ("ShipmentRepo.unassign", lambda: shipments.unassign(shipment_id)),
+        ("CourierRepo.get", lambda: couriers.get(courier_id)),
+        ("CourierRepo.can_take_more", lambda: couriers.can_take_more(courier_id, 20)),
+        ("WorkdayRepo.get_active_workday", lambda: workdays.get_active_workday(courier_id)),
+        ("WorkdayRepo.get_by_id", lambda: workdays.get_by_id(10)),
+        ("RatingRepo.has_rating_for_shipment", lambda: ratings.has_rating_for_shipment(shipment_id, customer_id)),
+        ("RatingRepo.average_by_courier", lambda: ratings.average_by_courier(courier_id)),
+        ("IncidentRepo.get_latest_by_shipment", lambda: incidents.get_latest_by_shipment(50)),
+    ]
+
+    print("--- COMPROBANDO PLANES DE EJECUCIÓN ---")
+    failures = [label for label, call in checks if not check(label, call)]
+
+    if failures:
+        print(f"\n{len(failures)} consulta(s) sin índice: {', '.join(failures)}")
+        sys.exit(1)
+    print(f"\nTodas las consultas ({len(checks)}) usan índices.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import argparse
+import json
+import math
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.gazetteer import Gazetteer, write_csv
+from moval.services.route_service import RouteService
+
+# Importa el callejero de la zona de servicio desde una exportación GeoJSON de OpenStreetMap
+# (por ejemplo, de Overpass con portales `addr:*` y vías `highway` con nombre) al CSV que carga
+# Gazetteer. Solo se guardan los elementos a menos de --radio-km del almacén.
+#
+#   python db/import_gazetteer.py leon_osm.geojson
+#   python db/import_gazetteer.py leon_osm.geojson --radio-km 20 --ciudad León --salida otro.csv
+#
+# Consulta Overpass de ejemplo (exportar como GeoJSON):
+#   [out:json];
+#   ( nwr["addr:housenumber"](around:15000,42.6136,-5.5583);
+#     way["highway"]["name"](around:15000,42.6136,-5.5583); );
+#   out center;
+
+
+def distance_km(lat1, lon1, lat2, lon2) -> float:
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlon / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(a))
+
+
+def geometry_points(geometry: dict) -> list:
+    """Puntos (lat, lon) de una geometría GeoJSON: el punto, o los vértices de una línea/polígono."""
+    kind, coords = geometry.get("type"), geometry.get("coordinates")
+    if kind == "Point":
+        return [(coords[1], coords[0])]
+    if kind == "LineString":
+        return [(lat, lon) for lon, lat in coords]
+    if kind in ("Polygon", "MultiLineString"):
+        return [(lat, lon) for ring in coords for lon, lat in ring]
+    return []
+
+
+def osm_rows(features, default_city: str, center: tuple, radius_km: float):
+    """Filas del callejero: un portal por elemento con número y los vértices de cada vía con nombre."""
+    for feature in features:
+        tags = feature.get("properties") or {}
+        tags = tags.get("tags", tags)
+        points = geometry_points(feature.get("geometry") or {})
+        if not points:
+            continue
+        city = tags.get("addr:city") or default_city
+        if tags.get("addr:housenumber") and tags.get("addr:street"):
+            lat = sum(p[0] for p in points) / len(points)
+            lon = sum(p[1] for p in points) / len(points)
+            if distance_km(center[0], center[1], lat, lon) <= radius_km:
+                yield {"calle": tags["addr:street"], "numero": tags["addr:housenumber"],
+                       "cp": tags.get("addr:postcode", ""), "ciudad": city,
+                       "latitud": round(lat, 7), "longitud": round(lon, 7)}
+        elif tags.get("highway") and tags.get("name"):
+            for lat, lon in points:
+                if distance_km(center[0], center[1], lat, lon) <= radius_km:
+                    yield {"calle": tags["name"], "numero": "", "cp": tags.get("addr:postcode", ""),
+                           "ciudad": city, "latitud": round(lat, 7), "longitud": round(lon, 7)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Importa el callejero local desde GeoJSON de OpenStreetMap")
+    parser.add_argument("geojson")
+    parser.add_argument("--salida", default=Gazetteer.DEFAULT_PATH)
+    parser.add_argument("--ciudad", default="León", help="Ciudad para los elementos sin addr:city")
+    parser.add_argument("--radio-km", type=float, default=15.0)
+    args = parser.parse_args()
+
+    with open(args.geojson, encoding="utf-8") as f:
+        features = json.load(f).get("features", [])
+    center = (RouteService.WAREHOUSE_LAT, RouteService.WAREHOUSE_LON)
+    count = write_csv(osm_rows(features, args.ciudad, center, args.radio_km), args.salida)
+
+    gazetteer = Gazetteer.from_csv(args.salida)
+    stats = gazetteer.stats()
+    print(f" > {count} filas escritas en {args.salida}")
+    print(f" > {stats['streets']} calles, {stats['addresses']} portales con número")
+
+
+if __name__ == "__main__":
+    main()
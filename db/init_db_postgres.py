@@ -9,6 +9,8 @@ import random
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.moval.security.password_hasher import PasswordHasher
+from migrate import apply_migrations
+from backfill_rating_stats import backfill_rating_stats
 
 CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
 SQL_SCRIPT_PATH = os.path.join(CURRENT_DIR, "init_postgres.sql")
@@ -46,6 +48,7 @@ def init_db():
         cursor.execute(sql_script)
         conn.commit()
         print(" > Esquema de tablas creado.")
+        apply_migrations(conn)
     except Exception as e:
         print(f"ERROR EJECUTANDO SQL: {e}")
         conn.rollback()
@@ -203,6 +206,7 @@ def init_db():
         print(f" > {len(valoraciones)} Valoraciones generadas.")
 
     conn.commit()
+    backfill_rating_stats(conn)
     conn.close()
     print("\n--- DB POSTGRESQL LISTA PARA DEMO ---")
 
@@ -1,11 +1,13 @@
 -- db/init_postgres.sql
 
 -- Limpieza inicial (CASCADE permite borrar tablas aunque tengan relaciones)
+DROP TABLE IF EXISTS EstadisticaValoracion CASCADE;
 DROP TABLE IF EXISTS Valoracion CASCADE;
 DROP TABLE IF EXISTS Incidencia CASCADE;
 DROP TABLE IF EXISTS Jornada CASCADE;
 DROP TABLE IF EXISTS Paquete CASCADE;
 DROP TABLE IF EXISTS Usuario CASCADE;
+DROP TABLE IF EXISTS schema_migrations;
 
 -- 1. Tabla de Usuarios
 CREATE TABLE Usuario (
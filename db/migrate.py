@@ -0,0 +1,73 @@
+import os
+import sys
+
+import psycopg2
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(CURRENT_DIR, "migrations")
+
+# Las migraciones son ficheros NNN_descripcion.sql que se aplican en orden, una sola vez.
+# Las aplicadas se registran en la tabla schema_migrations.
+
+
+def list_migrations(migrations_dir: str = MIGRATIONS_DIR) -> list:
+    """Devuelve [(version, ruta)] ordenadas por versión."""
+    migrations = []
+    for name in sorted(os.listdir(migrations_dir)):
+        if name.endswith(".sql") and name[:3].isdigit():
+            migrations.append((name[:-4], os.path.join(migrations_dir, name)))
+    return migrations
+
+
+def apply_migrations(conn, migrations_dir: str = MIGRATIONS_DIR) -> list:
+    """Aplica las migraciones pendientes (cada una en su transacción). Devuelve las aplicadas."""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version TEXT PRIMARY KEY,
+                fecha_aplicacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cursor.execute("SELECT version FROM schema_migrations")
+        done = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+
+    applied = []
+    for version, path in list_migrations(migrations_dir):
+        if version in done:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            sql = f.read()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(sql)
+                cursor.execute("INSERT INTO schema_migrations (version) VALUES (%s)", (version,))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        print(f" > Migración aplicada: {version}")
+    return applied
+
+
+def main():
+    from init_db_postgres import DB_HOST, DB_NAME, DB_USER, DB_PASS, DB_PORT
+
+    print("--- APLICANDO MIGRACIONES (MOVAL) ---")
+    try:
+        conn = psycopg2.connect(host=DB_HOST, database=DB_NAME, user=DB_USER, password=DB_PASS, port=DB_PORT)
+    except Exception as e:
+        print(f"ERROR DE CONEXIÓN: {e}")
+        sys.exit(1)
+
+    try:
+        applied = apply_migrations(conn)
+        if not applied:
+            print(" > La base de datos ya está al día.")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+-- 001: Índices para los predicados de las consultas más frecuentes de los repositorios.
+-- Las tablas solo tenían las claves primarias y los UNIQUE, así que cualquier filtro por
+-- estado, mensajero o cliente recorría la tabla completa.
+
+-- Paquete: listados y conteos por estado (admin), con orden por id para la paginación
+CREATE INDEX IF NOT EXISTS idx_paquete_estado_id ON Paquete (estado, id);
+
+-- Paquete: paquetes de un mensajero (listados, conteo por estado, can_take_more, rutas)
+CREATE INDEX IF NOT EXISTS idx_paquete_mensajero_estado ON Paquete (id_mensajero, estado);
+
+-- Paquete: envíos de un cliente (listados, conteo por estado, perfil del mensajero)
+CREATE INDEX IF NOT EXISTS idx_paquete_cliente_estado ON Paquete (id_cliente, estado);
+
+-- Paquete: paginación ordenada por fecha de creación
+CREATE INDEX IF NOT EXISTS idx_paquete_fecha_creacion_id ON Paquete (fecha_creacion, id);
+
+-- Paquete: cola de asignación (list_pending) -> índice parcial, muy pequeño
+CREATE INDEX IF NOT EXISTS idx_paquete_registrados ON Paquete (id) WHERE estado = 'REGISTRADO';
+
+-- Paquete: centro de notificaciones del cliente (últimas entregas)
+CREATE INDEX IF NOT EXISTS idx_paquete_cliente_entregados
+    ON Paquete (id_cliente, fecha_entrega_real DESC) WHERE estado = 'ENTREGADO';
+
+-- Paquete: entregas aún no notificadas al cliente
+CREATE INDEX IF NOT EXISTS idx_paquete_entregados_sin_notificar
+    ON Paquete (id_cliente) WHERE estado = 'ENTREGADO' AND COALESCE(notificado_cliente, 0) = 0;
+
+-- Jornada: jornada activa de un mensajero (get_active_workday, CourierRepo.get, list_available)
+CREATE INDEX IF NOT EXISTS idx_jornada_activa ON Jornada (id_mensajero) WHERE estado = 'ACTIVA';
+
+-- Jornada: última jornada de cada mensajero (informe de repartidores)
+CREATE INDEX IF NOT EXISTS idx_jornada_mensajero_id ON Jornada (id_mensajero, id DESC);
+
+-- Valoracion: valoraciones de un paquete / de un autor sobre un paquete
+CREATE INDEX IF NOT EXISTS idx_valoracion_paquete_autor ON Valoracion (id_paquete, id_autor);
+
+-- Incidencia: última incidencia de un paquete
+CREATE INDEX IF NOT EXISTS idx_incidencia_paquete_fecha ON Incidencia (id_paquete, fecha_reporte DESC);
+
+-- Usuario: listados por rol
+CREATE INDEX IF NOT EXISTS idx_usuario_rol ON Usuario (rol);
@@ -0,0 +1,17 @@
+-- 002: Agregados de valoraciones por mensajero, mantenidos de forma incremental.
+-- Cada valoración nueva suma una fila aquí en la misma transacción que el INSERT en Valoracion,
+-- así la media y el reparto de estrellas de un mensajero se leen con una búsqueda por clave
+-- en vez de recorrer todas sus valoraciones. Para rellenarla con datos existentes:
+--   python db/backfill_rating_stats.py
+
+CREATE TABLE IF NOT EXISTS EstadisticaValoracion (
+    id_mensajero INTEGER PRIMARY KEY REFERENCES Usuario(id) ON DELETE CASCADE,
+    num_valoraciones INTEGER NOT NULL DEFAULT 0,
+    suma_puntuacion INTEGER NOT NULL DEFAULT 0,
+    estrellas_1 INTEGER NOT NULL DEFAULT 0,
+    estrellas_2 INTEGER NOT NULL DEFAULT 0,
+    estrellas_3 INTEGER NOT NULL DEFAULT 0,
+    estrellas_4 INTEGER NOT NULL DEFAULT 0,
+    estrellas_5 INTEGER NOT NULL DEFAULT 0,
+    fecha_ultima_valoracion TIMESTAMP
+);
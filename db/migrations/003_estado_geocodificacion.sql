@@ -0,0 +1,13 @@
+-- 003: Geocodificación asíncrona de paquetes.
+-- Un paquete puede guardarse antes de tener coordenadas: queda en estado_geocodificacion
+-- 'PENDIENTE' y un proceso en segundo plano rellena latitud/longitud más tarde, con reintentos
+-- espaciados (proximo_intento_geocodificacion). Tras agotar los intentos pasa a 'FALLIDA'
+-- y hay que corregir la dirección. Los paquetes existentes ya tienen coordenadas: 'RESUELTA'.
+
+ALTER TABLE Paquete ADD COLUMN IF NOT EXISTS estado_geocodificacion TEXT NOT NULL DEFAULT 'RESUELTA';
+ALTER TABLE Paquete ADD COLUMN IF NOT EXISTS intentos_geocodificacion INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE Paquete ADD COLUMN IF NOT EXISTS proximo_intento_geocodificacion TIMESTAMP;
+
+-- Cola del proceso de geocodificación -> índice parcial, solo con los pendientes
+CREATE INDEX IF NOT EXISTS idx_paquete_geocodificacion_pendiente
+    ON Paquete (proximo_intento_geocodificacion, id) WHERE estado_geocodificacion = 'PENDIENTE';
@@ -0,0 +1,4 @@
+-- 004: Listado de valoraciones del administrador paginado por cursor (fecha, id), las más
+-- recientes primero: cada página lee solo sus filas en lugar de ordenar toda la tabla.
+
+CREATE INDEX IF NOT EXISTS idx_valoracion_fecha_id ON Valoracion (fecha DESC, id DESC);
@@ -0,0 +1,136 @@
+import os
+import sys
+import time
+
+import psycopg2
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(CURRENT_DIR)
+
+from init_db_postgres import DB_HOST, DB_NAME, DB_USER, DB_PASS, DB_PORT, SQL_SCRIPT_PATH
+from migrate import apply_migrations
+from backfill_rating_stats import backfill_rating_stats
+
+# Esquema aparte para no tocar los datos de la demo
+BENCH_SCHEMA = "moval_bench"
+
+
+def bench_conn_info(schema: str = BENCH_SCHEMA, base_conn_info: dict | None = None) -> dict:
+    """
+    conn_info para los repositorios apuntando al esquema de pruebas de carga. Con
+    `base_conn_info` se usa ese servidor en lugar del de la demo.
+    """
+    base = dict(base_conn_info) if base_conn_info else {
+        "host": DB_HOST,
+        "database": DB_NAME,
+        "user": DB_USER,
+        "password": DB_PASS,
+        "port": DB_PORT,
+    }
+    base["options"] = f"-c search_path={schema}"
+    return base
+
+
+def seed(couriers: int = 1000, customers: int = 50000, shipments: int = 300000,
+         ratings: int = 200000, schema: str = BENCH_SCHEMA, base_conn_info: dict | None = None) -> dict:
+    """
+    (Re)crea `schema` con el esquema y las migraciones y lo llena con datos sintéticos
+    generados en el propio servidor (generate_series). Devuelve el conn_info para usarlo.
+
+    Reparto de estados: ~2% REGISTRADO, ~4% ASIGNADO, ~2% INCIDENCIA y el resto ENTREGADO.
+    Las valoraciones se crean sobre paquetes entregados (como mucho una por paquete).
+    """
+    conn_info = bench_conn_info(schema, base_conn_info)
+    conn = psycopg2.connect(**{k: v for k, v in conn_info.items() if k != "options"})
+    started = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+            cursor.execute(f"CREATE SCHEMA {schema}")
+            cursor.execute(f"SET search_path TO {schema}")
+
+            with open(SQL_SCRIPT_PATH, "r", encoding="utf-8") as f:
+                cursor.execute(f.read())
+        conn.commit()
+        apply_migrations(conn)
+
+        with conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {schema}")
+            print(f" > Usuarios: 1 admin, {couriers} mensajeros, {customers} clientes")
+            cursor.execute("""
+                INSERT INTO Usuario (dni, nombre, apellidos, email, password_hash, rol)
+                SELECT 'B' || i, 'Usuario', 'Carga ' || i, 'u' || i || '@bench.moval',
+                       'x', CASE WHEN i = 1 THEN 'ADMIN' WHEN i <= 1 + %(c)s THEN 'COURIER' ELSE 'CUSTOMER' END
+                FROM generate_series(1, 1 + %(c)s + %(k)s) AS i
+            """, {"c": couriers, "k": customers})
+
+            print(f" > Paquetes: {shipments}")
+            cursor.execute("""
+                INSERT INTO Paquete (codigo_seguimiento, descripcion, peso, direccion_origen, direccion_destino,
+                                     latitud, longitud, estado, fecha_creacion, fecha_entrega_real,
+                                     notificado_cliente, id_cliente, id_mensajero)
+                SELECT 'BENCH-' || i, 'Paquete ' || i, 1 + random() * 9, 'Almacén Central', 'Calle ' || (i %% 500),
+                       42.60 + (random() - 0.5) * 0.04, -5.56 + (random() - 0.5) * 0.06,
+                       e.estado,
+                       now() - (random() * interval '365 days'),
+                       CASE WHEN e.estado = 'ENTREGADO' THEN now() - (random() * interval '365 days') END,
+                       CASE WHEN e.estado = 'ENTREGADO' AND random() < 0.99 THEN 1 ELSE 0 END,
+                       2 + %(c)s + (i %% %(k)s),
+                       CASE WHEN e.estado = 'REGISTRADO' THEN NULL ELSE 2 + (i %% %(c)s) END
+                FROM generate_series(1, %(n)s) AS i
+                CROSS JOIN LATERAL (
+                    SELECT CASE WHEN i %% 50 = 0 THEN 'REGISTRADO'
+                                WHEN i %% 25 = 1 THEN 'ASIGNADO'
+                                WHEN i %% 50 = 2 THEN 'INCIDENCIA'
+                                ELSE 'ENTREGADO' END AS estado
+                ) e
+            """, {"c": couriers, "k": customers, "n": shipments})
+
+            print(" > Jornadas: 20 por mensajero (10% con una activa)")
+            cursor.execute("""
+                INSERT INTO Jornada (id_mensajero, fecha_inicio, fecha_fin, estado)
+                SELECT 2 + c, now() - (d || ' days')::interval, now() - (d || ' days')::interval + interval '8 hours', 'FINALIZADA'
+                FROM generate_series(0, %(c)s - 1) AS c, generate_series(1, 20) AS d
+            """, {"c": couriers})
+            cursor.execute("""
+                INSERT INTO Jornada (id_mensajero, fecha_inicio, estado)
+                SELECT 2 + c, now() - interval '1 hour', 'ACTIVA'
+                FROM generate_series(0, %(c)s - 1) AS c WHERE c %% 10 = 0
+            """, {"c": couriers})
+
+            print(f" > Valoraciones: {ratings}")
+            cursor.execute("""
+                INSERT INTO Valoracion (puntuacion, comentario, fecha, id_paquete, id_autor)
+                SELECT 1 + floor(random() * 5)::int, NULL, p.fecha_entrega_real, p.id, p.id_cliente
+                FROM Paquete p
+                WHERE p.estado = 'ENTREGADO'
+                ORDER BY p.id
+                LIMIT %(r)s
+            """, {"r": ratings})
+
+            print(" > Incidencias")
+            cursor.execute("""
+                INSERT INTO Incidencia (titulo, descripcion, tipo, id_usuario, id_paquete, fecha_reporte)
+                SELECT 'Incidencia', 'Ausente', 'GENERIC', p.id_cliente, p.id, now() - (random() * interval '30 days')
+                FROM Paquete p WHERE p.estado = 'INCIDENCIA'
+            """)
+        conn.commit()
+
+        print(" > Estadísticas de valoraciones por mensajero")
+        with conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {schema}")
+        backfill_rating_stats(conn)
+
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"SET search_path TO {schema}")
+            cursor.execute("ANALYZE")
+    finally:
+        conn.close()
+
+    print(f" > Datos de carga listos en '{schema}' ({time.perf_counter() - started:.1f}s)")
+    return conn_info
+
+
+if __name__ == "__main__":
+    seed()
@@ -1,6 +1,8 @@
 import customtkinter as ctk
 import sys
 import os
+import webbrowser
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import messagebox
 import tkinter.ttk as ttk
 import sqlite3
@@ -9,8 +11,11 @@ import sqlite3
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..', 'src')))
 
 # Lógica
-from moval.persistence.repositories import UserRepo, SessionRepo, ShipmentRepo, CourierRepo, WorkdayRepo, IncidentRepo, RatingRepo
-from moval.security.password_hasher import PasswordHasher
+from moval.persistence.repositories import SessionRepo, IncidentRepo, RatingRepo
+from moval.persistence.cached_repositories import CachedUserRepo, CachedShipmentRepo, CachedCourierRepo, CachedWorkdayRepo
+from moval.persistence.cache import get_entity_cache
+from moval.persistence.connection_pool import close_all_pools
+from moval.security.async_hasher import AsyncPasswordHasher
 from moval.services.clock import Clock
 
 from moval.usecases.login import Login
@@ -18,8 +23,11 @@ from moval.usecases.register_user import RegisterUser
 from moval.usecases.list_pending_shipments import ListPendingShipments
 from moval.usecases.list_available_couriers import ListAvailableCouriers
 from moval.usecases.assign_shipment import AssignShipments
+from moval.usecases.auto_assign_shipments import AutoAssignShipments
+from moval.usecases.import_shipments import ImportShipments
 from moval.usecases.unassign_shipment import UnassignShipment
 from moval.usecases.list_shipments import ListShipments
+from moval.usecases.get_shipment_status_counts import GetShipmentStatusCounts
 from moval.usecases.start_workday import StartWorkday
 from moval.usecases.end_workday import EndWorkday
 from moval.usecases.get_active_workday import GetActiveWorkday
@@ -27,16 +35,26 @@ from moval.usecases.deliver_shipment import DeliverShipment
 from moval.usecases.report_incident import ReportIncident
 from moval.usecases.get_shipment_details import GetShipmentDetails
 from moval.usecases.calculate_eta import CalculateETA
+from moval.usecases.calculate_route_etas import CalculateRouteETAs
 from moval.usecases.rate_delivery import RateDelivery
 from moval.usecases.change_user_role import ChangeUserRole
 from moval.usecases.list_ratings import ListRatings
 from moval.usecases.update_user_data import UpdateUserData
 from moval.usecases.get_courier_profile import GetCourierProfile
 from moval.services.route_service import RouteService
+from moval.services.route_cache import RouteCache
+from moval.services.route_map import RouteMapRenderer
+from moval.services.distance_matrix import DistanceMatrixService, OsrmTableClient
+from moval.services.http_client import get_http_client
 from moval.usecases.generate_delivery_route import GenerateDeliveryRoute
 from moval.usecases.pop_next_delivery_notification import PopNextDeliveryNotification
 from moval.usecases.create_shipment import CreateShipment
+from moval.usecases.update_shipment import UpdateShipment
 from moval.services.geocoding_service import GeocodingService
+from moval.services.geocode_cache import GeocodeCache
+from moval.services.gazetteer import Gazetteer
+from moval.services.geocode_queue import GeocodeQueue
+from moval.services.geocode_resolver import GeocodeResolver
 
 from moval.views import LoginView, RegisterView, AdminView, CourierView, CustomerView
 
@@ -63,39 +81,70 @@ class MovalApp(ctk.CTk):
         self.protocol("WM_DELETE_WINDOW", self.on_close)
         
         # 1. Repositorios y Servicios
-        self.user_repo = UserRepo()
+        # Usuarios, mensajeros y paquetes comparten una caché de lectura con invalidación al escribir
+        self.entity_cache = get_entity_cache()
+        self.user_repo = CachedUserRepo(cache=self.entity_cache)
         self.session_repo = SessionRepo()
-        self.shipment_repo = ShipmentRepo()
-        self.courier_repo = CourierRepo()
-        self.workday_repo = WorkdayRepo()
+        self.shipment_repo = CachedShipmentRepo(cache=self.entity_cache)
+        self.courier_repo = CachedCourierRepo(cache=self.entity_cache)
+        self.workday_repo = CachedWorkdayRepo(cache=self.entity_cache)
         self.incident_repo = IncidentRepo()
         self.rating_repo = RatingRepo()
         self.clock = Clock()
-        self.hasher = PasswordHasher()
-        self.route_service = RouteService()
-        self.geocoding_service = GeocodingService()
+        # Argon2id en un pool de procesos: el login y el registro no congelan la ventana
+        self.hasher = AsyncPasswordHasher()
+        self._auth_pending = False
+        # Tiempos y distancias por carretera cacheados en disco: la mayoría de rutas se planifican sin red
+        # Sesión HTTP compartida con OSRM y Nominatim: keep-alive, timeouts, reintentos y circuit breaker
+        self.http_client = get_http_client()
+        self.matrix_service = DistanceMatrixService(table_client=OsrmTableClient(http_client=self.http_client))
+        self.route_service = RouteService(engine="local", matrix_service=self.matrix_service,
+                                          http_client=self.http_client)
+        # Mapas HTML de rutas: solo cuando se piden, en un hilo aparte y un fichero por ruta
+        self.map_renderer = RouteMapRenderer()
+        # Trabajo lento (red) fuera del hilo de la interfaz
+        self.background = ThreadPoolExecutor(max_workers=2, thread_name_prefix="moval-bg")
+        # Login y registro aparte: no deben esperar detrás de una importación o de un cálculo de ruta
+        self.auth_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="moval-auth")
+        # Ruta optimizada de cada mensajero, compartida por su vista de ruta y los ETA de sus clientes
+        self.route_cache = RouteCache()
+        # Direcciones ya geocodificadas (y las no encontradas) guardadas en disco: se repiten mucho.
+        # El callejero local de la zona (si se ha importado, db/import_gazetteer.py) va antes que Nominatim
+        self.geocoding_service = GeocodingService(http_client=self.http_client, cache=GeocodeCache(),
+                                                  gazetteer=Gazetteer.load_default())
+        # Geocodificación de las importaciones masivas: sin duplicados y a 1 petición/s
+        self.geocode_queue = GeocodeQueue(self.geocoding_service)
+        # Los paquetes se guardan sin esperar a Nominatim; sus coordenadas se resuelven aquí
+        self.geocode_resolver = GeocodeResolver(self.shipment_repo, self.geocoding_service, self.clock, self.route_cache)
+        self.geocode_resolver.start()
 
         # 2. Casos de Uso
         self.uc_login = Login(self.user_repo, self.session_repo, self.hasher)
         self.uc_register = RegisterUser(self.user_repo, self.hasher)
         self.uc_update_profile = UpdateUserData(self.user_repo)
-        self.uc_create_shipment = CreateShipment(self.shipment_repo, self.user_repo, self.geocoding_service)
+        self.uc_create_shipment = CreateShipment(self.shipment_repo, self.user_repo, self.geocoding_service,
+                                                 geocode_resolver=self.geocode_resolver)
+        self.uc_import_shipments = ImportShipments(self.shipment_repo, self.user_repo, self.geocode_queue)
         self.uc_list_all = ListShipments(self.shipment_repo)
+        self.uc_status_counts = GetShipmentStatusCounts(self.shipment_repo)
         self.uc_list_couriers = ListAvailableCouriers(self.courier_repo)
-        self.uc_assign = AssignShipments(self.shipment_repo, self.courier_repo)
-        self.uc_unassign = UnassignShipment(self.shipment_repo)
+        self.uc_assign = AssignShipments(self.shipment_repo, self.courier_repo, self.route_cache)
+        self.uc_auto_assign = AutoAssignShipments(self.shipment_repo, self.courier_repo, self.route_cache)
+        self.uc_unassign = UnassignShipment(self.shipment_repo, self.route_cache)
+        self.uc_update_shipment = UpdateShipment(self.shipment_repo, self.geocode_resolver, self.route_cache)
         self.uc_change_role = ChangeUserRole(self.user_repo)
         self.uc_list_ratings = ListRatings(self.rating_repo)
         self.uc_start_wd = StartWorkday(self.workday_repo, self.clock)
         self.uc_end_wd = EndWorkday(self.workday_repo, self.clock)
         self.uc_get_wd = GetActiveWorkday(self.workday_repo)
-        self.uc_deliver = DeliverShipment(self.shipment_repo, self.clock)
-        self.uc_incident = ReportIncident(self.shipment_repo, self.incident_repo, self.clock)
+        self.uc_deliver = DeliverShipment(self.shipment_repo, self.clock, self.route_cache)
+        self.uc_incident = ReportIncident(self.shipment_repo, self.incident_repo, self.clock, self.route_cache)
         self.uc_details = GetShipmentDetails(self.shipment_repo, self.incident_repo, self.user_repo)
-        self.uc_eta = CalculateETA(self.shipment_repo, self.route_service, self.clock, self.workday_repo)
         self.uc_rate = RateDelivery(self.shipment_repo, self.rating_repo)
         self.uc_courier_profile = GetCourierProfile(self.courier_repo, self.rating_repo, self.shipment_repo)
-        self.uc_route = GenerateDeliveryRoute(self.shipment_repo, self.route_service, self.workday_repo)
+        self.uc_route = GenerateDeliveryRoute(self.shipment_repo, self.route_service, self.workday_repo, self.route_cache)
+        self.uc_eta = CalculateETA(self.shipment_repo, self.route_service, self.clock, self.workday_repo, route_planner=self.uc_route)
+        self.uc_route_etas = CalculateRouteETAs(self.shipment_repo, self.workday_repo, self.uc_route, self.clock)
         self.uc_pop_notification = PopNextDeliveryNotification(self.shipment_repo, self.clock)
 
         # 3. Estado
@@ -178,6 +227,16 @@ class MovalApp(ctk.CTk):
         try:
             if messagebox.askokcancel("Salir", "¿Deseas salir de Moval?"):
                 # Si necesitas hacer limpieza: aquí es el lugar (persistir estado, cerrar conexiones…)
+                close_all_pools()
+                self.matrix_service.cache.close()
+                self.geocoding_service.cache.close()
+                self.map_renderer.shutdown()
+                self.background.shutdown(wait=False, cancel_futures=True)
+                self.auth_executor.shutdown(wait=False, cancel_futures=True)
+                self.geocode_queue.shutdown(wait=False)
+                self.geocode_resolver.stop(timeout=1)
+                self.hasher.shutdown(wait=False)
+                self.http_client.close()
                 self.destroy()
         except Exception:
             # En caso de que messagebox falle (entorno sin GUI), cerramos directo
@@ -188,26 +247,47 @@ class MovalApp(ctk.CTk):
 
     # --- ACTIONS ---
     def login(self, email, password):
-        try:
-            user = self.uc_login.execute(email, password)
+        # La verificación Argon2 (y la consulta a la BD) van fuera del hilo de la interfaz
+        if self._auth_pending:
+            return
+        self._auth_pending = True
+
+        def on_done(user):
+            self._auth_pending = False
             user['id'] = user['user_id']
             self.current_user = user
             role = user['role']
             if role == "ADMIN": self.switch_view("admin")
             elif role == "COURIER": self.switch_view("courier")
             elif role == "CUSTOMER": self.switch_view("customer")
-        except Exception as e: messagebox.showerror("Error", str(e))
+
+        def on_error(e):
+            self._auth_pending = False
+            messagebox.showerror("Error", str(e))
+
+        future = self.auth_executor.submit(self.uc_login.execute, email, password)
+        self._when_done(future, on_done, on_error)
 
     def logout(self):
         self.current_user = None
         self.switch_view("login")
 
     def register(self, data):
-        try:
-            self.uc_register.execute(data)
+        if self._auth_pending:
+            return
+        self._auth_pending = True
+
+        def on_done(_):
+            self._auth_pending = False
             messagebox.showinfo("Éxito", "Cuenta creada.")
             self.switch_view("login")
-        except Exception as e: messagebox.showerror("Error", str(e))
+
+        def on_error(e):
+            self._auth_pending = False
+            messagebox.showerror("Error", str(e))
+
+        future = self.auth_executor.submit(self.uc_register.execute, data)
+        self._when_done(future, on_done, on_error)
 
     def update_profile(self, data):
         try:
@@ -238,10 +318,31 @@ class MovalApp(ctk.CTk):
         try: return self.uc_list_all.execute(self.current_user)
         except: return []
 
+    def get_shipments_page(self, statuses=None, after_id=None, page_size=50):
+        """Página de envíos del usuario actual (más recientes primero) a partir del cursor `after_id`."""
+        try:
+            return self.uc_list_all.execute(
+                self.current_user, page_size=page_size, after_id=after_id,
+                descending=True, statuses=statuses
+            )
+        except: return []
+
+    def get_shipment_status_counts(self):
+        try: return self.uc_status_counts.execute(self.current_user)
+        except: return {}
+
     def get_all_ratings(self):
         try: return self.uc_list_ratings.execute(self.current_user)
         except: return []
 
+    def get_ratings_page(self, after=None, page_size=50):
+        """Página de valoraciones (más recientes primero) a partir del cursor `after` = (fecha, id)."""
+        try:
+            return self.uc_list_ratings.execute(self.current_user, page_size=page_size, after=after)
+        except Exception as e:
+            messagebox.showerror("Error", f"No se pudieron cargar las valoraciones: {e}")
+            return None
+
     def get_all_couriers_report(self):
         try:
             if self.current_user['role'] != 'ADMIN': return []
@@ -261,12 +362,63 @@ class MovalApp(ctk.CTk):
 
     def assign_shipments(self, sids, cid):
         try: self.uc_assign.execute(self.current_user, sids, cid)
-        except Exception as e: messagebox.showerror("Error", str(e))
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.refresh_route_etas(cid)
+
+    def import_shipments(self, path, on_progress, on_done):
+        """
+        Importa un fichero de paquetes en segundo plano. `on_progress` recibe el avance (desde el
+        hilo de la interfaz) y `on_done` el informe final, o None si la importación falla.
+        """
+        progress = {}
+        future = self.background.submit(self.uc_import_shipments.execute, self.current_user, path,
+                                        on_progress=progress.update)
+
+        def poll():
+            if progress:
+                on_progress(dict(progress))
+            if not future.done():
+                self.after(250, poll)
+
+        def on_error(e):
+            messagebox.showerror("Error Importación", str(e))
+            on_done(None)
+
+        poll()
+        self._when_done(future, on_done, on_error)
+
+    def preview_auto_assign(self, on_ready):
+        """Calcula en segundo plano el reparto automático de los pendientes; `on_ready` recibe la propuesta (None si falla)."""
+        def on_error(e):
+            messagebox.showerror("Error", str(e))
+            on_ready(None)
+        future = self.background.submit(self.uc_auto_assign.execute, self.current_user)
+        self._when_done(future, on_ready, on_error)
+
+    def commit_auto_assign(self, preview):
+        try: result = self.uc_auto_assign.commit(self.current_user, preview)
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return False
+        for cid in result["assigned"]:
+            self.refresh_route_etas(cid)
+        return True
 
     def unassign_shipment(self, sid):
         try: self.uc_unassign.execute(self.current_user, sid)
         except Exception as e: messagebox.showerror("Error", str(e))
 
+    def correct_shipment_address(self, sid, address):
+        """Guarda una dirección corregida; el paquete vuelve a geocodificarse en segundo plano."""
+        try:
+            self.uc_update_shipment.execute(self.current_user, sid, {"direccion_destino": address})
+            return True
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return False
+
     def get_user_by_email(self, email):
         try: return self.user_repo.get_by_email(email)
         except: return None
@@ -294,7 +446,10 @@ class MovalApp(ctk.CTk):
 
     def deliver_shipment(self, sid):
         try: self.uc_deliver.execute(self.current_user, sid)
-        except Exception as e: messagebox.showerror("Error", str(e))
+        except Exception as e:
+            messagebox.showerror("Error", str(e))
+            return
+        self.refresh_route_etas(self.current_user['id'])
 
     def report_incident(self, sid, desc):
         try: self.uc_incident.execute(self.current_user, sid, desc)
@@ -304,20 +459,71 @@ class MovalApp(ctk.CTk):
         try:
             # Assumes current_user is Courier
             result = self.uc_route.execute(self.current_user['id'])
+            # La ruta ya está calculada (y cacheada): se guardan los ETA de todas sus paradas
+            self.refresh_route_etas(self.current_user['id'])
             return result
         except Exception as e:
             print(f"ERROR: {e}")
             messagebox.showerror("Error Generando Ruta", str(e))
             return None
 
+    def open_route_map(self, route):
+        """Pide el mapa HTML de la ruta y lo abre en el navegador cuando esté listo."""
+        future = self.map_renderer.request(route, route.get('ordered_shipments', []))
+        self._when_done(
+            future,
+            lambda path: webbrowser.open('file://' + os.path.realpath(path)),
+            lambda e: messagebox.showerror("Error Mapa", str(e))
+        )
+
+    def load_road_geometry(self, route, on_ready):
+        """Geometría por carretera de la ruta en segundo plano; `on_ready` recibe la RouteGeometry."""
+        future = self.background.submit(self.route_service.road_geometry, route)
+        self._when_done(future, on_ready, lambda e: print(f"ERROR geometría: {e}"))
+
+    def _when_done(self, future, on_result, on_error):
+        # tkinter no es thread-safe: se consulta el Future desde el hilo de la interfaz
+        if not future.done():
+            self.after(100, lambda: self._when_done(future, on_result, on_error))
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            on_error(e)
+            return
+        on_result(result)
+
+    def refresh_route_etas(self, courier_id):
+        """
+        Recalcula con una sola ruta los ETA de todas las paradas del mensajero y los guarda, en
+        segundo plano: con paradas nuevas hay que pedir la matriz a OSRM y optimizar la ruta.
+        """
+        actor = self.current_user
+
+        def refresh():
+            try:
+                return self.uc_route_etas.execute(actor, courier_id=courier_id)
+            except Exception as e:
+                print(f"ERROR ETA mensajero {courier_id}: {e}")
+                return {}
+
+        return self.background.submit(refresh)
+
     # Customer
     def get_shipment_details(self, sid):
         try: return self.uc_details.execute(self.current_user, sid)
         except: return {}
 
-    def calculate_eta(self, sid):
-        try: return self.uc_eta.execute(self.current_user, sid)
-        except: return {"eta_minutos": "Error"}
+    def calculate_eta(self, sid, on_ready):
+        """
+        ETA de un paquete en segundo plano (si la ruta no está cacheada se optimiza y puede
+        pedirse la matriz a OSRM); `on_ready` lo recibe en el hilo de la interfaz.
+        """
+        def on_error(e):
+            print(f"ERROR ETA paquete {sid}: {e}")
+            on_ready({"eta_minutos": "Error"})
+        future = self.background.submit(self.uc_eta.execute, self.current_user, sid)
+        self._when_done(future, on_ready, on_error)
 
     def rate_delivery(self, sid, score, com):
         try: self.uc_rate.execute(self.current_user, sid, score, com)
@@ -12,4 +12,7 @@ class ShipmentStatus(str, Enum):
     DELIVERED = "ENTREGADO"
     INCIDENT = "INCIDENCIA"
 
-    
\ No newline at end of file
+class GeocodeStatus(str, Enum):
+    PENDING = "PENDIENTE"
+    RESOLVED = "RESUELTA"
+    FAILED = "FALLIDA"
@@ -0,0 +1,128 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Marca para distinguir "no está en caché" de un valor None cacheado
+_MISSING = object()
+
+
+class EntityCache:
+    """
+    Caché en memoria LRU + TTL, segura entre hilos, para entidades leídas de la BD.
+
+    - Como mucho `max_entries` entradas; al llenarse se expulsa la menos usada.
+    - Una entrada nunca se sirve pasados `ttl` segundos desde que se empezó a leer de la BD.
+    - Las claves son tuplas (espacio, id), p. ej. ("shipment", 42), para poder invalidar
+      una entidad o un espacio completo.
+    - Se guardan y devuelven copias: modificar el dict devuelto no altera la caché.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl: float = 30.0,
+                 clock: Optional[Callable[[], float]] = None):
+        if max_entries < 1 or ttl <= 0:
+            raise ValueError("Parámetros de caché no válidos")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._clock = clock or time.monotonic
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # clave -> (valor, instante_de_caducidad)
+        # Se incrementa en cada invalidación: una lectura que empezó antes no se guarda,
+        # porque podría traer datos anteriores a la escritura que invalidó.
+        self._generation = 0
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+        }
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Devuelve el valor cacheado para `key` o lo carga con `loader()` y lo guarda."""
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self._stats["hits"] += 1
+                return copy.deepcopy(value)
+            self._stats["misses"] += 1
+            generation = self._generation
+            # La antigüedad se cuenta desde antes de la consulta, no desde que termina
+            expires_at = self._clock() + self.ttl
+
+        value = loader()
+
+        with self._lock:
+            if generation == self._generation:
+                self._store(key, copy.deepcopy(value), expires_at)
+        return value
+
+    def invalidate(self, *keys: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, None) is not None:
+                    self._stats["invalidations"] += 1
+
+    def invalidate_namespace(self, namespace: str) -> None:
+        """Invalida todas las entradas cuyo primer elemento de clave es `namespace`."""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if isinstance(k, tuple) and k and k[0] == namespace]:
+                del self._entries[key]
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        """Aciertos, fallos, expulsiones (LRU), caducidades (TTL), invalidaciones y tamaño."""
+        with self._lock:
+            data = dict(self._stats)
+            lookups = data["hits"] + data["misses"]
+            data.update({
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl": self.ttl,
+                "hit_ratio": data["hits"] / lookups if lookups else 0.0,
+            })
+            return data
+
+    # --- Internos (con el lock tomado) ---
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        value, expires_at = entry
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            self._stats["expirations"] += 1
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def _store(self, key, value, expires_at) -> None:
+        if self._clock() >= expires_at:
+            return
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats["evictions"] += 1
+
+
+# Una caché de entidades por proceso, compartida por los repositorios con caché
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_entity_cache(max_entries: int = 1024, ttl: float = 30.0) -> EntityCache:
+    """Devuelve la caché compartida del proceso, creándola la primera vez."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = EntityCache(max_entries=max_entries, ttl=ttl)
+        return _shared_cache
@@ -0,0 +1,125 @@
+from moval.persistence.cache import EntityCache, get_entity_cache
+from moval.persistence.repositories import UserRepo, CourierRepo, ShipmentRepo, WorkdayRepo
+
+# Repositorios con caché de lectura (read-through) para `get` por id.
+# Las escrituras invalidan las entradas afectadas antes de escribir y otra vez tras el commit
+# (al cerrar la transacción en curso, si la hay), para que ningún otro hilo deje en caché la
+# versión anterior a la escritura.
+# Dentro de una transacción las lecturas van siempre a la BD (pueden ver datos sin confirmar).
+
+
+class _CachedRepoMixin:
+    def _init_cache(self, cache: EntityCache | None) -> None:
+        self.cache = cache if cache is not None else get_entity_cache()
+
+    def _cached(self, key: tuple, loader):
+        if self.in_transaction():
+            return loader()
+        return self.cache.get_or_load(key, loader)
+
+    def _write(self, write, keys=(), namespace: str | None = None):
+        """Ejecuta `write()` invalidando `keys` (y `namespace`) antes y después del commit."""
+        self._drop(keys, namespace)
+        try:
+            return write()
+        finally:
+            self.call_after_transaction(lambda: self._drop(keys, namespace))
+
+    def _drop(self, keys, namespace) -> None:
+        if keys:
+            self.cache.invalidate(*keys)
+        if namespace:
+            self.cache.invalidate_namespace(namespace)
+
+    def cache_stats(self) -> dict:
+        return self.cache.stats()
+
+
+class CachedUserRepo(_CachedRepoMixin, UserRepo):
+    def __init__(self, conn_info: dict = None, cache: EntityCache | None = None, **kwargs):
+        super().__init__(conn_info, **kwargs)
+        self._init_cache(cache)
+
+    def get(self, user_id: int):
+        return self._cached(("user", user_id), lambda: super(CachedUserRepo, self).get(user_id))
+
+    def update(self, user_id: int, fields: dict) -> None:
+        # Usuario también es la fila del mensajero
+        return self._write(lambda: super(CachedUserRepo, self).update(user_id, fields),
+                           keys=[("user", user_id), ("courier", user_id)])
+
+    def delete(self, user_id: int) -> bool:
+        # Borra también sus paquetes
+        return self._write(lambda: super(CachedUserRepo, self).delete(user_id),
+                           keys=[("user", user_id), ("courier", user_id)], namespace="shipment")
+
+
+class CachedCourierRepo(_CachedRepoMixin, CourierRepo):
+    def __init__(self, conn_info: dict = None, cache: EntityCache | None = None, **kwargs):
+        super().__init__(conn_info, **kwargs)
+        self._init_cache(cache)
+
+    def get(self, courier_id: int) -> dict | None:
+        return self._cached(("courier", courier_id), lambda: super(CachedCourierRepo, self).get(courier_id))
+
+
+class CachedShipmentRepo(_CachedRepoMixin, ShipmentRepo):
+    def __init__(self, conn_info: dict = None, cache: EntityCache | None = None, **kwargs):
+        super().__init__(conn_info, **kwargs)
+        self._init_cache(cache)
+
+    def get(self, shipment_id: int) -> dict | None:
+        return self._cached(("shipment", shipment_id), lambda: super(CachedShipmentRepo, self).get(shipment_id))
+
+    def assign(self, shipment_id: list[int], courier_id: int) -> list[int]:
+        return self._write(lambda: super(CachedShipmentRepo, self).assign(shipment_id, courier_id),
+                           keys=[("shipment", sid) for sid in shipment_id])
+
+    def unassign(self, shipment_id: int) -> None:
+        return self._write(lambda: super(CachedShipmentRepo, self).unassign(shipment_id),
+                           keys=[("shipment", shipment_id)])
+
+    def update(self, shipment_id: int, fields: dict) -> None:
+        return self._write(lambda: super(CachedShipmentRepo, self).update(shipment_id, fields),
+                           keys=[("shipment", shipment_id)])
+
+    def set_status(self, shipment_id: int, status, delivered_at=None) -> None:
+        return self._write(lambda: super(CachedShipmentRepo, self).set_status(shipment_id, status, delivered_at),
+                           keys=[("shipment", shipment_id)])
+
+    def set_geocode(self, shipment_id: int, lat: float, lon: float) -> int | None:
+        return self._write(lambda: super(CachedShipmentRepo, self).set_geocode(shipment_id, lat, lon),
+                           keys=[("shipment", shipment_id)])
+
+    def record_geocode_failure(self, shipment_id: int, next_attempt) -> None:
+        return self._write(lambda: super(CachedShipmentRepo, self).record_geocode_failure(shipment_id, next_attempt),
+                           keys=[("shipment", shipment_id)])
+
+    def postpone_geocode(self, shipment_id: int, next_attempt) -> None:
+        return self._write(lambda: super(CachedShipmentRepo, self).postpone_geocode(shipment_id, next_attempt),
+                           keys=[("shipment", shipment_id)])
+
+    def set_estimated_deliveries(self, etas: dict) -> int:
+        return self._write(lambda: super(CachedShipmentRepo, self).set_estimated_deliveries(etas),
+                           keys=[("shipment", sid) for sid in etas])
+
+    def mark_notifications_as_read(self, customer_id: int):
+        # Actualiza varios paquetes del cliente de una vez
+        return self._write(lambda: super(CachedShipmentRepo, self).mark_notifications_as_read(customer_id),
+                           namespace="shipment")
+
+
+class CachedWorkdayRepo(_CachedRepoMixin, WorkdayRepo):
+    """No cachea jornadas: solo invalida el estado (disponible/no) del mensajero cacheado."""
+
+    def __init__(self, conn_info: dict = None, cache: EntityCache | None = None, **kwargs):
+        super().__init__(conn_info, **kwargs)
+        self._init_cache(cache)
+
+    def create_workday(self, courier_id: int, start_ts) -> dict:
+        return self._write(lambda: super(CachedWorkdayRepo, self).create_workday(courier_id, start_ts),
+                           keys=[("courier", courier_id)])
+
+    def close_workday(self, workday_id: int, end_ts) -> dict:
+        return self._write(lambda: super(CachedWorkdayRepo, self).close_workday(workday_id, end_ts),
+                           namespace="courier")
@@ -0,0 +1,416 @@
+import threading
+import time
+import warnings
+from typing import Callable, Optional
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+
+class PoolTimeoutError(psycopg2.pool.PoolError):
+    """No se ha podido obtener una conexión del pool en el tiempo indicado."""
+
+
+class RollbackOnlyError(psycopg2.DatabaseError):
+    """Un repositorio pidió rollback dentro de una transacción que iba a terminar con commit."""
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones PostgreSQL compartido y seguro entre hilos.
+
+    - Mantiene hasta `max_size` conexiones abiertas y reutiliza las ociosas.
+    - Precalienta `min_size` conexiones en el primer uso.
+    - Comprueba la salud de cada conexión al entregarla (descarta las cerradas o rotas).
+    - Si el pool está lleno, espera hasta `timeout` segundos a que se libere una conexión.
+    """
+
+    def __init__(self, conn_info: dict, min_size: int = 1, max_size: int = 10,
+                 timeout: float = 30.0, ping_interval: float = 30.0,
+                 connect: Optional[Callable] = None):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError("Tamaños de pool no válidos")
+
+        self.conn_info = dict(conn_info)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        # Segundos que puede estar una conexión ociosa antes de hacerle un ping al entregarla
+        self.ping_interval = ping_interval
+        self._connect = connect or psycopg2.connect
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = []          # [(conn, instante_de_devolucion)]
+        self._in_use = set()     # ids de conexiones prestadas
+        self._opening = 0        # conexiones en proceso de apertura (reservan hueco)
+        self._warmed_up = False
+        self._closed = False
+        # Conexión ligada a la transacción (unidad de trabajo) abierta en cada hilo
+        self._local = threading.local()
+
+        self._stats = {
+            "checkouts": 0,
+            "waits": 0,
+            "wait_time": 0.0,
+            "timeouts": 0,
+            "opened": 0,
+            "closed": 0,
+            "discarded": 0,
+        }
+
+    # --- API pública ---
+    def getconn(self):
+        """Presta una conexión sana del pool (bloquea si está lleno)."""
+        self._warm_up()
+        deadline = time.monotonic() + self.timeout
+
+        with self._cond:
+            waited = False
+            wait_started = None
+            while True:
+                if self._closed:
+                    raise psycopg2.pool.PoolError("El pool está cerrado")
+
+                if self._idle:
+                    conn, released_at = self._idle.pop()
+                    self._in_use.add(id(conn))
+                    break
+
+                if self._total() < self.max_size:
+                    self._opening += 1
+                    conn, released_at = None, None
+                    break
+
+                # Pool lleno: esperar a que alguien devuelva una conexión
+                if not waited:
+                    waited = True
+                    wait_started = time.monotonic()
+                    self._stats["waits"] += 1
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    self._stats["wait_time"] += time.monotonic() - wait_started
+                    raise PoolTimeoutError(
+                        f"Tiempo de espera agotado ({self.timeout}s) esperando una conexión libre"
+                    )
+                self._cond.wait(remaining)
+
+            if waited:
+                self._stats["wait_time"] += time.monotonic() - wait_started
+
+        # La apertura y el ping se hacen fuera del lock para no bloquear al resto de hilos
+        if conn is None:
+            conn = self._open_reserved()
+        elif not self._is_healthy(conn, released_at):
+            # Se cierra la rota y se reutiliza su hueco para abrir una nueva
+            with self._cond:
+                self._in_use.discard(id(conn))
+                self._opening += 1
+                self._stats["discarded"] += 1
+            self._close_quietly(conn)
+            conn = self._open_reserved()
+
+        with self._cond:
+            self._stats["checkouts"] += 1
+        return conn
+
+    def putconn(self, conn, discard: bool = False) -> None:
+        """Devuelve una conexión al pool. Las rotas (o `discard=True`) se cierran."""
+        with self._cond:
+            if id(conn) not in self._in_use:
+                return
+            self._in_use.discard(id(conn))
+
+        if not discard and not self._closed:
+            discard = not self._reset(conn)
+
+        with self._cond:
+            if discard or self._closed:
+                self._close_quietly(conn)
+                self._stats["discarded" if discard else "closed"] += 1
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def connection(self):
+        """
+        Context manager: `with pool.connection() as conn:` presta y devuelve una conexión.
+        Si el hilo tiene una transacción abierta con `transaction()`, se reutiliza su conexión.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return _JoinedConnection(conn, self._local)
+        return _PooledConnection(self)
+
+    def transaction(self):
+        """
+        Unidad de trabajo: todas las llamadas a repositorios de este pool hechas en el mismo
+        hilo dentro del `with` comparten una conexión y un único commit (o rollback si falla).
+        Las transacciones anidadas se unen a la exterior.
+        """
+        return _Transaction(self)
+
+    def in_transaction(self) -> bool:
+        return getattr(self._local, "conn", None) is not None
+
+    def call_after_transaction(self, callback: Callable[[], None]) -> None:
+        """
+        Ejecuta `callback` tras el commit de la transacción abierta en este hilo (si se deshace,
+        no se ejecuta). Sin transacción abierta se ejecuta en el momento.
+        """
+        if self.in_transaction():
+            self._local.after.append(callback)
+        else:
+            callback()
+
+    def stats(self) -> dict:
+        """Estadísticas del pool: esperas, préstamos y conexiones abiertas/ociosas/en uso."""
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                "open": self._total(),
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            })
+            return data
+
+    def closeall(self) -> None:
+        """Cierra todas las conexiones ociosas; las prestadas se cerrarán al devolverse."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            for conn, _ in idle:
+                self._close_quietly(conn)
+                self._stats["closed"] += 1
+            self._cond.notify_all()
+
+    # --- Internos ---
+    def _total(self) -> int:
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _warm_up(self) -> None:
+        if self._warmed_up:
+            return
+        with self._cond:
+            if self._warmed_up:
+                return
+            self._warmed_up = True
+            missing = max(0, self.min_size - self._total())
+            self._opening += missing
+
+        for i in range(missing):
+            try:
+                conn = self._connect(**self.conn_info)
+            except Exception:
+                # Libera los huecos reservados que ya no se van a abrir
+                with self._cond:
+                    self._opening -= missing - i
+                    self._cond.notify_all()
+                raise
+            with self._cond:
+                self._opening -= 1
+                self._stats["opened"] += 1
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _open_reserved(self):
+        """Abre una conexión para un hueco ya reservado en `_opening`."""
+        try:
+            conn = self._connect(**self.conn_info)
+        except Exception:
+            with self._cond:
+                self._opening -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._opening -= 1
+            self._stats["opened"] += 1
+            self._in_use.add(id(conn))
+        return conn
+
+    def _is_healthy(self, conn, released_at: float) -> bool:
+        if getattr(conn, "closed", 0):
+            return False
+        if time.monotonic() - released_at < self.ping_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _reset(self, conn) -> bool:
+        """Deja la conexión lista para reutilizarse. Devuelve False si hay que descartarla."""
+        if getattr(conn, "closed", 0):
+            return False
+        try:
+            status = conn.get_transaction_status()
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                return False
+            if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+class _PooledConnection:
+    """
+    Imita el `with conn:` de psycopg2 (commit si todo va bien, rollback si hay excepción)
+    y además devuelve la conexión al pool al salir.
+    """
+
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.conn = None
+
+    def __enter__(self):
+        self.conn = self.pool.getconn()
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        conn, self.conn = self.conn, None
+        try:
+            if not conn.closed:
+                if exc_type is None:
+                    conn.commit()
+                else:
+                    conn.rollback()
+        except Exception:
+            self.pool.putconn(conn, discard=True)
+            if exc_type is None:
+                raise
+            return False
+        self.pool.putconn(conn)
+        return False
+
+
+class _TransactionConnection:
+    """
+    Conexión vista por los repositorios dentro de una unidad de trabajo: delega en la real,
+    pero ignora sus commit/close, que decide la transacción al terminar. Un rollback no se
+    hace en el momento, pero marca la transacción para que al terminar no pueda confirmarse.
+    """
+
+    def __init__(self, conn, state=None):
+        self._conn = conn
+        self._state = state
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        if self._state is not None:
+            self._state.rollback_only = True
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class _JoinedConnection:
+    def __init__(self, conn, state):
+        self.conn = conn
+        self.state = state
+
+    def __enter__(self):
+        return _TransactionConnection(self.conn, self.state)
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+class _Transaction:
+    def __init__(self, pool: ConnectionPool):
+        self.pool = pool
+        self.owner = False
+
+    def __enter__(self):
+        local = self.pool._local
+        if getattr(local, "conn", None) is not None:
+            return _TransactionConnection(local.conn, local)
+
+        self.owner = True
+        self._ctx = _PooledConnection(self.pool)
+        local.conn = self._ctx.__enter__()
+        local.after = []
+        local.rollback_only = False
+        return _TransactionConnection(local.conn, local)
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.owner:
+            return False
+        local = self.pool._local
+        local.conn = None
+        callbacks, local.after = local.after, []
+        rollback_only, local.rollback_only = local.rollback_only, False
+
+        if exc_type is not None:
+            return self._ctx.__exit__(exc_type, exc, tb)
+        if rollback_only:
+            # Nadie lanzó excepción, pero un repositorio deshizo su parte: no se confirma nada
+            error = RollbackOnlyError("La transacción se ha deshecho: un repositorio pidió rollback")
+            self._ctx.__exit__(RollbackOnlyError, error, None)
+            raise error
+        self._ctx.__exit__(None, None, None)
+
+        # Solo tras el commit; un fallo aquí no debe parecer un fallo de la transacción
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[ConnectionPool] Error tras el commit: {e}")
+        return False
+
+
+# Un único pool por DSN, compartido por todos los repositorios del proceso
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_key(conn_info: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in conn_info.items()))
+
+
+def get_pool(conn_info: dict, min_size: int = 1, max_size: int = 10, **kwargs) -> ConnectionPool:
+    """
+    Devuelve el pool compartido para `conn_info`, creándolo la primera vez.
+
+    Solo la llamada que crea el pool fija `min_size`/`max_size`; si una llamada posterior pide
+    otros tamaños se avisa con un RuntimeWarning y se devuelve el pool existente sin cambiarlo.
+    """
+    key = _pool_key(conn_info)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(conn_info, min_size=min_size, max_size=max_size, **kwargs)
+            _pools[key] = pool
+        elif (pool.min_size, pool.max_size) != (min_size, max_size):
+            warnings.warn(
+                f"El pool de esta conexión ya existe con min_size={pool.min_size}, max_size={pool.max_size}; "
+                f"se ignoran min_size={min_size}, max_size={max_size}",
+                RuntimeWarning, stacklevel=2)
+        return pool
+
+
+def close_all_pools() -> None:
+    """Cierra todos los pools (al salir de la aplicación)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.closeall()
@@ -1,13 +1,19 @@
 import psycopg2
 import psycopg2.extras
 import os
-from typing import Optional, List, Union
-from moval.domain.enums import Role, ShipmentStatus
+import uuid
+from typing import Optional, List, Union, Iterator
+from moval.domain.enums import Role, ShipmentStatus, GeocodeStatus
+from moval.persistence.connection_pool import get_pool
 from datetime import datetime
 
 # Clase base para manejar la conexión a PostgreSQL
 class BasePostgresRepo:
-    def __init__(self, conn_info: dict = None):
+    # Tamaño del pool compartido (un pool por DSN para todos los repositorios)
+    POOL_MIN_SIZE = 1
+    POOL_MAX_SIZE = 10
+
+    def __init__(self, conn_info: dict = None, pool_min_size: int | None = None, pool_max_size: int | None = None):
         if conn_info is None:
             self.conn_info = {
                 "host": "localhost",
@@ -18,10 +24,57 @@ class BasePostgresRepo:
             }
         else:
             self.conn_info = conn_info
+        self.pool_min_size = pool_min_size if pool_min_size is not None else self.POOL_MIN_SIZE
+        self.pool_max_size = pool_max_size if pool_max_size is not None else self.POOL_MAX_SIZE
+
+    def _get_pool(self):
+        # El pool se crea al primer uso: construir un repositorio no abre conexiones
+        return get_pool(self.conn_info, min_size=self.pool_min_size, max_size=self.pool_max_size)
 
     def _get_connection(self):
-        conn = psycopg2.connect(**self.conn_info)
-        return conn
+        # Se usa como `with self._get_connection() as conn:`; al salir se hace commit/rollback
+        # y la conexión vuelve al pool en lugar de quedarse abierta.
+        return self._get_pool().connection()
+
+    def transaction(self):
+        """
+        Unidad de trabajo sobre el pool compartido. Uso:
+
+            with shipment_repo.transaction():
+                shipment_repo.update(...)
+                incident_repo.create_incident(...)
+
+        Todos los repositorios con la misma conexión (DSN) participan sin cambiar sus firmas:
+        comparten conexión y se hace un único commit al salir (rollback si hay excepción).
+        """
+        return self._get_pool().transaction()
+
+    def pool_stats(self) -> dict:
+        return self._get_pool().stats()
+
+    def in_transaction(self) -> bool:
+        return self._get_pool().in_transaction()
+
+    # Filas que trae cada viaje al servidor en las lecturas en streaming
+    STREAM_ITERSIZE = 2000
+
+    def _stream(self, query: str, params=None, itersize: int | None = None) -> Iterator[dict]:
+        """
+        Ejecuta `query` con un cursor con nombre (del lado del servidor) y va devolviendo las filas
+        de `itersize` en `itersize`: la memoria no crece con el tamaño del resultado.
+        La conexión queda prestada hasta que se consume o se cierra el generador.
+        """
+        with self._get_connection() as conn:
+            name = f"moval_stream_{uuid.uuid4().hex}"
+            with conn.cursor(name=name, cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.itersize = itersize or self.STREAM_ITERSIZE
+                cursor.execute(query, params)
+                for row in cursor:
+                    yield dict(row)
+
+    def call_after_transaction(self, callback) -> None:
+        """Ejecuta `callback` al cerrar la transacción en curso (o ya, si no hay ninguna)."""
+        self._get_pool().call_after_transaction(callback)
 
 class UserRepo(BasePostgresRepo):
     def get_by_email(self, email: str):
@@ -78,14 +131,17 @@ class UserRepo(BasePostgresRepo):
             conn.commit()
             return new_id
 
+    LIST_BY_ROLE_SQL = "SELECT id, dni, nombre, apellidos, email, rol as role FROM Usuario WHERE rol = %s"
+
     def list_by_role(self, role: str) -> List[dict]:
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute(
-                    "SELECT id, dni, nombre, apellidos, email, rol as role FROM Usuario WHERE rol = %s",
-                    (role,)
-                )
+                cursor.execute(self.LIST_BY_ROLE_SQL, (role,))
                 return [dict(row) for row in cursor.fetchall()]
+
+    def iter_by_role(self, role: str, itersize: int | None = None) -> Iterator[dict]:
+        """Como list_by_role, pero en streaming (cursor del lado del servidor)."""
+        return self._stream(self.LIST_BY_ROLE_SQL + " ORDER BY id", (role,), itersize)
         
     def delete(self, user_id: int) -> bool:
         if not user_id:
@@ -126,21 +182,61 @@ class ShipmentRepo(BasePostgresRepo):
                 row = cursor.fetchone()
                 return dict(row) if row else None
 
-    def assign(self, shipment_id: list[int], courier_id: int) -> None:
+    def get_many(self, shipment_ids: list[int]) -> List[dict]:
+        """Recupera varios paquetes en una sola consulta (los ids inexistentes se omiten)."""
+        if not shipment_ids:
+            return []
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute("SELECT * FROM Paquete WHERE id = ANY(%s) ORDER BY id", (list(shipment_ids),))
+                return [dict(row) for row in cursor.fetchall()]
+
+    def assign(self, shipment_id: list[int], courier_id: int) -> list[int]:
+        """
+        Asigna en bloque con una única sentencia. Solo se asigna si TODOS los paquetes existen
+        y están en REGISTRADO o INCIDENCIA (todo o nada); devuelve los ids actualizados, de modo
+        que si falta alguno es que hubo un conflicto de estado.
+        """
+        ids = list(dict.fromkeys(shipment_id))
+        if not ids:
+            return []
+        assignable = (ShipmentStatus.PENDING.value, ShipmentStatus.INCIDENT.value)
         with self._get_connection() as conn:
             with conn.cursor() as cursor:
-                for sid in shipment_id:
-                    cursor.execute(
-                        "UPDATE Paquete SET id_mensajero = %s, estado = 'ASIGNADO', ultima_incidencia = NULL, fecha_incidencia = NULL WHERE id = %s",
-                        (courier_id, sid)
+                cursor.execute(
+                    """
+                    WITH solicitados AS (
+                        SELECT unnest(%(ids)s::int[]) AS id
+                    ), conflictos AS (
+                        SELECT s.id FROM solicitados s
+                        LEFT JOIN Paquete p ON p.id = s.id
+                        WHERE p.id IS NULL OR p.estado NOT IN %(assignable)s
                     )
+                    UPDATE Paquete
+                    SET id_mensajero = %(courier_id)s, estado = 'ASIGNADO', ultima_incidencia = NULL, fecha_incidencia = NULL
+                    WHERE id = ANY(%(ids)s)
+                      AND estado IN %(assignable)s
+                      AND NOT EXISTS (SELECT 1 FROM conflictos)
+                    RETURNING id
+                    """,
+                    {"ids": ids, "assignable": assignable, "courier_id": courier_id}
+                )
+                updated = [row[0] for row in cursor.fetchall()]
+            if len(updated) != len(ids):
+                # Estado cambiado entre la validación y la escritura: no se asigna nada (dentro de una
+                # transacción, el rollback la marca para que tampoco pueda confirmarse después)
+                conn.rollback()
+                return []
             conn.commit()
+            return updated
 
     def unassign(self, shipment_id: int) -> None:
+        # El ETA era el de la ruta del mensajero: al volver a la cola ya no vale
         with self._get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
-                    "UPDATE Paquete SET id_mensajero = NULL, estado = 'REGISTRADO' WHERE id = %s",
+                    "UPDATE Paquete SET id_mensajero = NULL, estado = 'REGISTRADO', fecha_estimada_entrega = NULL "
+                    "WHERE id = %s",
                     (shipment_id,)
                 )
             conn.commit()
@@ -169,15 +265,40 @@ class ShipmentRepo(BasePostgresRepo):
                     )
             conn.commit()
 
+    def set_estimated_deliveries(self, etas: dict) -> int:
+        """
+        Guarda en bloque {id_paquete: fecha_estimada} en fecha_estimada_entrega con un único
+        UPDATE ... FROM (VALUES ...). Devuelve el nº de filas actualizadas.
+        """
+        if not etas:
+            return 0
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                psycopg2.extras.execute_values(
+                    cursor,
+                    """
+                    UPDATE Paquete p SET fecha_estimada_entrega = v.eta
+                    FROM (VALUES %s) AS v(id, eta)
+                    WHERE p.id = v.id
+                    """,
+                    list(etas.items()),
+                    template="(%s::int, %s::timestamp)"
+                )
+                updated = cursor.rowcount
+            conn.commit()
+            return updated
+
     def create(self, shipment_data: dict) -> int:
+        # Sin coordenadas el paquete queda pendiente de geocodificar (lo resuelve GeocodeResolver)
         with self._get_connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(
                     """
                     INSERT INTO Paquete (
                         codigo_seguimiento, descripcion, peso, direccion_origen, direccion_destino, 
-                        latitud, longitud, id_cliente, id_mensajero, estado, fecha_entrega_real
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NULL, 'REGISTRADO', NULL) RETURNING id
+                        latitud, longitud, id_cliente, id_mensajero, estado, fecha_entrega_real,
+                        estado_geocodificacion
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NULL, 'REGISTRADO', NULL, %s) RETURNING id
                     """,
                     (
                         shipment_data['codigo_seguimiento'],
@@ -187,13 +308,107 @@ class ShipmentRepo(BasePostgresRepo):
                         shipment_data['direccion_destino'],
                         shipment_data['latitud'],
                         shipment_data['longitud'],
-                        shipment_data['id_cliente']
+                        shipment_data['id_cliente'],
+                        self._geocode_status(shipment_data)
                     )
                 )
                 new_id = cursor.fetchone()[0]
             conn.commit()
             return new_id
 
+    def create_many(self, shipments: list[dict], page_size: int = 1000) -> list[int]:
+        """
+        Inserta varios paquetes (los mismos campos que `create`) con execute_values: una sentencia
+        por cada `page_size` filas en lugar de una por paquete. Devuelve los ids en el mismo orden.
+        """
+        if not shipments:
+            return []
+        rows = [
+            (s['codigo_seguimiento'], s['descripcion'], s['peso'], s['direccion_origen'], s['direccion_destino'],
+             s['latitud'], s['longitud'], s['id_cliente'], self._geocode_status(s))
+            for s in shipments
+        ]
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                result = psycopg2.extras.execute_values(
+                    cursor,
+                    """
+                    INSERT INTO Paquete (
+                        codigo_seguimiento, descripcion, peso, direccion_origen, direccion_destino,
+                        latitud, longitud, id_cliente, estado_geocodificacion, estado
+                    ) VALUES %s RETURNING id
+                    """,
+                    rows,
+                    template="(%s, %s, %s, %s, %s, %s, %s, %s, %s, 'REGISTRADO')",
+                    page_size=page_size,
+                    fetch=True
+                )
+            conn.commit()
+            return [row[0] for row in result]
+
+    @staticmethod
+    def _geocode_status(shipment_data: dict) -> str:
+        if shipment_data.get('latitud') is None or shipment_data.get('longitud') is None:
+            return GeocodeStatus.PENDING.value
+        return GeocodeStatus.RESOLVED.value
+
+    def list_pending_geocodes(self, now: datetime, limit: int = 50) -> List[dict]:
+        """Paquetes pendientes de geocodificar cuyo próximo intento ya ha llegado, los más antiguos primero."""
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute(
+                    """
+                    SELECT id, direccion_destino, id_mensajero, intentos_geocodificacion FROM Paquete
+                    WHERE estado_geocodificacion = 'PENDIENTE'
+                      AND (proximo_intento_geocodificacion IS NULL OR proximo_intento_geocodificacion <= %s)
+                    ORDER BY proximo_intento_geocodificacion NULLS FIRST, id
+                    LIMIT %s
+                    """,
+                    (now, limit)
+                )
+                return [dict(row) for row in cursor.fetchall()]
+
+    def set_geocode(self, shipment_id: int, lat: float, lon: float) -> int | None:
+        """Guarda las coordenadas de un paquete pendiente. Devuelve su mensajero (si lo tiene)."""
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE Paquete SET latitud = %s, longitud = %s, estado_geocodificacion = 'RESUELTA',
+                        proximo_intento_geocodificacion = NULL
+                    WHERE id = %s RETURNING id_mensajero
+                    """,
+                    (lat, lon, shipment_id)
+                )
+                row = cursor.fetchone()
+            conn.commit()
+            return row[0] if row else None
+
+    def record_geocode_failure(self, shipment_id: int, next_attempt: datetime | None) -> None:
+        """Cuenta un intento fallido; sin `next_attempt` se da por perdido (FALLIDA)."""
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    """
+                    UPDATE Paquete SET intentos_geocodificacion = intentos_geocodificacion + 1,
+                        proximo_intento_geocodificacion = %s,
+                        estado_geocodificacion = CASE WHEN %s IS NULL THEN 'FALLIDA' ELSE estado_geocodificacion END
+                    WHERE id = %s
+                    """,
+                    (next_attempt, next_attempt, shipment_id)
+                )
+            conn.commit()
+
+    def postpone_geocode(self, shipment_id: int, next_attempt: datetime) -> None:
+        """Aplaza el siguiente intento sin contarlo (Nominatim no estaba disponible)."""
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    "UPDATE Paquete SET proximo_intento_geocodificacion = %s WHERE id = %s",
+                    (next_attempt, shipment_id)
+                )
+            conn.commit()
+
     def create_copy(self, original_shipment: dict) -> int:
         with self._get_connection() as conn:
             with conn.cursor() as cursor:
@@ -202,8 +417,9 @@ class ShipmentRepo(BasePostgresRepo):
                     """
                     INSERT INTO Paquete (
                         codigo_seguimiento, descripcion, peso, direccion_origen, direccion_destino, 
-                        latitud, longitud, id_cliente, id_mensajero, estado, fecha_entrega_real
-                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NULL, 'REGISTRADO', NULL) RETURNING id
+                        latitud, longitud, id_cliente, id_mensajero, estado, fecha_entrega_real,
+                        estado_geocodificacion
+                    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NULL, 'REGISTRADO', NULL, %s) RETURNING id
                     """,
                     (
                         new_code,
@@ -213,41 +429,142 @@ class ShipmentRepo(BasePostgresRepo):
                         original_shipment['direccion_destino'],
                         original_shipment['latitud'],
                         original_shipment['longitud'],
-                        original_shipment['id_cliente']
+                        original_shipment['id_cliente'],
+                        self._geocode_status(original_shipment)
                     )
                 )
                 new_id = cursor.fetchone()[0]
             conn.commit()
             return new_id
 
-    def list_all(self, filters: dict | None = None) -> List[dict]:
+    # Claves de ordenación permitidas para la paginación por cursor (keyset)
+    SORT_KEYS = {
+        "id": None,
+        "fecha_creacion": "p.fecha_creacion",
+    }
+
+    def list_all(self, filters: dict | None = None, page_size: int | None = None,
+                 after_id: int | None = None, after_ts: datetime | None = None,
+                 sort_by: str = "id", descending: bool = False,
+                 statuses: list[str] | None = None) -> List[dict]:
+        """
+        Lista paquetes (con el nombre del cliente). Sin `page_size` devuelve todos.
+
+        Paginación por cursor: se pide la siguiente página pasando el `id` (y, si se ordena por
+        fecha, también la `fecha_creacion`) de la última fila recibida en `after_id`/`after_ts`.
+        Así cada página cuesta lo mismo, sin OFFSET, por muy atrás que esté.
+        """
+        query, params = self._list_all_query(filters, page_size, after_id, after_ts, sort_by, descending, statuses)
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute(query, params)
+                return [dict(row) for row in cursor.fetchall()]
+
+    def iter_all(self, filters: dict | None = None, itersize: int | None = None, **page) -> Iterator[dict]:
+        """
+        Como list_all (mismos filtros y orden), pero en streaming con un cursor del lado del
+        servidor: para exportaciones y listados enormes sin cargar todo en memoria.
+        """
+        query, params = self._list_all_query(filters, **page)
+        return self._stream(query, params, itersize)
+
+    def _list_all_query(self, filters: dict | None = None, page_size: int | None = None,
+                        after_id: int | None = None, after_ts: datetime | None = None,
+                        sort_by: str = "id", descending: bool = False,
+                        statuses: list[str] | None = None) -> tuple:
+        if sort_by not in self.SORT_KEYS:
+            raise ValueError(f"Clave de ordenación no soportada: {sort_by}")
+        sort_col = self.SORT_KEYS[sort_by]
+
         query = """
             SELECT p.*, u.nombre || ' ' || u.apellidos as cliente_nombre 
             FROM Paquete p
             JOIN Usuario u ON p.id_cliente = u.id
         """
+        conditions = []
         params = []
         if filters:
-            conditions = [f"p.{k} = %s" for k in filters.keys()]
+            conditions += [f"p.{k} = %s" for k in filters.keys()]
+            params += list(filters.values())
+        if statuses:
+            conditions.append("p.estado = ANY(%s)")
+            params.append(list(statuses))
+
+        op = "<" if descending else ">"
+        if sort_col is None:
+            if after_id is not None:
+                conditions.append(f"p.id {op} %s")
+                params.append(after_id)
+        elif after_id is not None or after_ts is not None:
+            if after_id is None or after_ts is None:
+                raise ValueError("Para ordenar por fecha el cursor necesita after_id y after_ts")
+            conditions.append(f"({sort_col}, p.id) {op} (%s, %s)")
+            params += [after_ts, after_id]
+
+        if conditions:
             query += " WHERE " + " AND ".join(conditions)
+
+        direction = "DESC" if descending else "ASC"
+        if sort_col is None:
+            query += f" ORDER BY p.id {direction}"
+        else:
+            query += f" ORDER BY {sort_col} {direction}, p.id {direction}"
+
+        if page_size is not None:
+            query += " LIMIT %s"
+            params.append(int(page_size))
+
+        return query, params
+
+    def list_by_courier(self, courier_id: int, filters: dict | None = None, **page) -> List[dict]:
+        f = (filters or {}).copy()
+        f["id_mensajero"] = courier_id
+        return self.list_all(f, **page)
+
+    def list_by_customer(self, customer_id: int, filters: dict | None = None, **page) -> List[dict]:
+        f = (filters or {}).copy()
+        f["id_cliente"] = customer_id
+        return self.list_all(f, **page)
+
+    def count(self, filters: dict | None = None) -> int:
+        query = "SELECT COUNT(*) FROM Paquete"
+        params = []
+        if filters:
+            query += " WHERE " + " AND ".join([f"{k} = %s" for k in filters.keys()])
             params = list(filters.values())
         with self._get_connection() as conn:
-            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+            with conn.cursor() as cursor:
                 cursor.execute(query, params)
-                return [dict(row) for row in cursor.fetchall()]
+                return cursor.fetchone()[0]
 
-    def list_by_courier(self, courier_id: int, filters: dict | None = None) -> List[dict]:
+    def count_by_courier(self, courier_id: int, filters: dict | None = None) -> int:
         f = (filters or {}).copy()
         f["id_mensajero"] = courier_id
-        return self.list_all(f)
+        return self.count(f)
 
-    def list_by_customer(self, customer_id: int, filters: dict | None = None) -> List[dict]:
+    def count_by_customer(self, customer_id: int, filters: dict | None = None) -> int:
         f = (filters or {}).copy()
         f["id_cliente"] = customer_id
-        return self.list_all(f)
+        return self.count(f)
 
-    def count_by_courier(self, courier_id: int, filters: dict | None = None) -> int:
-        return len(self.list_by_courier(courier_id, filters))
+    def count_by_status(self, courier_id: int | None = None, customer_id: int | None = None) -> dict:
+        """Devuelve {estado: número de paquetes} en una sola consulta agregada."""
+        conditions = []
+        params = []
+        if courier_id is not None:
+            conditions.append("id_mensajero = %s")
+            params.append(courier_id)
+        if customer_id is not None:
+            conditions.append("id_cliente = %s")
+            params.append(customer_id)
+        query = "SELECT estado, COUNT(*) FROM Paquete"
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " GROUP BY estado"
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(query, params)
+                return {estado: total for estado, total in cursor.fetchall()}
     
     def find_next_delivered_unnotified_for_customer(self, customer_id):
         pass
@@ -270,7 +587,7 @@ class ShipmentRepo(BasePostgresRepo):
                 cursor.execute("""
                     UPDATE Paquete 
                     SET notificado_cliente = 1 
-                    WHERE id_cliente = %s AND estado = 'ENTREGADO' AND (notificado_cliente IS NULL OR notificado_cliente = 0)
+                    WHERE id_cliente = %s AND estado = 'ENTREGADO' AND COALESCE(notificado_cliente, 0) = 0
                 """, (customer_id,))
             conn.commit()
 
@@ -301,6 +618,29 @@ class CourierRepo(BasePostgresRepo):
                 row = cursor.fetchone()
                 return row["count"] < limit
 
+    def active_loads(self, courier_ids: list[int]) -> dict:
+        """
+        Carga actual de varios mensajeros en una consulta: {id: {"paquetes", "peso"}} con los
+        paquetes ASIGNADO/EN_REPARTO (los mensajeros sin paquetes aparecen con 0).
+        """
+        loads = {cid: {"paquetes": 0, "peso": 0.0} for cid in courier_ids}
+        if not courier_ids:
+            return loads
+        with self._get_connection() as conn:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
+                cursor.execute(
+                    """
+                    SELECT id_mensajero, COUNT(*) AS paquetes, COALESCE(SUM(peso), 0) AS peso
+                    FROM Paquete
+                    WHERE id_mensajero = ANY(%s) AND estado IN ('ASIGNADO', 'EN_REPARTO')
+                    GROUP BY id_mensajero
+                    """,
+                    (list(courier_ids),)
+                )
+                for row in cursor.fetchall():
+                    loads[row["id_mensajero"]] = {"paquetes": row["paquetes"], "peso": float(row["peso"])}
+        return loads
+
     def get(self, courier_id: int) -> dict | None:
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
@@ -318,6 +658,9 @@ class CourierRepo(BasePostgresRepo):
                 return courier
 
     def list_all_with_workday_info(self) -> List[dict]:
+        # Consulta por conjuntos: la última jornada de cada mensajero sale de un DISTINCT ON
+        # (índice Jornada(id_mensajero, id DESC)) y la media de los agregados de
+        # EstadisticaValoracion, en vez de dos subconsultas correlacionadas por cada mensajero.
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
                 query = """
@@ -326,33 +669,92 @@ class CourierRepo(BasePostgresRepo):
                         j.fecha_inicio,
                         j.fecha_fin,
                         j.estado as estado_jornada,
-                        (SELECT AVG(puntuacion) FROM Valoracion v 
-                        JOIN Paquete p ON v.id_paquete = p.id 
-                        WHERE p.id_mensajero = u.id) as media
+                        ev.suma_puntuacion::numeric / NULLIF(ev.num_valoraciones, 0) as media
                     FROM Usuario u
                     LEFT JOIN (
-                        SELECT id, id_mensajero, fecha_inicio, fecha_fin, estado
-                        FROM Jornada j1
-                        WHERE id = (SELECT MAX(id) FROM Jornada j2 WHERE j2.id_mensajero = j1.id_mensajero)
+                        SELECT DISTINCT ON (id_mensajero) id_mensajero, fecha_inicio, fecha_fin, estado
+                        FROM Jornada
+                        ORDER BY id_mensajero, id DESC
                     ) j ON u.id = j.id_mensajero
+                    LEFT JOIN EstadisticaValoracion ev ON u.id = ev.id_mensajero
                     WHERE u.rol = 'COURIER'
+                    ORDER BY u.id
                 """
                 cursor.execute(query)
                 return [dict(row) for row in cursor.fetchall()]
 
 
 class RatingRepo(BasePostgresRepo):
-    def create_delivery_rating(self, shipment_id: int, customer_id: int, courier_id: int, score: int, comment: str | None):
+    # Columnas del histograma de estrellas en EstadisticaValoracion
+    STAR_COLUMNS = {score: f"estrellas_{score}" for score in range(1, 6)}
+
+    def create_delivery_rating(self, shipment_id: int, customer_id: int, courier_id: int, score: int, comment: str | None) -> dict:
         with self._get_connection() as conn:
-            with conn.cursor() as cursor:
+            with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
                 cursor.execute(
-                    "INSERT INTO Valoracion (id_paquete, id_autor, puntuacion, comentario) VALUES (%s, %s, %s, %s)",
+                    "INSERT INTO Valoracion (id_paquete, id_autor, puntuacion, comentario) VALUES (%s, %s, %s, %s) RETURNING id, fecha",
                     (shipment_id, customer_id, score, comment)
                 )
+                row = dict(cursor.fetchone())
+            conn.commit()
+            return row
+
+    def record_courier_rating(self, courier_id: int, score: int, rated_at=None) -> None:
+        """
+        Suma una valoración a los agregados del mensajero (upsert atómico, sin releer el histórico).
+        Debe llamarse en la misma transacción que create_delivery_rating.
+        """
+        if score not in self.STAR_COLUMNS:
+            raise ValueError(f"Puntuación fuera de rango: {score}")
+        star_col = self.STAR_COLUMNS[score]
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"""
+                    INSERT INTO EstadisticaValoracion (id_mensajero, num_valoraciones, suma_puntuacion, {star_col}, fecha_ultima_valoracion)
+                    VALUES (%(courier)s, 1, %(score)s, 1, COALESCE(%(rated_at)s, CURRENT_TIMESTAMP))
+                    ON CONFLICT (id_mensajero) DO UPDATE SET
+                        num_valoraciones = EstadisticaValoracion.num_valoraciones + 1,
+                        suma_puntuacion = EstadisticaValoracion.suma_puntuacion + EXCLUDED.suma_puntuacion,
+                        {star_col} = EstadisticaValoracion.{star_col} + 1,
+                        fecha_ultima_valoracion = GREATEST(EstadisticaValoracion.fecha_ultima_valoracion,
+                                                           EXCLUDED.fecha_ultima_valoracion)
+                """, {"courier": courier_id, "score": score, "rated_at": rated_at})
             conn.commit()
 
     def recalc_courier_avg(self, courier_id: int) -> None:
-        pass
+        """Recalcula desde cero los agregados de un mensajero (reparación puntual)."""
+        with self._get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    INSERT INTO EstadisticaValoracion (
+                        id_mensajero, num_valoraciones, suma_puntuacion,
+                        estrellas_1, estrellas_2, estrellas_3, estrellas_4, estrellas_5,
+                        fecha_ultima_valoracion
+                    )
+                    SELECT
+                        %(courier)s,
+                        COUNT(v.id),
+                        COALESCE(SUM(v.puntuacion), 0),
+                        COUNT(*) FILTER (WHERE v.puntuacion = 1),
+                        COUNT(*) FILTER (WHERE v.puntuacion = 2),
+                        COUNT(*) FILTER (WHERE v.puntuacion = 3),
+                        COUNT(*) FILTER (WHERE v.puntuacion = 4),
+                        COUNT(*) FILTER (WHERE v.puntuacion = 5),
+                        MAX(v.fecha)
+                    FROM Valoracion v
+                    JOIN Paquete p ON v.id_paquete = p.id
+                    WHERE p.id_mensajero = %(courier)s
+                    ON CONFLICT (id_mensajero) DO UPDATE SET
+                        num_valoraciones = EXCLUDED.num_valoraciones,
+                        suma_puntuacion = EXCLUDED.suma_puntuacion,
+                        estrellas_1 = EXCLUDED.estrellas_1,
+                        estrellas_2 = EXCLUDED.estrellas_2,
+                        estrellas_3 = EXCLUDED.estrellas_3,
+                        estrellas_4 = EXCLUDED.estrellas_4,
+                        estrellas_5 = EXCLUDED.estrellas_5,
+                        fecha_ultima_valoracion = EXCLUDED.fecha_ultima_valoracion
+                """, {"courier": courier_id})
+            conn.commit()
 
     def has_rating_for_shipment(self, shipment_id: int, customer_id: int) -> bool:
         with self._get_connection() as conn:
@@ -363,18 +765,32 @@ class RatingRepo(BasePostgresRepo):
                 )
                 return cursor.fetchone() is not None
 
-    def average_by_courier(self, courier_id: int) -> float | None:
+    def get_courier_stats(self, courier_id: int) -> dict:
+        """Agregados del mensajero: nº de valoraciones, media, reparto por estrellas y última fecha."""
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT AVG(v.puntuacion) as avg_score 
-                    FROM Valoracion v
-                    JOIN Paquete p ON v.id_paquete = p.id
-                    WHERE p.id_mensajero = %s
-                """, (courier_id,))
+                cursor.execute(
+                    "SELECT * FROM EstadisticaValoracion WHERE id_mensajero = %s",
+                    (courier_id,)
+                )
                 row = cursor.fetchone()
-                val = row["avg_score"]
-                return float(val) if val else None
+
+        if not row or not row["num_valoraciones"]:
+            return {
+                "num_valoraciones": 0,
+                "media": None,
+                "estrellas": {score: 0 for score in self.STAR_COLUMNS},
+                "fecha_ultima_valoracion": None,
+            }
+        return {
+            "num_valoraciones": row["num_valoraciones"],
+            "media": row["suma_puntuacion"] / row["num_valoraciones"],
+            "estrellas": {score: row[col] for score, col in self.STAR_COLUMNS.items()},
+            "fecha_ultima_valoracion": row["fecha_ultima_valoracion"],
+        }
+
+    def average_by_courier(self, courier_id: int) -> float | None:
+        return self.get_courier_stats(courier_id)["media"]
 
     def has_rating_for_workday(self, workday_id: int, customer_id: int) -> bool:
         return False
@@ -382,25 +798,44 @@ class RatingRepo(BasePostgresRepo):
     def create_workday_rating(self, workday_id: int, customer_id: int, courier_id: int, score: int, comment: str | None, created_at=None) -> dict:
         return {"id": 0, "status": "not_implemented_in_db"}
 
-    def list_all(self) -> List[dict]:
+    _LIST_ALL_SELECT = """
+        SELECT 
+            v.id, 
+            v.puntuacion, 
+            v.comentario, 
+            v.fecha,
+            u_autor.nombre || ' ' || u_autor.apellidos as autor,
+            u_mensajero.nombre || ' ' || u_mensajero.apellidos as mensajero
+        FROM Valoracion v
+        JOIN Usuario u_autor ON v.id_autor = u_autor.id
+        JOIN Paquete p ON v.id_paquete = p.id
+        LEFT JOIN Usuario u_mensajero ON p.id_mensajero = u_mensajero.id
+    """
+    # Con el id como desempate el orden es total y sirve de cursor para paginar
+    LIST_ALL_SQL = _LIST_ALL_SELECT + " ORDER BY v.fecha DESC, v.id DESC"
+
+    def list_all(self, page_size: int | None = None, after: tuple | None = None) -> List[dict]:
+        """
+        Valoraciones, las más recientes primero. Sin `page_size` devuelve todas.
+        Paginación por cursor: `after` es (fecha, id) de la última fila de la página anterior.
+        """
+        query, params = self._LIST_ALL_SELECT, []
+        if after is not None:
+            query += " WHERE (v.fecha, v.id) < (%s, %s)"
+            params.extend(after)
+        query += " ORDER BY v.fecha DESC, v.id DESC"
+        if page_size:
+            query += " LIMIT %s"
+            params.append(page_size)
         with self._get_connection() as conn:
             with conn.cursor(cursor_factory=psycopg2.extras.DictCursor) as cursor:
-                cursor.execute("""
-                    SELECT 
-                        v.id, 
-                        v.puntuacion, 
-                        v.comentario, 
-                        v.fecha,
-                        u_autor.nombre || ' ' || u_autor.apellidos as autor,
-                        u_mensajero.nombre || ' ' || u_mensajero.apellidos as mensajero
-                    FROM Valoracion v
-                    JOIN Usuario u_autor ON v.id_autor = u_autor.id
-                    JOIN Paquete p ON v.id_paquete = p.id
-                    LEFT JOIN Usuario u_mensajero ON p.id_mensajero = u_mensajero.id
-                    ORDER BY v.fecha DESC
-                """)
+                cursor.execute(query, params)
                 return [dict(row) for row in cursor.fetchall()]
 
+    def iter_all(self, itersize: int | None = None) -> Iterator[dict]:
+        """Como list_all, pero en streaming (cursor del lado del servidor)."""
+        return self._stream(self.LIST_ALL_SQL, None, itersize)
+
 
 class IncidentRepo(BasePostgresRepo):
     def create_incident(self, shipment_id: int, reported_id: int, description: str):
@@ -0,0 +1,85 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Iterable, List, Optional
+
+from moval.security.password_hasher import PasswordHasher
+
+# Un PasswordHasher por proceso de trabajo (mismos parámetros Argon2id que el síncrono)
+_worker_hasher: Optional[PasswordHasher] = None
+
+
+def _hasher() -> PasswordHasher:
+    global _worker_hasher
+    if _worker_hasher is None:
+        _worker_hasher = PasswordHasher()
+    return _worker_hasher
+
+
+def _hash(password: str) -> str:
+    return _hasher().hash(password)
+
+
+def _verify(password: str, hash_str: str) -> bool:
+    return _hasher().verify(password, hash_str)
+
+
+class AsyncPasswordHasher:
+    """
+    Hashing y verificación Argon2id en un pool de procesos (uno por núcleo): Argon2 es costoso
+    en CPU y memoria a propósito, así que ni congela la interfaz ni se serializa en un solo núcleo
+    por el GIL.
+
+    `hash_async`/`verify_async` devuelven un Future; `hash`/`verify` esperan el resultado y
+    mantienen la interfaz de PasswordHasher, de modo que Login y RegisterUser lo usan sin cambios
+    (desde un hilo de trabajo, nunca desde el de la interfaz).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Se crea al primer uso: arrancar los procesos no retrasa el inicio de la aplicación.
+        # "forkserver" (o "spawn" donde no existe): hacer fork con los hilos de la aplicación en
+        # marcha (resolver, ejecutores) puede heredar candados tomados y bloquear el proceso hijo
+        with self._lock:
+            if self._executor is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(method))
+            return self._executor
+
+    def hash_async(self, password: str) -> Future:
+        return self._pool().submit(_hash, password)
+
+    def verify_async(self, password: str, hash_str: str) -> Future:
+        if not hash_str:
+            future = Future()
+            future.set_result(False)
+            return future
+        return self._pool().submit(_verify, password, hash_str)
+
+    def hash(self, password: str) -> str:
+        """Devuelve el hash seguro de la contraseña."""
+        return self.hash_async(password).result()
+
+    def verify(self, password: str, hash_str: str) -> bool:
+        """Devuelve True si la contraseña coincide con el hash."""
+        return self.verify_async(password, hash_str).result()
+
+    def hash_many(self, passwords: Iterable[str]) -> List[str]:
+        """Hashes de un lote de contraseñas (alta masiva de usuarios) repartidos entre todos los núcleos, en orden."""
+        passwords = list(passwords)
+        if not passwords:
+            return []
+        chunksize = max(1, len(passwords) // (self.max_workers * 4))
+        return list(self._pool().map(_hash, passwords, chunksize=chunksize))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
@@ -0,0 +1,259 @@
+import os
+import sqlite3
+import threading
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from moval.services.route_optimizer import haversine_matrix
+from moval.services.http_client import get_http_client
+
+# Decimales con los que se redondean las coordenadas para la clave de caché (~1 m)
+COORD_PRECISION = 5
+
+
+def coord_key(lat: float, lon: float, precision: int = COORD_PRECISION) -> str:
+    return f"{round(float(lat), precision):.{precision}f},{round(float(lon), precision):.{precision}f}"
+
+
+class MatrixCache:
+    """
+    Caché persistente en disco (SQLite) de duración y distancia por carretera entre pares de
+    puntos, con clave por coordenadas redondeadas. Limitada a `max_entries` pares: al superarse
+    se expulsan los usados hace más tiempo (LRU) hasta quedar en el 90%.
+    """
+
+    DEFAULT_PATH = os.path.join(os.getcwd(), 'docs', 'cache', 'matriz_distancias.sqlite3')
+
+    def __init__(self, path: str | None = None, max_entries: int = 500_000):
+        self.path = path or self.DEFAULT_PATH
+        self.max_entries = max_entries
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS tramo (
+                origen TEXT NOT NULL,
+                destino TEXT NOT NULL,
+                duracion REAL NOT NULL,
+                distancia REAL NOT NULL,
+                ultimo_uso REAL NOT NULL,
+                PRIMARY KEY (origen, destino)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_tramo_ultimo_uso ON tramo (ultimo_uso)")
+        self._conn.commit()
+        self._stats = {"hits": 0, "misses": 0, "stored": 0, "evictions": 0}
+
+    def get_many(self, keys: Sequence[str]) -> dict:
+        """{(origen, destino): (duracion, distancia)} de los pares cacheados entre `keys`."""
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        found = {}
+        with self._lock:
+            # Se consulta por bloques de orígenes para no pasar del límite de parámetros de SQLite
+            for i in range(0, len(keys), 400):
+                chunk = keys[i:i + 400]
+                marks = ",".join("?" * len(chunk))
+                dest_marks = ",".join("?" * len(keys))
+                rows = self._conn.execute(
+                    f"SELECT origen, destino, duracion, distancia FROM tramo "
+                    f"WHERE origen IN ({marks}) AND destino IN ({dest_marks})",
+                    chunk + keys
+                ).fetchall()
+                for origen, destino, duracion, distancia in rows:
+                    found[(origen, destino)] = (duracion, distancia)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE tramo SET ultimo_uso = ? WHERE origen = ? AND destino = ?",
+                    [(now, o, d) for o, d in found]
+                )
+                self._conn.commit()
+            hits = len([k for k in found if k[0] != k[1]])
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(keys) * (len(keys) - 1) - hits
+        return found
+
+    def put_many(self, entries: dict) -> None:
+        """Guarda {(origen, destino): (duracion, distancia)}."""
+        if not entries:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO tramo (origen, destino, duracion, distancia, ultimo_uso) VALUES (?, ?, ?, ?, ?)",
+                [(o, d, dur, dist, now) for (o, d), (dur, dist) in entries.items()]
+            )
+            self._stats["stored"] += len(entries)
+            self._evict()
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tramo").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM tramo").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        target = int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM tramo WHERE (origen, destino) IN "
+            "(SELECT origen, destino FROM tramo ORDER BY ultimo_uso LIMIT ?)",
+            (count - target,)
+        )
+        self._stats["evictions"] += count - target
+
+
+class OsrmTableClient:
+    """Cliente del servicio /table de OSRM (duraciones y distancias N x M en una petición)."""
+
+    TABLE_URL = "http://router.project-osrm.org/table/v1/driving/{coords}"
+    # El servidor público limita el nº de coordenadas por petición
+    MAX_LOCATIONS = 100
+
+    def __init__(self, url: str | None = None, max_locations: int | None = None, http_client=None):
+        self.url = url or self.TABLE_URL
+        self.max_locations = max_locations or self.MAX_LOCATIONS
+        self.http = http_client or get_http_client()
+
+    def table(self, sources: List[Tuple[float, float]], destinations: List[Tuple[float, float]]) -> Tuple[list, list]:
+        """
+        Devuelve (duraciones, distancias) como listas [i][j] de `sources` a `destinations`.
+        Si no caben en una petición se parte en bloques de orígenes y destinos.
+        """
+        half = max(1, self.max_locations // 2)
+        durations = [[None] * len(destinations) for _ in sources]
+        distances = [[None] * len(destinations) for _ in sources]
+        for si in range(0, len(sources), half):
+            src = sources[si:si + half]
+            for di in range(0, len(destinations), self.max_locations - len(src)):
+                dst = destinations[di:di + self.max_locations - len(src)]
+                dur, dist = self._request(src, dst)
+                for i in range(len(src)):
+                    durations[si + i][di:di + len(dst)] = dur[i]
+                    distances[si + i][di:di + len(dst)] = dist[i]
+        return durations, distances
+
+    def _request(self, sources, destinations):
+        points = list(sources) + list(destinations)
+        coords = ";".join(f"{lon},{lat}" for lat, lon in points)
+        params = {
+            "sources": ";".join(str(i) for i in range(len(sources))),
+            "destinations": ";".join(str(len(sources) + j) for j in range(len(destinations))),
+            "annotations": "duration,distance",
+        }
+        data = self.http.get_json("osrm", self.url.format(coords=coords), params=params)
+        if data.get("code") != "Ok":
+            raise Exception(f"OSRM Table Error: {data.get('code')} - {data.get('message')}")
+        return data["durations"], data["distances"]
+
+
+class DistanceMatrixService:
+    """
+    Matrices de distancia (m) y duración (s) entre puntos para el optimizador de rutas:
+    1. lo que ya está en la caché en disco;
+    2. lo que falte, en bloque con OSRM /table (y se guarda);
+    3. si OSRM no responde, línea recta x `road_factor` a `speed_kmh` (no se guarda, para
+       poder sustituirlo por el valor real cuando OSRM vuelva).
+    """
+
+    def __init__(self, cache: MatrixCache | None = None, table_client: OsrmTableClient | None = None,
+                 speed_kmh: float = 30.0, road_factor: float = 1.3, use_network: bool = True):
+        self.cache = cache if cache is not None else MatrixCache()
+        self.table_client = table_client if table_client is not None else OsrmTableClient()
+        self.speed_ms = speed_kmh / 3.6
+        self.road_factor = road_factor
+        self.use_network = use_network
+        self._stats = {"pairs": 0, "cached": 0, "fetched": 0, "estimated": 0, "requests": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    def __call__(self, points: Sequence[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        return self.matrices(points)
+
+    def matrices(self, points: Sequence[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+        n = len(points)
+        keys = [coord_key(lat, lon) for lat, lon in points]
+        dist = np.full((n, n), np.nan)
+        dur = np.full((n, n), np.nan)
+
+        cached = self.cache.get_many(keys)
+        for i, ki in enumerate(keys):
+            for j, kj in enumerate(keys):
+                if ki == kj:
+                    dist[i, j] = dur[i, j] = 0.0
+                    continue
+                hit = cached.get((ki, kj))
+                if hit is not None:
+                    dur[i, j], dist[i, j] = hit
+
+        missing = np.isnan(dist)
+        n_cached = n * n - int(missing.sum())
+        n_fetched = 0
+
+        if missing.any() and self.use_network:
+            n_fetched = self._fetch(points, keys, missing, dist, dur)
+            missing = np.isnan(dist)
+
+        n_estimated = int(missing.sum())
+        if n_estimated:
+            straight = haversine_matrix(points) * self.road_factor
+            dist[missing] = straight[missing]
+            dur[missing] = straight[missing] / self.speed_ms
+
+        with self._lock:
+            self._stats["pairs"] += n * n
+            self._stats["cached"] += n_cached
+            self._stats["fetched"] += n_fetched
+            self._stats["estimated"] += n_estimated
+        return dist, dur
+
+    def _fetch(self, points, keys, missing, dist, dur) -> int:
+        # Solo se piden las filas (orígenes) con algún hueco, contra todos los destinos únicos
+        unique = list(dict.fromkeys(keys))
+        point_of = {k: p for k, p in zip(keys, points)}
+        rows = list(dict.fromkeys(keys[i] for i in np.where(missing.any(axis=1))[0]))
+        try:
+            with self._lock:
+                self._stats["requests"] += 1
+            durations, distances = self.table_client.table(
+                [point_of[k] for k in rows], [point_of[k] for k in unique]
+            )
+        except Exception as e:
+            print(f"OSRM /table no disponible ({e}); se estiman las distancias")
+            with self._lock:
+                self._stats["errors"] += 1
+            return 0
+
+        fetched = {}
+        for a, ka in enumerate(rows):
+            for b, kb in enumerate(unique):
+                if ka != kb and durations[a][b] is not None and distances[a][b] is not None:
+                    fetched[(ka, kb)] = (float(durations[a][b]), float(distances[a][b]))
+        self.cache.put_many(fetched)
+
+        filled = 0
+        for i, ki in enumerate(keys):
+            for j, kj in enumerate(keys):
+                if missing[i, j] and (ki, kj) in fetched:
+                    dur[i, j], dist[i, j] = fetched[(ki, kj)]
+                    filled += 1
+        return filled
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
@@ -0,0 +1,159 @@
+import math
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from moval.services.route_optimizer import haversine_matrix, nearest_neighbour_path, solve_open_path, path_length
+
+_EPS = 1e-6
+
+
+def _tour(dist: np.ndarray, cluster: List[int]) -> List[int]:
+    """Recorrido almacén -> paradas -> almacén (vecino más cercano) como nodos de `dist`."""
+    if not cluster:
+        return [0, 0]
+    idx = [0] + cluster + [0]
+    sub = dist[np.ix_(idx, idx)]
+    return [idx[k] for k in nearest_neighbour_path(sub)]
+
+
+def _balanced_targets(n: int, capacities: np.ndarray) -> np.ndarray:
+    """Reparte `n` paradas en proporción a la capacidad libre de cada mensajero (sin pasarla)."""
+    total = int(capacities.sum())
+    if total <= n:
+        return capacities.copy()
+    return np.minimum(capacities, np.ceil(n * capacities / total).astype(int))
+
+
+def _sweep(order: np.ndarray, weights: np.ndarray, targets: np.ndarray,
+           weight_caps: np.ndarray, rotation: int) -> Tuple[List[List[int]], List[int]]:
+    """
+    Barrido angular: recorre las paradas por ángulo alrededor del almacén, desde `rotation`, y
+    llena los mensajeros uno tras otro hasta su objetivo de paradas o su peso máximo.
+    """
+    k = len(targets)
+    clusters = [[] for _ in range(k)]
+    load = np.zeros(k)
+    courier = 0
+    leftover = []
+    for stop in np.roll(order, -rotation):
+        while courier < k and len(clusters[courier]) >= targets[courier]:
+            courier += 1
+        if courier < k and load[courier] + weights[stop] <= weight_caps[courier]:
+            clusters[courier].append(int(stop) + 1)
+            load[courier] += weights[stop]
+        else:
+            leftover.append(int(stop))
+
+    # Lo que no cupo en su sector va al mensajero que más hueco tenga (si cabe por peso)
+    unassigned = []
+    for stop in leftover:
+        placed = False
+        for c in np.argsort([len(cl) - t for cl, t in zip(clusters, targets)]):
+            if len(clusters[c]) < targets[c] and load[c] + weights[stop] <= weight_caps[c]:
+                clusters[c].append(stop + 1)
+                load[c] += weights[stop]
+                placed = True
+                break
+        if not placed:
+            unassigned.append(stop)
+    return clusters, unassigned
+
+
+def _relocate(dist: np.ndarray, tours: List[List[int]], weights: np.ndarray, targets: np.ndarray,
+              weight_caps: np.ndarray, deadline: float) -> List[List[int]]:
+    """
+    Mejora local entre mensajeros: mueve una parada al recorrido de otro mensajero (en su mejor
+    hueco) si baja la distancia total y cabe en su objetivo y peso. Inserciones vectorizadas.
+    """
+    loads = [float(sum(weights[v - 1] for v in t[1:-1])) for t in tours]
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for a in range(len(tours)):
+            pos = 1
+            while pos < len(tours[a]) - 1:
+                if time.perf_counter() >= deadline:
+                    return tours
+                tour_a = tours[a]
+                prev, v, nxt = tour_a[pos - 1], tour_a[pos], tour_a[pos + 1]
+                saving = dist[prev, v] + dist[v, nxt] - dist[prev, nxt]
+                best = None
+                for b in range(len(tours)):
+                    if b == a or len(tours[b]) - 2 >= targets[b] or loads[b] + weights[v - 1] > weight_caps[b]:
+                        continue
+                    t = np.asarray(tours[b])
+                    delta = dist[t[:-1], v] + dist[v, t[1:]] - dist[t[:-1], t[1:]]
+                    i = int(np.argmin(delta))
+                    gain = delta[i] - saving
+                    if gain < -_EPS and (best is None or gain < best[0]):
+                        best = (gain, b, i + 1)
+                if best is None:
+                    pos += 1
+                    continue
+                _, b, insert_at = best
+                tours[a] = tour_a[:pos] + tour_a[pos + 1:]
+                tours[b] = tours[b][:insert_at] + [v] + tours[b][insert_at:]
+                loads[a] -= weights[v - 1]
+                loads[b] += weights[v - 1]
+                improved = True
+    return tours
+
+
+def assign_capacitated(depot: Tuple[float, float], stops: Sequence[Tuple[float, float]],
+                       weights: Sequence[float], max_stops: Sequence[int], max_weight: Sequence[float],
+                       time_budget: float = 2.0, road_factor: float = 1.3) -> dict:
+    """
+    Reparto de paradas entre mensajeros (VRP con capacidad) que salen y vuelven al almacén:
+    barrido angular con varios ángulos de inicio, repartiendo en proporción a la capacidad libre,
+    y mejora por reubicación de paradas entre mensajeros hasta agotar `time_budget`.
+
+    Devuelve {"routes": [[índices de `stops` en orden de visita] por mensajero],
+              "distances": [metros estimados por mensajero], "unassigned": [índices]}.
+    """
+    started = time.perf_counter()
+    deadline = started + time_budget
+    n, k = len(stops), len(max_stops)
+    if n == 0 or k == 0:
+        return {"routes": [[] for _ in range(k)], "distances": [0.0] * k, "unassigned": list(range(n))}
+
+    points = np.asarray([depot] + list(stops), dtype=float)
+    dist = haversine_matrix(points) * road_factor
+    weights = np.asarray(weights, dtype=float)
+    targets = _balanced_targets(n, np.asarray(max_stops, dtype=int))
+    weight_caps = np.asarray(max_weight, dtype=float)
+
+    # Ángulo de cada parada alrededor del almacén (longitud corregida por la latitud)
+    rel = points[1:] - points[0]
+    angles = np.arctan2(rel[:, 0], rel[:, 1] * math.cos(math.radians(depot[0])))
+    order = np.argsort(angles)
+
+    # Varios barridos (ángulos de inicio repartidos) con la mitad del presupuesto
+    best = None
+    for rotation in np.unique(np.linspace(0, n, num=min(n, 24), endpoint=False).astype(int)):
+        clusters, unassigned = _sweep(order, weights, targets, weight_caps, int(rotation))
+        tours = [_tour(dist, c) for c in clusters]
+        cost = sum(path_length(dist, t) for t in tours)
+        if best is None or (len(unassigned), cost) < (len(best[1]), best[2]):
+            best = (tours, unassigned, cost)
+        if time.perf_counter() - started > time_budget / 2:
+            break
+
+    tours, unassigned, _ = best
+    tours = _relocate(dist, tours, weights, targets, weight_caps, started + time_budget * 0.8)
+
+    # Orden final de cada mensajero con 2-opt / Or-opt en lo que quede de presupuesto
+    routes, distances = [], []
+    for t in tours:
+        stops_in = t[1:-1]
+        if stops_in:
+            idx = [0] + stops_in + [0]
+            sub = dist[np.ix_(idx, idx)]
+            remaining = max(0.01, (deadline - time.perf_counter()) / max(1, k))
+            local = solve_open_path(sub, remaining)
+            t = [idx[j] for j in local]
+        routes.append([v - 1 for v in t[1:-1]])
+        distances.append(path_length(dist, t) if stops_in else 0.0)
+
+    return {"routes": routes, "distances": distances, "unassigned": sorted(unassigned)}
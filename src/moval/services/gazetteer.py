@@ -0,0 +1,262 @@
+import bisect
+import csv
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Iterable, List, Optional, Tuple
+
+from moval.services.geocode_cache import normalize_address
+
+# Tipos de vía (ya normalizados): se guardan aparte del nombre para que "Ordoño II" encuentre
+# "Avenida Ordoño II"
+STREET_TYPES = {"calle", "avenida", "plaza", "paseo", "carretera", "travesia", "urbanizacion",
+                "camino", "ronda", "glorieta", "pasaje", "callejon", "costanilla", "plazuela"}
+
+_POSTCODE = re.compile(r"\b(\d{5})\b")
+_NUMBER = re.compile(r"^(\d+)\s*[a-z]?$")
+_TRAILING_NUMBER = re.compile(r"^(.*?)[\s,]+(?:n\s*|no\s*|num\s*)?(\d+)\s*[a-z]?$")
+
+
+def split_street(text: str) -> Tuple[str, str]:
+    """("avenida", "ordono ii") a partir de un nombre de vía; tipo "" si no lo lleva."""
+    name = normalize_address(text)
+    head, _, rest = name.partition(" ")
+    if head in STREET_TYPES and rest:
+        return head, rest
+    return "", name
+
+
+def trigrams(text: str) -> set:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_address(text: str) -> dict:
+    """
+    Separa una dirección en texto libre ("Calle Ancha 3, 24003 León" o el formato del alta,
+    "Calle Ancha, 3, 24003, León, León") en {"calle", "numero", "cp", "ciudad"}.
+    """
+    parts = [p.strip() for p in str(text or "").split(",") if p.strip()]
+    result = {"calle": "", "numero": "", "cp": "", "ciudad": ""}
+    if not parts:
+        return result
+
+    street = parts[0]
+    match = _TRAILING_NUMBER.match(street)
+    if match:
+        street, result["numero"] = match.group(1), match.group(2)
+    result["calle"] = street
+
+    for part in parts[1:]:
+        postcode = _POSTCODE.search(part)
+        if postcode and not result["cp"]:
+            result["cp"] = postcode.group(1)
+            part = _POSTCODE.sub("", part).strip()
+        number = _NUMBER.match(part.lower())
+        if number and not result["numero"]:
+            result["numero"] = number.group(1)
+        elif part and not number and not result["ciudad"]:
+            result["ciudad"] = part
+    return result
+
+
+class _Street:
+    __slots__ = ("name", "kind", "city", "postcodes", "numbers", "points")
+
+    def __init__(self, name: str, kind: str, city: str):
+        self.name = name
+        self.kind = kind
+        self.city = city
+        self.postcodes = set()
+        # Números de portal por acera (0 pares, 1 impares): [(numero, lat, lon)] ordenados
+        self.numbers = {0: [], 1: []}
+        # Puntos sin número (trazado de la vía): su media es la posición de la calle
+        self.points = []
+
+    def locate(self, number: Optional[int]) -> Tuple[Tuple[float, float], bool]:
+        """((lat, lon), interpolado) del portal `number`; sin número, el centro de la calle."""
+        if number is not None:
+            side = self.numbers[number % 2] or self.numbers[1 - number % 2]
+            if side:
+                i = bisect.bisect_left(side, (number,))
+                if i < len(side) and side[i][0] == number:
+                    return side[i][1:], False
+                if i == 0:
+                    return side[0][1:], True
+                if i == len(side):
+                    return side[-1][1:], True
+                (n0, lat0, lon0), (n1, lat1, lon1) = side[i - 1], side[i]
+                t = (number - n0) / (n1 - n0)
+                return (lat0 + (lat1 - lat0) * t, lon0 + (lon1 - lon0) * t), True
+        points = self.points or [p[1:] for side in self.numbers.values() for p in side]
+        return (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points)), number is not None
+
+
+class Gazetteer:
+    """
+    Geocodificador local (sin red) a partir de un callejero de la zona de servicio: portales con
+    número (calle, numero, cp, ciudad, latitud, longitud) y puntos de vía sin número.
+
+    Búsqueda de la calle: nombre exacto, después prefijo (bisect sobre los nombres ordenados) y
+    por último similitud de trigramas (índice invertido en memoria) para erratas y variantes.
+    Los números que no están en el callejero se interpolan entre los portales vecinos de la
+    misma acera.
+    """
+
+    DEFAULT_PATH = os.path.join(os.getcwd(), 'docs', 'gazetteer', 'leon_direcciones.csv')
+    # Similitud mínima (Jaccard de trigramas) para aceptar una calle con erratas
+    MIN_SIMILARITY = 0.5
+
+    def __init__(self, min_similarity: float = MIN_SIMILARITY):
+        self.min_similarity = min_similarity
+        self._streets: List[_Street] = []
+        self._by_key = {}
+        self._by_name = defaultdict(list)
+        self._sorted_names: List[str] = []
+        self._trigrams = defaultdict(list)
+        self._lock = threading.Lock()
+        self._stats = Counter()
+
+    # --- Carga ---
+
+    @classmethod
+    def from_csv(cls, path: str, **kwargs) -> "Gazetteer":
+        """Carga un CSV con columnas calle, numero, cp, ciudad, latitud, longitud (numero puede ir vacío)."""
+        gazetteer = cls(**kwargs)
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                gazetteer.add(row["calle"], row.get("numero"), row.get("cp"), row.get("ciudad"),
+                              float(row["latitud"]), float(row["longitud"]))
+        return gazetteer.build()
+
+    @classmethod
+    def load_default(cls) -> Optional["Gazetteer"]:
+        """El callejero de la zona (DEFAULT_PATH) o None si aún no se ha importado."""
+        if not os.path.exists(cls.DEFAULT_PATH):
+            return None
+        return cls.from_csv(cls.DEFAULT_PATH)
+
+    def add(self, street: str, number, postcode, city, lat: float, lon: float) -> None:
+        kind, name = split_street(street)
+        if not name:
+            return
+        city_key = normalize_address(city)
+        entry = self._by_key.get((kind, name, city_key))
+        if entry is None:
+            entry = _Street(name, kind, city_key)
+            self._by_key[(kind, name, city_key)] = entry
+            self._streets.append(entry)
+        if postcode:
+            entry.postcodes.add(str(postcode).strip())
+        match = _NUMBER.match(str(number or "").strip().lower())
+        if match:
+            n = int(match.group(1))
+            entry.numbers[n % 2].append((n, lat, lon))
+        else:
+            entry.points.append((lat, lon))
+
+    def build(self) -> "Gazetteer":
+        """Ordena los portales y crea los índices; hay que llamarlo tras los `add`."""
+        self._by_name.clear()
+        self._trigrams.clear()
+        for i, street in enumerate(self._streets):
+            for side in street.numbers.values():
+                side.sort()
+            self._by_name[street.name].append(i)
+        self._sorted_names = sorted(self._by_name)
+        for name in self._sorted_names:
+            for gram in trigrams(name):
+                self._trigrams[gram].append(name)
+        return self
+
+    # --- Consulta ---
+
+    def geocode(self, address: Optional[str], structured_query: Optional[dict] = None) -> Optional[Tuple[float, float]]:
+        """(lat, lon) de la dirección o None si la calle no está en el callejero."""
+        if structured_query and structured_query.get("calle"):
+            query = {f: str(structured_query.get(f) or "") for f in ("calle", "numero", "cp", "ciudad")}
+        else:
+            query = parse_address(address)
+        result = self.lookup(query["calle"], query["numero"], query["cp"], query["ciudad"])
+        return result[0] if result else None
+
+    def lookup(self, street: str, number=None, postcode: str = "", city: str = ""):
+        """((lat, lon), {"street", "interpolated", "match"}) o None."""
+        kind, name = split_street(street)
+        with self._lock:
+            self._stats["lookups"] += 1
+        if not name:
+            return None
+
+        candidates, how = self._candidates(name)
+        city_key = normalize_address(city)
+        if city_key:
+            candidates = [s for s in candidates if not s.city or s.city == city_key]
+        if not candidates:
+            with self._lock:
+                self._stats["misses"] += 1
+            return None
+
+        # Preferencia: mismo tipo de vía, mismo código postal, más portales conocidos
+        postcode = str(postcode or "").strip()
+        best = max(candidates, key=lambda s: (s.kind == kind, postcode in s.postcodes,
+                                              len(s.numbers[0]) + len(s.numbers[1])))
+        match = _NUMBER.match(str(number or "").strip().lower())
+        coords, interpolated = best.locate(int(match.group(1)) if match else None)
+        with self._lock:
+            self._stats["hits"] += 1
+            self._stats[how] += 1
+            if interpolated:
+                self._stats["interpolated"] += 1
+        return coords, {"street": f"{best.kind} {best.name}".strip(), "interpolated": interpolated, "match": how}
+
+    def _candidates(self, name: str) -> Tuple[List[_Street], str]:
+        if name in self._by_name:
+            return [self._streets[i] for i in self._by_name[name]], "exact"
+
+        # Prefijo: "ordono" -> "ordono ii"; solo si no es ambiguo
+        i = bisect.bisect_left(self._sorted_names, name)
+        prefixed = []
+        while i < len(self._sorted_names) and self._sorted_names[i].startswith(name) and len(prefixed) < 2:
+            prefixed.append(self._sorted_names[i])
+            i += 1
+        if len(prefixed) == 1:
+            return [self._streets[j] for j in self._by_name[prefixed[0]]], "prefix"
+
+        # Trigramas: nombres que comparten más trigramas, puntuados con Jaccard
+        grams = trigrams(name)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._trigrams.get(gram, ()))
+        best_name, best_score = None, self.min_similarity
+        for other, common in shared.most_common(20):
+            score = common / (len(grams) + len(trigrams(other)) - common)
+            if score >= best_score:
+                best_name, best_score = other, score
+        if best_name is None:
+            return [], "miss"
+        return [self._streets[j] for j in self._by_name[best_name]], "fuzzy"
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["streets"] = len(self._streets)
+        stats["addresses"] = sum(len(s.numbers[0]) + len(s.numbers[1]) for s in self._streets)
+        return stats
+
+    def __len__(self) -> int:
+        return len(self._streets)
+
+
+def write_csv(rows: Iterable[dict], path: str) -> int:
+    """Escribe filas {calle, numero, cp, ciudad, latitud, longitud} en el formato de `from_csv`."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["calle", "numero", "cp", "ciudad", "latitud", "longitud"])
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: row.get(k, "") for k in writer.fieldnames})
+            count += 1
+    return count
@@ -0,0 +1,157 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Optional, Tuple
+
+# Resultado de `GeocodeCache.get` cuando la dirección no está (o ha caducado)
+MISS = object()
+
+# Variantes habituales de tipo de vía y abreviaturas, todas a una forma única
+_ABBREVIATIONS = {
+    "c": "calle", "cl": "calle", "cll": "calle", "calle": "calle",
+    "av": "avenida", "avd": "avenida", "avda": "avenida", "avenida": "avenida",
+    "pza": "plaza", "pl": "plaza", "plz": "plaza", "plaza": "plaza",
+    "po": "paseo", "pso": "paseo", "paseo": "paseo",
+    "ctra": "carretera", "crta": "carretera", "carretera": "carretera",
+    "trav": "travesia", "travesia": "travesia",
+    "urb": "urbanizacion", "urbanizacion": "urbanizacion",
+}
+# Palabras que no distinguen una dirección de otra
+_NOISE = {"n", "no", "nº", "num", "numero", "de", "del", "la", "el", "los", "las", "espana", "spain"}
+
+
+def normalize_address(text: Optional[str]) -> str:
+    """
+    Forma canónica de un texto de dirección: minúsculas, sin tildes ni signos de puntuación,
+    abreviaturas de tipo de vía unificadas y sin palabras de relleno.
+    "Avda. de la Constitución, nº 5 (León)" -> "avenida constitucion 5 leon".
+    """
+    if not text:
+        return ""
+    text = str(text).lower().replace("º", " ").replace("ª", " ")
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    text = text.replace("s/n", " sn ").replace("c/", " calle ")
+    words = []
+    for word in re.split(r"[^a-z0-9]+", text):
+        if not word:
+            continue
+        word = _ABBREVIATIONS.get(word, word)
+        if word not in _NOISE:
+            words.append(word)
+    return " ".join(words)
+
+
+def address_key(address: Optional[str], structured_query: Optional[dict] = None) -> str:
+    """
+    Clave de caché de una consulta de geocodificación. Las estructuradas (calle, numero, cp,
+    ciudad, provincia) se normalizan campo a campo; las de texto libre, como un todo.
+    """
+    if structured_query and any(structured_query.get(f) for f in ("calle", "numero", "cp", "ciudad")):
+        fields = [normalize_address(structured_query.get(f)) for f in ("calle", "numero", "cp", "ciudad", "provincia")]
+        # "Ancha" y "Calle Ancha" son la misma vía: "calle" es el tipo por defecto
+        if fields[0].startswith("calle "):
+            fields[0] = fields[0][len("calle "):]
+        return "s|" + "|".join(fields)
+    return "q|" + normalize_address(address)
+
+
+class GeocodeCache:
+    """
+    Caché persistente (SQLite) de geocodificaciones por dirección normalizada. Guarda también
+    los "no encontrado", con una caducidad más corta, para no repetir búsquedas fallidas.
+    Las lecturas no escriben en disco: un acierto es una consulta por clave primaria.
+    """
+
+    DEFAULT_PATH = os.path.join(os.getcwd(), 'docs', 'cache', 'geocodigos.sqlite3')
+    TTL = 180 * 24 * 3600
+    NEGATIVE_TTL = 24 * 3600
+
+    def __init__(self, path: str | None = None, ttl: float | None = None, negative_ttl: float | None = None,
+                 max_entries: int = 200_000, clock=time.time):
+        self.path = path or self.DEFAULT_PATH
+        self.ttl = self.TTL if ttl is None else ttl
+        self.negative_ttl = self.NEGATIVE_TTL if negative_ttl is None else negative_ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS geocodigo (
+                clave TEXT PRIMARY KEY,
+                latitud REAL,
+                longitud REAL,
+                creado REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_geocodigo_creado ON geocodigo (creado)")
+        self._conn.commit()
+        self._stats = {"hits": 0, "negative_hits": 0, "misses": 0, "expired": 0, "stored": 0, "evictions": 0}
+
+    def get(self, key: str, allow_expired: bool = False):
+        """
+        (lat, lon) si está cacheada, None si se sabe que no existe y MISS si no hay dato
+        vigente. Con `allow_expired` se devuelven también datos caducados (para usar si la red falla).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitud, longitud, creado FROM geocodigo WHERE clave = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return MISS
+            lat, lon, created = row
+            ttl = self.negative_ttl if lat is None else self.ttl
+            if not allow_expired and self.clock() - created > ttl:
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return MISS
+            if lat is None:
+                self._stats["negative_hits"] += 1
+                return None
+            self._stats["hits"] += 1
+            return lat, lon
+
+    def put(self, key: str, coords: Optional[Tuple[float, float]]) -> None:
+        """Guarda el resultado de `key`; `coords` None registra que la dirección no se encontró."""
+        lat, lon = coords if coords else (None, None)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocodigo (clave, latitud, longitud, creado) VALUES (?, ?, ?, ?)",
+                (key, lat, lon, self.clock())
+            )
+            self._stats["stored"] += 1
+            self._evict()
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocodigo").fetchone()[0]
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+        return stats
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM geocodigo").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        target = int(self.max_entries * 0.9)
+        self._conn.execute(
+            "DELETE FROM geocodigo WHERE clave IN (SELECT clave FROM geocodigo ORDER BY creado LIMIT ?)",
+            (count - target,)
+        )
+        self._stats["evictions"] += count - target
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+
+from moval.services.geocode_cache import MISS, address_key
+
+
+class GeocodeQueue:
+    """
+    Cola de geocodificación para cargas masivas. Cada dirección distinta (por clave normalizada)
+    se resuelve una sola vez aunque aparezca en muchas filas, y las peticiones salen de un único
+    hilo separadas al menos `min_interval` segundos (política de uso de Nominatim: 1 petición/s).
+
+    Las direcciones que están en el callejero local o en la caché del servicio se resuelven al
+    momento, sin esperar turno; solo las que van a la red respetan el intervalo.
+    """
+
+    MIN_INTERVAL = 1.0
+
+    def __init__(self, geocoding_service, min_interval: float | None = None, clock=time.monotonic, sleep=time.sleep):
+        self.geocoding_service = geocoding_service
+        self.min_interval = self.MIN_INTERVAL if min_interval is None else min_interval
+        self.clock = clock
+        self.sleep = sleep
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._last_request = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="moval-geocode")
+        self._stats = {"submitted": 0, "deduplicated": 0, "cached": 0, "requested": 0}
+
+    def submit(self, address: str, structured_query: Optional[dict] = None) -> Future:
+        """
+        Future con (lat, lon) o None. Direcciones equivalentes pendientes de la red comparten el
+        mismo Future; una vez resuelto se olvida, y las siguientes apariciones salen de la caché
+        del servicio (un fallo pasajero de la red, que no se cachea, se vuelve a intentar).
+        """
+        key = address_key(address, structured_query)
+        with self._lock:
+            self._stats["submitted"] += 1
+            future = self._pending.get(key)
+            # Un Future ya resuelto puede seguir aquí un instante, hasta que corre su callback
+            if future is not None and not future.done():
+                self._stats["deduplicated"] += 1
+                return future
+
+            cached = self._from_local(address, structured_query)
+            if cached is not None:
+                self._stats["cached"] += 1
+                future = Future()
+                future.set_result(cached[0])
+                return future
+            future = self._executor.submit(self._resolve, address, structured_query)
+            self._pending[key] = future
+        # Fuera del candado: si ya ha terminado, el callback se ejecuta aquí mismo
+        future.add_done_callback(lambda f: self._forget(key, f))
+        return future
+
+    def _forget(self, key: str, future: Future) -> None:
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def _from_local(self, address: str, structured_query: Optional[dict]):
+        # Callejero local y caché del servicio: (resultado,) o None si hay que ir a la red
+        value = self.geocoding_service.geocode_offline(address, structured_query)
+        return None if value is MISS else (value,)
+
+    def _resolve(self, address: str, structured_query: Optional[dict]):
+        # Un solo hilo: basta con esperar lo que falte desde la petición anterior
+        if self._last_request is not None:
+            wait = self.min_interval - (self.clock() - self._last_request)
+            if wait > 0:
+                self.sleep(wait)
+        try:
+            return self.geocoding_service.geocode_address(address, structured_query=structured_query)
+        finally:
+            self._last_request = self.clock()
+            with self._lock:
+                self._stats["requested"] += 1
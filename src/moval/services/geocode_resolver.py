@@ -0,0 +1,145 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Optional
+
+from moval.services.geocoding_service import GeocodingUnavailableError
+
+
+class GeocodeResolver:
+    """
+    Resuelve en segundo plano las coordenadas de los paquetes guardados sin ellas
+    (estado_geocodificacion PENDIENTE). Cada pasada toma los pendientes cuyo próximo intento
+    ha llegado; si Nominatim no encuentra la dirección, se reintenta con espera exponencial
+    (`base_delay` * 2^intentos) hasta `max_attempts`, y entonces queda FALLIDA (el administrador
+    puede corregir la dirección, y vuelve a PENDIENTE).
+
+    Si Nominatim no está disponible (caído o con el circuito abierto) no se gasta un intento: el
+    paquete se aplaza `outage_delay` y la pasada se corta, porque el resto fallaría igual.
+
+    Al resolver un paquete que ya tiene mensajero se invalida su ruta cacheada, para que la
+    próxima ruta lo incluya. El ritmo de peticiones lo marca la política "nominatim" del
+    cliente HTTP (1 petición/s).
+    """
+
+    MAX_ATTEMPTS = 5
+    BASE_DELAY = timedelta(minutes=1)
+    # Pausa entre pasadas cuando no hay nada que hacer (enqueue la interrumpe)
+    IDLE_INTERVAL = 30.0
+    BATCH_SIZE = 20
+    HINTS_SIZE = 10_000
+    OUTAGE_DELAY = timedelta(minutes=1)
+
+    def __init__(self, shipment_repo, geocoding_service, clock, route_cache=None,
+                 max_attempts: int = MAX_ATTEMPTS, base_delay: timedelta = BASE_DELAY,
+                 idle_interval: float = IDLE_INTERVAL, batch_size: int = BATCH_SIZE,
+                 outage_delay: timedelta = OUTAGE_DELAY):
+        self.shipment_repo = shipment_repo
+        self.geocoding_service = geocoding_service
+        self.clock = clock
+        self.route_cache = route_cache
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.idle_interval = idle_interval
+        self.batch_size = batch_size
+        self.outage_delay = outage_delay
+        # Consulta estructurada de los paquetes creados en esta sesión (la BD solo guarda el texto)
+        self._hints = OrderedDict()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._stats = {"resolved": 0, "retried": 0, "failed": 0, "postponed": 0}
+
+    def enqueue(self, shipment_id: int, structured_query: Optional[dict] = None) -> None:
+        """Avisa de un paquete nuevo pendiente de geocodificar (se atiende en la siguiente pasada)."""
+        if structured_query:
+            with self._lock:
+                self._hints[shipment_id] = structured_query
+                while len(self._hints) > self.HINTS_SIZE:
+                    self._hints.popitem(last=False)
+        self._wake.set()
+
+    def run_once(self) -> int:
+        """Una pasada sobre los pendientes que tocan ahora. Devuelve cuántos se han procesado."""
+        pending = self.shipment_repo.list_pending_geocodes(self.clock.now(), limit=self.batch_size)
+        processed = 0
+        for shipment in pending:
+            if self._stop.is_set():
+                break
+            processed += 1
+            if not self._resolve(shipment):
+                # Nominatim caído: el resto de la pasada esperará a la siguiente
+                break
+        return processed
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="moval-geocode-resolver", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, hints=len(self._hints))
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.clear()
+            try:
+                processed = self.run_once()
+            except Exception as e:
+                # Sin BD o sin red: se vuelve a intentar en la siguiente pasada
+                print(f"[GeocodeResolver] Error: {e}")
+                processed = 0
+            # Si la pasada iba llena puede haber más pendientes: se sigue sin esperar
+            if processed < self.batch_size:
+                self._wake.wait(self.idle_interval)
+
+    def _resolve(self, shipment: dict) -> bool:
+        # Devuelve False si Nominatim no está disponible
+        with self._lock:
+            structured = self._hints.get(shipment['id'])
+        try:
+            # Cada intento pregunta a Nominatim: el "no encontrada" cacheado del intento anterior
+            # (o de antes de corregir la dirección) no cuenta como respuesta
+            coords = self.geocoding_service.geocode_address(shipment['direccion_destino'], structured_query=structured,
+                                                            raise_unavailable=True, use_negative_cache=False)
+        except GeocodingUnavailableError as e:
+            print(f"[GeocodeResolver] Nominatim no disponible, se aplaza el paquete {shipment['id']}: {e}")
+            self.shipment_repo.postpone_geocode(shipment['id'], self.clock.now() + self.outage_delay)
+            with self._lock:
+                self._stats["postponed"] += 1
+            return False
+        except Exception as e:
+            print(f"[GeocodeResolver] Error geocodificando el paquete {shipment['id']}: {e}")
+            coords = None
+
+        if coords:
+            courier_id = self.shipment_repo.set_geocode(shipment['id'], coords[0], coords[1])
+            with self._lock:
+                self._hints.pop(shipment['id'], None)
+                self._stats["resolved"] += 1
+            if courier_id and self.route_cache:
+                self.route_cache.invalidate_courier(courier_id)
+            return True
+
+        attempts = (shipment.get('intentos_geocodificacion') or 0) + 1
+        if attempts >= self.max_attempts:
+            self.shipment_repo.record_geocode_failure(shipment['id'], None)
+            with self._lock:
+                self._hints.pop(shipment['id'], None)
+                self._stats["failed"] += 1
+        else:
+            next_attempt = self.clock.now() + self.base_delay * (2 ** (attempts - 1))
+            self.shipment_repo.record_geocode_failure(shipment['id'], next_attempt)
+            with self._lock:
+                self._stats["retried"] += 1
+        return True
@@ -1,22 +1,64 @@
-import requests
+import threading
+from collections import OrderedDict
 from typing import Optional, Tuple
 
+from moval.services.http_client import get_http_client
+from moval.services.geocode_cache import MISS, address_key
+
+
+class GeocodingUnavailableError(Exception):
+    """Nominatim no responde (caído, sin red o circuito abierto) y no hay respuesta conocida."""
+
+
 class GeocodingService:
     """
     Servicio para convertir direcciones en coordenadas usando OpenStreetMap (Nominatim).
+    Con `gazetteer` (callejero local de la zona) se busca primero ahí, sin red; Nominatim queda
+    para lo que no esté en el callejero.
+    Con `cache` (GeocodeCache) las direcciones ya vistas, encontradas o no, se resuelven sin red.
+    Si Nominatim falla o su circuito está abierto, se devuelve la última respuesta conocida
+    para esa dirección (si la hay, aunque haya caducado).
     """
     BASE_URL = "https://nominatim.openstreetmap.org/search"
+    RECENT_SIZE = 1024
+
+    def __init__(self, http_client=None, cache=None, gazetteer=None):
+        # Timeout, 1 petición/s, User-Agent y circuit breaker: política "nominatim" del cliente
+        self.http = http_client or get_http_client()
+        self.cache = cache
+        self.gazetteer = gazetteer
+        self._recent = OrderedDict()
+        self._lock = threading.Lock()
     
-    def geocode_address(self, address: str, structured_query: Optional[dict] = None) -> Optional[Tuple[float, float]]:
+    def geocode_offline(self, address: str, structured_query: Optional[dict] = None,
+                        use_negative_cache: bool = True):
+        """
+        Solo fuentes locales (callejero y caché), sin red: (lat, lon), None si se sabe que la
+        dirección no existe o MISS si habría que preguntar a Nominatim. Sin `use_negative_cache`
+        un "no encontrada" cacheado también da MISS (para reintentos que deben ir a la red).
+        """
+        if self.gazetteer is not None:
+            coords = self.gazetteer.geocode(address, structured_query)
+            if coords:
+                return coords
+        if self.cache is not None:
+            cached = self.cache.get(address_key(address, structured_query))
+            if cached is None and not use_negative_cache:
+                return MISS
+            return cached
+        return MISS
+
+    def geocode_address(self, address: str, structured_query: Optional[dict] = None,
+                        raise_unavailable: bool = False,
+                        use_negative_cache: bool = True) -> Optional[Tuple[float, float]]:
         """
         Dada una dirección en texto, devuelve (latitud, longitud) o None si no se encuentra.
         Si se pasa `structured_query`, se usa búsqueda estructurada (street, city, etc) que es más precisa.
+        Con `raise_unavailable`, un fallo de Nominatim sin respuesta conocida lanza
+        GeocodingUnavailableError en lugar de devolver None, para distinguirlo de "no existe".
+        Sin `use_negative_cache` se vuelve a preguntar a Nominatim aunque la dirección conste
+        como no encontrada en la caché (el nuevo resultado la sustituye).
         """
-        # Nominatim requiere User-Agent
-        headers = {
-            'User-Agent': 'MovalApp/1.0 (Student Project)'
-        }
-        
         params = {
             'format': 'json',
             'limit': 1
@@ -41,17 +83,33 @@ class GeocodingService:
             if not address: return None
             params['q'] = address
         
+        local = self.geocode_offline(address, structured_query, use_negative_cache=use_negative_cache)
+        if local is not MISS:
+            return local
+
+        key = address_key(address, structured_query)
+
         try:
-            response = requests.get(self.BASE_URL, params=params, headers=headers, timeout=5)
-            response.raise_for_status()
-            data = response.json()
-            
-            if data and len(data) > 0:
-                lat = float(data[0]['lat'])
-                lon = float(data[0]['lon'])
-                return lat, lon
-            return None
-            
+            data = self.http.get_json("nominatim", self.BASE_URL, params=params)
         except Exception as e:
             print(f"[GeocodingService] Error al geocodificar: {e}")
-            return None
+            with self._lock:
+                recent = self._recent.get(key)
+            if recent is None and self.cache is not None:
+                stale = self.cache.get(key, allow_expired=True)
+                recent = stale if stale is not MISS else None
+            if recent is None and raise_unavailable:
+                raise GeocodingUnavailableError(str(e)) from e
+            return recent
+
+        coords = (float(data[0]['lat']), float(data[0]['lon'])) if data else None
+        if self.cache is not None:
+            # También se guarda el "no encontrado" (caduca antes) para no repetir la búsqueda
+            self.cache.put(key, coords)
+        if coords:
+            with self._lock:
+                self._recent[key] = coords
+                self._recent.move_to_end(key)
+                while len(self._recent) > self.RECENT_SIZE:
+                    self._recent.popitem(last=False)
+        return coords
@@ -0,0 +1,159 @@
+import math
+import threading
+from typing import Iterable, List, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+# Metros por píxel en el ecuador a zoom 0 (teselas de 256 px, Web Mercator)
+METERS_PER_PIXEL_Z0 = 156543.03392
+
+
+def encode_polyline(coords: Iterable[Tuple[float, float]], precision: int = 5) -> str:
+    """Codifica [(lat, lon)] con el algoritmo Encoded Polyline de Google (el de OSRM)."""
+    factor = 10 ** precision
+    out = []
+    prev_lat = prev_lon = 0
+    for lat, lon in coords:
+        ilat, ilon = int(round(lat * factor)), int(round(lon * factor))
+        for delta in (ilat - prev_lat, ilon - prev_lon):
+            value = ~(delta << 1) if delta < 0 else delta << 1
+            while value >= 0x20:
+                out.append(chr((0x20 | (value & 0x1f)) + 63))
+                value >>= 5
+            out.append(chr(value + 63))
+        prev_lat, prev_lon = ilat, ilon
+    return "".join(out)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> np.ndarray:
+    """Decodifica una Encoded Polyline a un array (n, 2) de (lat, lon)."""
+    values = []
+    shift = result = 0
+    for ch in encoded:
+        b = ord(ch) - 63
+        result |= (b & 0x1f) << shift
+        shift += 5
+        if b < 0x20:
+            values.append(~(result >> 1) if result & 1 else result >> 1)
+            shift = result = 0
+    deltas = np.asarray(values, dtype=np.int64).reshape(-1, 2)
+    return np.cumsum(deltas, axis=0) / float(10 ** precision)
+
+
+def douglas_peucker(coords: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """
+    Máscara de los puntos que conserva Douglas–Peucker con una tolerancia en metros.
+    Las distancias se calculan en una proyección equirectangular local (suficiente a escala
+    de ciudad). Iterativo para no depender del límite de recursión con rutas largas.
+    """
+    n = len(coords)
+    keep = np.zeros(n, dtype=bool)
+    if n == 0:
+        return keep
+    if tolerance_m <= 0:
+        keep[:] = True
+        return keep
+    keep[0] = keep[-1] = True
+    if n < 3:
+        return keep
+
+    lat0 = math.radians(float(np.mean(coords[:, 0])))
+    xy = np.radians(coords[:, ::-1]) * EARTH_RADIUS_M
+    xy[:, 0] *= math.cos(lat0)
+
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        a, b = xy[first], xy[last]
+        seg = b - a
+        pts = xy[first + 1:last] - a
+        seg_len = math.hypot(seg[0], seg[1])
+        if seg_len == 0.0:
+            dists = np.hypot(pts[:, 0], pts[:, 1])
+        else:
+            dists = np.abs(seg[0] * pts[:, 1] - seg[1] * pts[:, 0]) / seg_len
+        k = int(np.argmax(dists))
+        if dists[k] > tolerance_m:
+            split = first + 1 + k
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return keep
+
+
+class RouteGeometry:
+    """
+    Geometría de una ruta guardada como array numpy (n, 2) de (lat, lon): 16 bytes por vértice
+    frente a los ~100 de una lista de tuplas. Da la línea completa o simplificada para un nivel
+    de zoom (Douglas–Peucker a la tolerancia de un píxel), calculando cada nivel una sola vez.
+    """
+
+    # Desviación máxima admitida, en píxeles de pantalla
+    PIXEL_TOLERANCE = 1.0
+    MAX_ZOOM = 19
+
+    def __init__(self, coords):
+        arr = np.asarray(coords, dtype=float).reshape(-1, 2)
+        arr.setflags(write=False)
+        self._coords = arr
+        self._levels = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_geojson(cls, geometry: dict) -> "RouteGeometry":
+        """LineString GeoJSON ([lon, lat])."""
+        coords = np.asarray(geometry.get("coordinates", []), dtype=float).reshape(-1, 2)
+        return cls(coords[:, ::-1])
+
+    @classmethod
+    def from_polyline(cls, encoded: str, precision: int = 5) -> "RouteGeometry":
+        return cls(decode_polyline(encoded, precision))
+
+    @property
+    def coords(self) -> np.ndarray:
+        """Array (n, 2) de solo lectura."""
+        return self._coords
+
+    @property
+    def nbytes(self) -> int:
+        return self._coords.nbytes
+
+    def __len__(self) -> int:
+        return len(self._coords)
+
+    def full(self) -> List[Tuple[float, float]]:
+        """Todos los vértices como [(lat, lon)] (formato de tkintermapview)."""
+        return [tuple(p) for p in self._coords.tolist()]
+
+    def tolerance_for_zoom(self, zoom: float) -> float:
+        """Metros que ocupa PIXEL_TOLERANCE píxeles a ese zoom y a la latitud de la ruta."""
+        if not len(self._coords):
+            return 0.0
+        lat = math.radians(float(np.mean(self._coords[:, 0])))
+        return METERS_PER_PIXEL_Z0 * math.cos(lat) / (2 ** zoom) * self.PIXEL_TOLERANCE
+
+    def simplify(self, tolerance_m: float) -> np.ndarray:
+        return self._coords[douglas_peucker(self._coords, tolerance_m)]
+
+    def simplified(self, zoom: float) -> List[Tuple[float, float]]:
+        """Vértices suficientes para dibujar la ruta a ese zoom sin diferencia visible."""
+        level = max(0, min(self.MAX_ZOOM, int(math.floor(zoom))))
+        with self._lock:
+            cached = self._levels.get(level)
+        if cached is None:
+            cached = self.simplify(self.tolerance_for_zoom(level))
+            with self._lock:
+                self._levels[level] = cached
+        return [tuple(p) for p in cached.tolist()]
+
+    def encoded(self, precision: int = 5) -> str:
+        return encode_polyline(self._coords.tolist(), precision)
+
+    def bounds(self) -> Tuple[Tuple[float, float], Tuple[float, float]]:
+        """((lat_max, lon_min), (lat_min, lon_max)): esquinas noroeste y sudeste."""
+        lat_max, lon_max = self._coords.max(axis=0)
+        lat_min, lon_min = self._coords.min(axis=0)
+        return (float(lat_max), float(lon_min)), (float(lat_min), float(lon_max))
@@ -0,0 +1,241 @@
+import random
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class CircuitOpenError(Exception):
+    """El servicio externo ha fallado repetidamente: se falla al instante sin llamarlo."""
+
+
+class EndpointPolicy:
+    """
+    Configuración de un servicio externo:
+    - timeout: (conexión, lectura) en segundos.
+    - retries / backoff: reintentos ante errores de red o 429/5xx, con espera exponencial
+      (backoff, 2*backoff, ...) y un poco de aleatoriedad.
+    - budget: tiempo total máximo de una llamada contando reintentos; no se reintenta si la
+      espera se saldría del presupuesto.
+    - min_interval: separación mínima entre peticiones (p. ej. 1 s para Nominatim).
+    - failure_threshold / reset_timeout: fallos seguidos que abren el circuito y segundos que
+      permanece abierto antes de dejar pasar una petición de prueba.
+    """
+
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+    def __init__(self, timeout=(3.05, 10), retries: int = 1, backoff: float = 0.3, budget: float = 15.0,
+                 min_interval: float = 0.0, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 headers: dict | None = None):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget
+        self.min_interval = min_interval
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.headers = headers or {}
+
+
+DEFAULT_POLICIES = {
+    "osrm": EndpointPolicy(timeout=(3.05, 10), retries=1, budget=15.0),
+    # Política de uso de Nominatim: 1 petición por segundo y User-Agent identificativo
+    "nominatim": EndpointPolicy(timeout=(3.05, 5), retries=1, budget=8.0, min_interval=1.0,
+                                headers={'User-Agent': 'MovalApp/1.0 (Student Project)'}),
+}
+
+
+class CircuitBreaker:
+    """Cerrado -> (N fallos seguidos) -> abierto -> (reset_timeout) -> semiabierto -> cerrado/abierto."""
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        """¿Puede salir la petición? En semiabierto solo pasa una (la de prueba)."""
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+            self._probing = False
+
+
+class HttpClient:
+    """
+    Cliente HTTP compartido por los servicios externos (OSRM, Nominatim): una sesión con
+    conexiones keep-alive reutilizadas, timeout y reintentos por servicio, circuit breaker para
+    fallar al instante (y que el llamante use su alternativa local) y métricas de latencia.
+    """
+
+    LATENCY_WINDOW = 500
+
+    def __init__(self, policies: dict | None = None, pool_size: int = 10,
+                 clock=time.monotonic, sleep=time.sleep):
+        self._clock = clock
+        self._sleep = sleep
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._policies = {}
+        self._breakers = {}
+        self._metrics = {}
+        self._last_request = {}
+        self._rate_locks = {}
+        for name, policy in (policies if policies is not None else DEFAULT_POLICIES).items():
+            self.register(name, policy)
+
+    def register(self, endpoint: str, policy: EndpointPolicy) -> None:
+        with self._lock:
+            self._policies[endpoint] = policy
+            self._breakers[endpoint] = CircuitBreaker(policy.failure_threshold, policy.reset_timeout, self._clock)
+            self._metrics[endpoint] = {
+                "requests": 0, "failures": 0, "retries": 0, "short_circuited": 0,
+                "latencies": deque(maxlen=self.LATENCY_WINDOW),
+            }
+            self._rate_locks[endpoint] = threading.Lock()
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        return self._breakers[endpoint]
+
+    def get_json(self, endpoint: str, url: str, params: dict | None = None, headers: dict | None = None):
+        """
+        GET con la política de `endpoint` y devuelve el JSON de la respuesta.
+        Lanza CircuitOpenError sin hacer la petición si el circuito está abierto, y la
+        excepción de requests si se agotan los reintentos.
+        """
+        policy = self._policies[endpoint]
+        breaker = self._breakers[endpoint]
+        metrics = self._metrics[endpoint]
+
+        if not breaker.allow():
+            with self._lock:
+                metrics["short_circuited"] += 1
+            raise CircuitOpenError(f"{endpoint}: servicio no disponible temporalmente")
+
+        all_headers = dict(policy.headers, **(headers or {}))
+        started = self._clock()
+        attempt = 0
+        while True:
+            self._respect_interval(endpoint, policy)
+            t0 = time.perf_counter()
+            try:
+                response = self._session.get(url, params=params, headers=all_headers, timeout=policy.timeout)
+                response.raise_for_status()
+                data = response.json()
+            except requests.RequestException as e:
+                self._record_latency(metrics, t0)
+                retryable = self._is_retryable(e)
+                wait = policy.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                if retryable and attempt < policy.retries and self._clock() - started + wait < policy.budget:
+                    attempt += 1
+                    with self._lock:
+                        metrics["retries"] += 1
+                    self._sleep(wait)
+                    continue
+                with self._lock:
+                    metrics["failures"] += 1
+                # Un 4xx es un error de la petición, no del servicio: no abre el circuito
+                if retryable:
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                raise
+            self._record_latency(metrics, t0)
+            breaker.record_success()
+            return data
+
+    @staticmethod
+    def _is_retryable(error: requests.RequestException) -> bool:
+        if isinstance(error, requests.HTTPError) and error.response is not None:
+            return error.response.status_code in EndpointPolicy.RETRY_STATUSES
+        return True
+
+    def _record_latency(self, metrics: dict, t0: float) -> None:
+        with self._lock:
+            metrics["requests"] += 1
+            metrics["latencies"].append(time.perf_counter() - t0)
+
+    def _respect_interval(self, endpoint: str, policy: EndpointPolicy) -> None:
+        if policy.min_interval <= 0:
+            return
+        with self._rate_locks[endpoint]:
+            last = self._last_request.get(endpoint)
+            now = self._clock()
+            if last is not None and now - last < policy.min_interval:
+                self._sleep(policy.min_interval - (now - last))
+            self._last_request[endpoint] = self._clock()
+
+    def metrics(self) -> dict:
+        """Por servicio: peticiones, fallos, reintentos, cortocircuitos, estado y latencias (ms)."""
+        out = {}
+        with self._lock:
+            items = [(name, dict(m), list(m["latencies"])) for name, m in self._metrics.items()]
+        for name, m, latencies in items:
+            m.pop("latencies")
+            m["state"] = self._breakers[name].state
+            if latencies:
+                ordered = sorted(latencies)
+                m["latency_ms"] = {
+                    "avg": sum(ordered) / len(ordered) * 1000,
+                    "p50": ordered[len(ordered) // 2] * 1000,
+                    "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                    "max": ordered[-1] * 1000,
+                }
+            out[name] = m
+        return out
+
+    def close(self) -> None:
+        self._session.close()
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    """Cliente compartido por todo el proceso (una sesión y un circuito por servicio)."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
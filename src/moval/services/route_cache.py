@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+from typing import Callable, Hashable
+
+
+class RouteCache:
+    """
+    Caché de la ruta optimizada de cada mensajero, compartida por GenerateDeliveryRoute y
+    CalculateETA. Se guarda una ruta por mensajero junto con la clave con la que se calculó
+    (paradas activas con sus coordenadas + punto de inicio): si la clave cambia, se recalcula.
+
+    Además se invalida explícitamente al asignar o desasignar. Al entregar o reportar una
+    incidencia la ruta solo se marca como caducada: ya no se sirve, pero GenerateDeliveryRoute
+    la usa como base para actualizarla sin reoptimizar (`peek`).
+    """
+
+    def __init__(self, max_couriers: int = 256):
+        self.max_couriers = max_couriers
+        self._lock = threading.Lock()
+        self._routes = OrderedDict()   # courier_id -> (clave, ruta)
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+    @staticmethod
+    def make_key(stops: list, start_coords: tuple | None) -> Hashable:
+        """Clave independiente del orden: {(id, lat, lon)} de las paradas + inicio."""
+        stop_set = frozenset(
+            (s["id"], round(float(s["latitud"]), 6), round(float(s["longitud"]), 6)) for s in stops
+        )
+        start = tuple(round(float(c), 6) for c in start_coords) if start_coords else None
+        return stop_set, start
+
+    def get_or_compute(self, courier_id: int, key: Hashable, compute: Callable[[], dict]) -> dict:
+        with self._lock:
+            entry = self._routes.get(courier_id)
+            if entry is not None and entry[0] == key:
+                self._routes.move_to_end(courier_id)
+                self._stats["hits"] += 1
+                return entry[1]
+            self._stats["misses"] += 1
+
+        # El cálculo (OSRM u optimizador local) se hace fuera del lock
+        route = compute()
+
+        with self._lock:
+            self._routes[courier_id] = (key, route)
+            self._routes.move_to_end(courier_id)
+            while len(self._routes) > self.max_couriers:
+                self._routes.popitem(last=False)
+                self._stats["evictions"] += 1
+        return route
+
+    def peek(self, courier_id: int) -> dict | None:
+        """Última ruta del mensajero aunque esté caducada (sin contar acierto ni fallo)."""
+        with self._lock:
+            entry = self._routes.get(courier_id)
+            return entry[1] if entry is not None else None
+
+    def mark_stale(self, courier_id: int | None) -> None:
+        """La ruta deja de servirse tal cual, pero se conserva como base para actualizarla."""
+        if courier_id is None:
+            return
+        with self._lock:
+            entry = self._routes.get(courier_id)
+            if entry is not None:
+                self._routes[courier_id] = (None, entry[1])
+                self._stats["invalidations"] += 1
+
+    def invalidate_courier(self, courier_id: int | None) -> None:
+        if courier_id is None:
+            return
+        with self._lock:
+            if self._routes.pop(courier_id, None) is not None:
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._routes.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, size=len(self._routes))
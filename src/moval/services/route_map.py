@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import folium
+
+
+class RouteMapRenderer:
+    """
+    Genera bajo demanda el mapa HTML (folium) de una ruta ya calculada.
+
+    El cálculo de rutas y ETA no genera HTML ni escribe en disco: el mapa se pide solo cuando
+    alguien lo va a ver y se dibuja en un hilo aparte. Cada ruta se guarda en su propio fichero,
+    nombrado con un hash de su contenido, así que una ruta sin cambios reutiliza el fichero y
+    varios mensajeros no se pisan el mismo HTML.
+    """
+
+    DEFAULT_DIR = os.path.join(os.getcwd(), 'docs', 'exports')
+
+    def __init__(self, output_dir: str | None = None, max_workers: int = 1):
+        self.output_dir = output_dir or self.DEFAULT_DIR
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="route-map")
+        self._lock = threading.Lock()
+        self._pending = {}   # hash -> Future de un render en curso
+        self._stats = {"rendered": 0, "reused": 0, "joined": 0}
+
+    @staticmethod
+    def route_hash(route: dict, stops: list) -> str:
+        """Hash del contenido que se dibuja: extremos, paradas en orden de visita y geometría."""
+        content = {
+            "start": route["points"][0],
+            "end": route["points"][-1],
+            "stops": [[float(s['latitud']), float(s['longitud']), s.get('direccion', '')] for s in stops],
+            "geometry": route["geometry"].encoded() if route.get("geometry") is not None else "",
+        }
+        raw = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:20]
+
+    def path_for(self, route: dict, stops: list) -> str:
+        return os.path.join(self.output_dir, f"ruta_{self.route_hash(route, stops)}.html")
+
+    def request(self, route: dict, stops: list) -> Future:
+        """
+        Devuelve un Future con la ruta del fichero HTML. `stops` son los paquetes en orden de
+        visita (p. ej. `ordered_shipments` de GenerateDeliveryRoute).
+        Si el fichero ya existe el Future está resuelto; si ya se está dibujando, se comparte.
+        """
+        key = self.route_hash(route, stops)
+        path = os.path.join(self.output_dir, f"ruta_{key}.html")
+        with self._lock:
+            if os.path.exists(path):
+                self._stats["reused"] += 1
+                future = Future()
+                future.set_result(path)
+                return future
+            future = self._pending.get(key)
+            if future is not None:
+                self._stats["joined"] += 1
+                return future
+            future = self._executor.submit(self._render, route, list(stops), path)
+            self._pending[key] = future
+
+        def _done(_f, key=key):
+            with self._lock:
+                self._pending.pop(key, None)
+        future.add_done_callback(_done)
+        return future
+
+    def render(self, route: dict, stops: list, timeout: float | None = None) -> str:
+        """Versión bloqueante de `request`."""
+        return self.request(route, stops).result(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats, pending=len(self._pending))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _render(self, route: dict, stops: list, path: str) -> str:
+        start_lat, start_lon = route["points"][0]
+        end_lat, end_lon = route["points"][-1]
+        m = folium.Map(location=[start_lat, start_lon], zoom_start=13)
+
+        folium.Marker(
+            [start_lat, start_lon],
+            tooltip="Inicio (Actual)",
+            icon=folium.Icon(color="green", icon="play")
+        ).add_to(m)
+
+        folium.Marker(
+            [end_lat, end_lon],
+            tooltip="Almacén (Fin)",
+            icon=folium.Icon(color="red", icon="home")
+        ).add_to(m)
+
+        geometry = route.get("geometry")
+        if geometry is not None and len(geometry):
+            folium.GeoJson(
+                {"type": "LineString", "coordinates": geometry.coords[:, ::-1].tolist()},
+                name="Ruta Optimizada",
+                style_function=lambda x: {'color': 'blue', 'weight': 5, 'opacity': 0.7}
+            ).add_to(m)
+
+        for i, pkg in enumerate(stops, start=1):
+            p_dir = pkg.get('direccion', '')
+            folium.Marker(
+                [float(pkg['latitud']), float(pkg['longitud'])],
+                tooltip=f"{i}. {p_dir}",
+                icon=folium.Icon(color="blue", icon="box", prefix="fa"),
+                popup=f"Entrega #{i}<br>{p_dir}"
+            ).add_to(m)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        # Se escribe en un temporal y se renombra: quien abra el fichero nunca lo ve a medias
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        m.save(tmp_path)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._stats["rendered"] += 1
+        return path
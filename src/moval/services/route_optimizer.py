@@ -0,0 +1,178 @@
+import math
+import time
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+# Mejora mínima (en metros) para aceptar un movimiento: evita bucles por errores de redondeo
+_EPS = 1e-6
+
+
+def haversine_matrix(points: Sequence[Tuple[float, float]]) -> np.ndarray:
+    """Matriz de distancias en línea recta (metros) entre todos los pares de puntos (lat, lon)."""
+    coords = np.radians(np.asarray(points, dtype=float).reshape(-1, 2))
+    lat = coords[:, 0]
+    lon = coords[:, 1]
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+def path_length(dist: np.ndarray, order: Sequence[int]) -> float:
+    order = np.asarray(order)
+    return float(dist[order[:-1], order[1:]].sum())
+
+
+def nearest_neighbour_path(dist: np.ndarray) -> List[int]:
+    """Camino abierto del nodo 0 al último: siempre al vecino más cercano aún no visitado."""
+    n = len(dist)
+    if n <= 2:
+        return list(range(n))
+    visited = np.zeros(n, dtype=bool)
+    visited[0] = visited[n - 1] = True
+    order = [0]
+    current = 0
+    for _ in range(n - 2):
+        row = np.where(visited, np.inf, dist[current])
+        current = int(np.argmin(row))
+        visited[current] = True
+        order.append(current)
+    order.append(n - 1)
+    return order
+
+
+def two_opt(dist: np.ndarray, order: List[int], deadline: float = math.inf) -> Tuple[List[int], bool]:
+    """
+    2-opt sobre un camino abierto con extremos fijos: invierte tramos order[i..j] mientras
+    acorten el recorrido. Para cada i evalúa todos los j a la vez con numpy.
+    """
+    tour = np.asarray(order)
+    n = len(tour)
+    improved_any = False
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for i in range(1, n - 2):
+            a, b = tour[i - 1], tour[i]
+            js = np.arange(i + 1, n - 1)
+            c, e = tour[js], tour[js + 1]
+            delta = dist[a, c] + dist[b, e] - dist[a, b] - dist[c, e]
+            k = int(np.argmin(delta))
+            if delta[k] < -_EPS:
+                j = js[k]
+                tour[i:j + 1] = tour[i:j + 1][::-1]
+                improved = improved_any = True
+    return tour.tolist(), improved_any
+
+
+def or_opt(dist: np.ndarray, order: List[int], max_segment: int = 3,
+           deadline: float = math.inf) -> Tuple[List[int], bool]:
+    """
+    Or-opt: mueve tramos de 1..`max_segment` paradas consecutivas (también invertidos) al hueco
+    donde menos cuestan. Los extremos del camino no se mueven.
+    """
+    tour = list(order)
+    n = len(tour)
+    improved_any = False
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for length in range(1, max_segment + 1):
+            i = 1
+            while i + length <= n - 1:
+                seg = tour[i:i + length]
+                prev, nxt = tour[i - 1], tour[i + length]
+                removal_gain = dist[prev, seg[0]] + dist[seg[-1], nxt] - dist[prev, nxt]
+
+                rest = np.asarray(tour[:i] + tour[i + length:])
+                p, q = rest[:-1], rest[1:]
+                forward = dist[p, seg[0]] + dist[seg[-1], q] - dist[p, q]
+                backward = dist[p, seg[-1]] + dist[seg[0], q] - dist[p, q]
+                costs = np.minimum(forward, backward)
+                k = int(np.argmin(costs))
+
+                if costs[k] - removal_gain < -_EPS:
+                    moved = seg if forward[k] <= backward[k] else seg[::-1]
+                    rest = rest.tolist()
+                    tour = rest[:k + 1] + moved + rest[k + 1:]
+                    improved = improved_any = True
+                i += 1
+    return tour, improved_any
+
+
+def solve_open_path(dist: np.ndarray, time_limit: float | None = None) -> List[int]:
+    """
+    Orden de visita del camino abierto 0 -> ... -> n-1 (inicio y fin fijos):
+    vecino más cercano y luego 2-opt + Or-opt hasta que ninguno mejore (o se agote `time_limit`).
+    """
+    deadline = time.perf_counter() + time_limit if time_limit else math.inf
+    order = nearest_neighbour_path(dist)
+    if len(order) <= 3:
+        return order
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        order, improved_2opt = two_opt(dist, order, deadline)
+        order, improved_oropt = or_opt(dist, order, deadline=deadline)
+        improved = improved_2opt or improved_oropt
+    return order
+
+
+class LocalRouteOptimizer:
+    """
+    Optimizador de rutas sin red: resuelve el TSP de camino abierto (inicio -> paradas -> almacén)
+    sobre una matriz de distancias y estima tiempos con una velocidad media.
+
+    Por defecto la matriz es la distancia en línea recta multiplicada por `road_factor`
+    (aproximación del trazado real por carretera). Se puede inyectar otra con `distance_matrix`:
+    un callable que recibe los puntos y devuelve la matriz de distancias (m) o una tupla
+    (distancias, duraciones en s), p. ej. DistanceMatrixService con la caché de OSRM /table.
+    """
+
+    def __init__(self, speed_kmh: float = 30.0, road_factor: float = 1.3,
+                 time_limit: float | None = 2.0,
+                 distance_matrix: Optional[Callable[[list], object]] = None):
+        self.speed_ms = speed_kmh / 3.6
+        self.road_factor = road_factor
+        self.time_limit = time_limit
+        self.distance_matrix = distance_matrix
+
+    def matrices(self, points: list) -> Tuple[np.ndarray, np.ndarray]:
+        if self.distance_matrix is None:
+            dist = haversine_matrix(points) * self.road_factor
+            return dist, dist / self.speed_ms
+        result = self.distance_matrix(points)
+        if isinstance(result, tuple):
+            dist, dur = result
+            return np.asarray(dist, dtype=float), np.asarray(dur, dtype=float)
+        dist = np.asarray(result, dtype=float)
+        return dist, dist / self.speed_ms
+
+    def solve(self, points: List[Tuple[float, float]]) -> dict:
+        """
+        `points` = [inicio, parada_1, ..., parada_N, fin] como (lat, lon).
+        Devuelve el mismo formato que un trip de OSRM: orden de visita (índices de `points`),
+        tramos con distancia (m) y duración (s), totales y geometría GeoJSON.
+        """
+        if len(points) < 2:
+            raise ValueError("Se necesitan al menos el punto de inicio y el de fin")
+        dist, dur = self.matrices(points)
+        # Se optimiza la distancia (casi simétrica también por carretera, como asume 2-opt)
+        order = solve_open_path(dist, self.time_limit)
+
+        legs = []
+        for a, b in zip(order[:-1], order[1:]):
+            legs.append({"distance": float(dist[a, b]), "duration": float(dur[a, b])})
+
+        return {
+            "order": order,
+            "legs": legs,
+            "distance": sum(leg["distance"] for leg in legs),
+            "duration": sum(leg["duration"] for leg in legs),
+            "geometry": {
+                "type": "LineString",
+                "coordinates": [[points[i][1], points[i][0]] for i in order],
+            },
+        }
@@ -1,8 +1,12 @@
-import requests
-import folium
-import os
-import json
-import webbrowser
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from moval.services.route_optimizer import LocalRouteOptimizer
+from moval.services.geometry import RouteGeometry
+from moval.services.http_client import get_http_client
 
 class RouteService:
     # Coordinates for Universidad de León (Campus de Vegazana)
@@ -11,6 +15,38 @@ class RouteService:
     
     # OSRM Trip API endpoint
     OSRM_API_URL = "http://router.project-osrm.org/trip/v1/driving/{coords}"
+    # OSRM Route API: geometría por carretera de un orden de visita ya decidido
+    OSRM_ROUTE_URL = "http://router.project-osrm.org/route/v1/driving/{coords}"
+
+    ENGINES = ("osrm", "local")
+    ROAD_GEOMETRY_CACHE_SIZE = 64
+    # Límite de puntos por petición de los servidores OSRM (max-trip-size / max-viaroute-size)
+    MAX_WAYPOINTS = 100
+    # Peticiones simultáneas al partir una ruta grande en tramos
+    CHUNK_WORKERS = 4
+
+    def __init__(self, engine: str = "osrm", fallback: bool = True, optimizer: LocalRouteOptimizer | None = None,
+                 matrix_service=None, http_client=None, max_waypoints: int | None = None):
+        """
+        engine: "osrm" (API pública /trip) o "local" (LocalRouteOptimizer, sin red).
+        fallback: con engine="osrm", si OSRM falla o no responde se usa el optimizador local.
+        matrix_service: proveedor de matrices (p. ej. DistanceMatrixService, con caché en disco)
+            para el optimizador local cuando no se pasa `optimizer`.
+        http_client: HttpClient compartido (timeouts, reintentos y circuit breaker de OSRM).
+        max_waypoints: puntos por petición a OSRM; las rutas más largas se resuelven por tramos.
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Motor de rutas no soportado: {engine}")
+        self.engine = engine
+        self.fallback = fallback
+        self.max_waypoints = max_waypoints or self.MAX_WAYPOINTS
+        if self.max_waypoints < 3:
+            raise ValueError("max_waypoints debe ser al menos 3")
+        self.optimizer = optimizer or LocalRouteOptimizer(distance_matrix=matrix_service)
+        self.http = http_client or get_http_client()
+        # Geometrías por carretera ya descargadas, por secuencia de puntos visitados
+        self._road_geometries = OrderedDict()
+        self._road_lock = threading.Lock()
 
     def calculate_optimized_route(self, packages: list, start_coords: tuple = None) -> dict:
         """
@@ -18,136 +54,219 @@ class RouteService:
         If start_coords (lat, lon) is provided, starts from there.
         Otherwise starts from Warehouse.
         Ends at Warehouse.
+
+        waypoints_order es el ORDEN DE VISITA como índices de la entrada:
+        0 = inicio, 1..N = packages[0..N-1], N+1 = almacén. legs[i] va de waypoints_order[i]
+        a waypoints_order[i+1].
         """
         try:
             # Empty check removed to allow Return Trip (Start -> Warehouse)
             # if not packages: raise ValueError("The package list is empty.")
 
-            coords_list = []
-            
             # 1. Determine Start Point
             if start_coords:
                 # Custom Start (Last delivery)
-                coords_list.append(f"{start_coords[1]},{start_coords[0]}")
+                points = [(float(start_coords[0]), float(start_coords[1]))]
             else:
                 # Warehouse Start
-                coords_list.append(f"{self.WAREHOUSE_LON},{self.WAREHOUSE_LAT}")
+                points = [(self.WAREHOUSE_LAT, self.WAREHOUSE_LON)]
             
             # Add Packages
-            def get_val(obj, key):
-                return getattr(obj, key) if hasattr(obj, key) else obj[key]
-
             for pkg in packages:
-                lat = float(get_val(pkg, 'latitud'))
-                lon = float(get_val(pkg, 'longitud'))
-                coords_list.append(f"{lon},{lat}")
+                points.append((float(self._get_val(pkg, 'latitud')), float(self._get_val(pkg, 'longitud'))))
             
             # End at Warehouse
-            coords_list.append(f"{self.WAREHOUSE_LON},{self.WAREHOUSE_LAT}")
-            
-            coords_str = ";".join(coords_list)
-
-            # Call OSRM API
-            params = {
-                "source": "first",
-                "destination": "last",
-                "roundtrip": "false", 
-                "overview": "full",
-                "geometries": "geojson"
-            }
-            
-            url = self.OSRM_API_URL.format(coords=coords_str)
-            response = requests.get(url, params=params)
-            response.raise_for_status()
-            data = response.json()
+            points.append((self.WAREHOUSE_LAT, self.WAREHOUSE_LON))
 
-            if data.get("code") != "Ok":
-                raise Exception(f"OSRM API Error: {data.get('code')} - {data.get('message')}")
+            engine = self.engine
+            if engine == "osrm":
+                try:
+                    trip = self._solve_osrm(points)
+                except Exception as e:
+                    if not self.fallback:
+                        raise
+                    print(f"OSRM no disponible ({e}); se usa el optimizador local")
+                    engine = "local"
+            if engine == "local":
+                trip = self.optimizer.solve(points)
 
-            trips = data.get("trips", [])
-            if not trips:
-                raise Exception("No route found.")
-            
-            trip = trips[0]
-            geometry = trip["geometry"]
-            total_duration_sec = trip["duration"]
-            total_distance_meters = trip["distance"]
-            
-            # Generate Map
-            # Center on Start
-            start_lat = start_coords[0] if start_coords else self.WAREHOUSE_LAT
-            start_lon = start_coords[1] if start_coords else self.WAREHOUSE_LON
-            m = folium.Map(location=[start_lat, start_lon], zoom_start=13)
-
-            # Mark Start
-            folium.Marker(
-                [start_lat, start_lon],
-                tooltip="Inicio (Actual)",
-                icon=folium.Icon(color="green", icon="play")
-            ).add_to(m)
-
-            # Mark Warehouse (End)
-            folium.Marker(
-                [self.WAREHOUSE_LAT, self.WAREHOUSE_LON],
-                tooltip="Almacén (Fin)",
-                icon=folium.Icon(color="red", icon="home")
-            ).add_to(m)
-
-            folium.GeoJson(
-                geometry,
-                name="Ruta Optimizada",
-                style_function=lambda x: {'color': 'blue', 'weight': 5, 'opacity': 0.7}
-            ).add_to(m)
-
-            optimized_indices = []
-            
-            for i, wp in enumerate(data.get("waypoints", [])):
-                original_idx = wp['waypoint_index']
-                optimized_indices.append(original_idx)
-
-                # Skip start (0) and end (len-1) for package markers
-                if original_idx == 0 or original_idx == len(coords_list) - 1:
-                    continue
-                
-                # Pkg Index
-                pkg_idx = original_idx - 1
-                if 0 <= pkg_idx < len(packages):
-                    pkg = packages[pkg_idx]
-                    p_lat = float(get_val(pkg, 'latitud'))
-                    p_lon = float(get_val(pkg, 'longitud'))
-                    p_dir = get_val(pkg, 'direccion')
-                    
-                    folium.Marker(
-                        [p_lat, p_lon],
-                        tooltip=f"{i}. {p_dir}",
-                        icon=folium.Icon(color="blue", icon="box", prefix="fa"),
-                        popup=f"Entrega #{i}<br>{p_dir}"
-                    ).add_to(m)
-
-            output_dir = os.path.join(os.getcwd(), 'docs', 'exports')
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir, exist_ok=True)
-            
-            map_filename = "ruta_optimizada.html"
-            map_path = os.path.join(output_dir, map_filename)
-            m.save(map_path)
-
-            # Convert [lon, lat] to [lat, lon] for tkintermapview
-            raw_coords = geometry.get('coordinates', [])
-            path_coords = [(c[1], c[0]) for c in raw_coords]
+            geometry = self._as_geometry(trip["geometry"])
 
             return {
-                "total_time_minutes": int(total_duration_sec / 60),
-                "total_distance_km": round(total_distance_meters / 1000, 2),
-                "map_path": map_path,
-                "waypoints_order": optimized_indices,
-                "legs": trip.get("legs", []),
-                "geometry_coordinates": path_coords
+                "total_time_minutes": int(trip["duration"] / 60),
+                "total_distance_km": round(trip["distance"] / 1000, 2),
+                # Entrada en orden de índices (0 = inicio, N+1 = almacén); el mapa HTML se genera
+                # aparte y solo si se pide (RouteMapRenderer)
+                "points": points,
+                "waypoints_order": trip["order"],
+                "legs": trip["legs"],
+                # Array compacto (lat, lon); la vista pide la versión simplificada para su zoom
+                "geometry": geometry,
+                "engine": engine
             }
 
         except Exception as e:
             print(f"Error calculating route: {e}")
             raise e
 
+    def leg_costs(self, pairs: list) -> list:
+        """
+        Distancia (m) y duración (s) de tramos sueltos [((lat, lon), (lat, lon))], con la misma
+        matriz que el optimizador local (caché en disco si tiene DistanceMatrixService).
+        """
+        if not pairs:
+            return []
+        points = list(dict.fromkeys(p for pair in pairs for p in pair))
+        index = {p: i for i, p in enumerate(points)}
+        dist, dur = self.optimizer.matrices(points)
+        return [{"distance": float(dist[index[a], index[b]]), "duration": float(dur[index[a], index[b]])}
+                for a, b in pairs]
+
+    def road_geometry(self, route: dict) -> RouteGeometry:
+        """
+        Geometría completa por carretera de una ruta ya calculada, bajo demanda.
+        Las rutas de OSRM /trip ya la traen; las del optimizador local (líneas rectas entre
+        paradas) se completan con OSRM /route en el orden de visita. Si OSRM no responde se
+        devuelve la geometría que ya tenía la ruta.
+        """
+        if route.get("engine") == "osrm":
+            return route["geometry"]
+        visit = tuple(tuple(route["points"][i]) for i in route["waypoints_order"])
+        with self._road_lock:
+            cached = self._road_geometries.get(visit)
+            if cached is not None:
+                self._road_geometries.move_to_end(visit)
+                return cached
+        try:
+            geometry = self._fetch_road_geometry(visit)
+        except Exception as e:
+            print(f"No se pudo obtener la geometría por carretera ({e})")
+            return route["geometry"]
+        with self._road_lock:
+            self._road_geometries[visit] = geometry
+            while len(self._road_geometries) > self.ROAD_GEOMETRY_CACHE_SIZE:
+                self._road_geometries.popitem(last=False)
+        return geometry
+
+    def _fetch_road_geometry(self, visit: tuple) -> RouteGeometry:
+        pieces = self._in_parallel(self._fetch_road_piece,
+                                   [visit[w[0]:w[-1] + 1] for w in self._windows(len(visit))])
+        return RouteGeometry(self._stitch_coords([piece.coords for piece in pieces]))
+
+    def _fetch_road_piece(self, visit: tuple) -> RouteGeometry:
+        coords_str = ";".join(f"{lon},{lat}" for lat, lon in visit)
+        params = {"overview": "full", "geometries": "polyline6"}
+        data = self.http.get_json("osrm", self.OSRM_ROUTE_URL.format(coords=coords_str), params=params)
+        if data.get("code") != "Ok" or not data.get("routes"):
+            raise Exception(f"OSRM API Error: {data.get('code')} - {data.get('message')}")
+        return RouteGeometry.from_polyline(data["routes"][0]["geometry"], precision=6)
+
+    @staticmethod
+    def _get_val(obj, key):
+        return getattr(obj, key) if hasattr(obj, key) else obj[key]
+
+    @staticmethod
+    def _as_geometry(geometry) -> RouteGeometry:
+        if isinstance(geometry, RouteGeometry):
+            return geometry
+        if isinstance(geometry, str):
+            return RouteGeometry.from_polyline(geometry, precision=6)
+        return RouteGeometry.from_geojson(geometry)
+
+    def _windows(self, n: int) -> list:
+        """
+        Parte el recorrido 0..n-1 en tramos consecutivos de hasta max_waypoints puntos que
+        comparten el punto de unión: el último de un tramo es el primero del siguiente.
+        """
+        size = self.max_waypoints
+        windows = []
+        i = 0
+        while True:
+            windows.append(list(range(i, min(i + size, n))))
+            if i + size >= n:
+                return windows
+            i += size - 1
+
+    def _in_parallel(self, fn, items: list) -> list:
+        if len(items) == 1:
+            return [fn(items[0])]
+        with ThreadPoolExecutor(max_workers=min(self.CHUNK_WORKERS, len(items)),
+                                thread_name_prefix="osrm-chunk") as pool:
+            return list(pool.map(fn, items))
+
+    @staticmethod
+    def _stitch_coords(pieces: list) -> np.ndarray:
+        # El primer vértice de cada tramo repite el último del anterior (punto de unión)
+        parts = [np.asarray(p, dtype=float).reshape(-1, 2) for p in pieces]
+        return np.concatenate([parts[0]] + [p[1:] for p in parts[1:]]) if parts else np.empty((0, 2))
+
+    def _solve_osrm(self, points: list) -> dict:
+        if len(points) <= self.max_waypoints:
+            return self._solve_osrm_trip(points)
+        return self._solve_osrm_chunked(points)
+
+    def _solve_osrm_chunked(self, points: list) -> dict:
+        """
+        Rutas con más puntos de los que admite OSRM: el optimizador local fija un orden global
+        aproximado, que se corta en tramos consecutivos (inicio y fin de cada tramo fijos, el
+        fin de uno es el inicio del siguiente). Cada tramo se optimiza con OSRM /trip, en
+        paralelo, y se unen órdenes, tramos y geometría respetando los índices de `points`.
+        """
+        rough = self.optimizer.solve(points)["order"]
+        windows = [[rough[k] for k in w] for w in self._windows(len(rough))]
+        trips = self._in_parallel(self._solve_osrm_trip, [[points[j] for j in w] for w in windows])
+
+        order, legs, geometries = [], [], []
+        for w, trip in zip(windows, trips):
+            visit = [w[k] for k in trip["order"]]
+            order.extend(visit if not order else visit[1:])
+            legs.extend(trip["legs"])
+            geometries.append(self._as_geometry(trip["geometry"]).coords)
+
+        return {
+            "order": order,
+            "legs": legs,
+            "distance": sum(trip["distance"] for trip in trips),
+            "duration": sum(trip["duration"] for trip in trips),
+            "geometry": RouteGeometry(self._stitch_coords(geometries)),
+        }
+
+    def _solve_osrm_trip(self, points: list) -> dict:
+        coords_str = ";".join(f"{lon},{lat}" for lat, lon in points)
+
+        # Call OSRM API
+        params = {
+            "source": "first",
+            "destination": "last",
+            "roundtrip": "false", 
+            "overview": "full",
+            # Polilínea codificada: mucho más ligera que GeoJSON en rutas largas
+            "geometries": "polyline6"
+        }
+        
+        url = self.OSRM_API_URL.format(coords=coords_str)
+        data = self.http.get_json("osrm", url, params=params)
+
+        if data.get("code") != "Ok":
+            raise Exception(f"OSRM API Error: {data.get('code')} - {data.get('message')}")
+
+        trips = data.get("trips", [])
+        if not trips:
+            raise Exception("No route found.")
+        
+        trip = trips[0]
+        # OSRM devuelve, para cada punto de entrada, su posición en el viaje (waypoint_index);
+        # se invierte para obtener el orden de visita
+        waypoints = data.get("waypoints", [])
+        order = sorted(range(len(waypoints)), key=lambda i: waypoints[i]['waypoint_index'])
+
+        return {
+            "order": order,
+            "legs": trip.get("legs", []),
+            "distance": trip["distance"],
+            "duration": trip["duration"],
+            "geometry": trip["geometry"],
+        }
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
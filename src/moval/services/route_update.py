@@ -0,0 +1,111 @@
+from typing import Callable, List, Optional, Tuple
+
+from moval.services.geometry import RouteGeometry
+
+# Umbral por defecto: se reoptimiza si la ruta actualizada cuesta un 15% más de lo previsto
+MAX_DEGRADATION = 0.15
+
+_START, _END = "__inicio__", "__fin__"
+
+
+def _coords(pkg: dict) -> Tuple[float, float]:
+    return float(pkg['latitud']), float(pkg['longitud'])
+
+
+def _same_place(a, b) -> bool:
+    return all(round(float(x), 6) == round(float(y), 6) for x, y in zip(a, b))
+
+
+def remaining_route(previous: dict, packages: list, start_coords: Optional[tuple],
+                    leg_costs: Callable[[List[tuple]], List[dict]],
+                    max_degradation: float = MAX_DEGRADATION) -> Optional[dict]:
+    """
+    Actualiza una ruta ya optimizada (`previous`, con `ordered_shipments`) cuando han salido
+    paradas (entregadas o con incidencia): mantiene el orden de las que quedan, reutiliza sus
+    tramos y solo calcula con `leg_costs` los tramos nuevos (desde el nuevo inicio y los que
+    puentean paradas quitadas).
+
+    Devuelve None, para que se haga una optimización completa, si hay paradas nuevas o movidas,
+    o si la ruta resultante cuesta (en tiempo) más de `max_degradation` por encima de lo que la
+    última optimización completa preveía para esas mismas paradas. La previsión se guarda en la
+    ruta (`baseline_duration`) y pasa de una actualización a la siguiente, así que las pérdidas
+    de varias actualizaciones seguidas se acumulan en lugar de medirse cada una por separado.
+    `leg_costs` recibe [((lat, lon), (lat, lon))] y devuelve [{"distance", "duration"}].
+    """
+    old_stops = previous.get("ordered_shipments")
+    if not old_stops or not previous.get("points") or not packages:
+        return None
+
+    old_coords = {s['id']: _coords(s) for s in old_stops}
+    for pkg in packages:
+        if pkg['id'] not in old_coords or not _same_place(old_coords[pkg['id']], _coords(pkg)):
+            return None
+
+    old_nodes = [_START] + [s['id'] for s in old_stops] + [_END]
+    old_legs = previous["legs"]
+    if len(old_legs) != len(old_nodes) - 1:
+        return None
+    leg_of = dict(zip(zip(old_nodes, old_nodes[1:]), old_legs))
+
+    end = tuple(previous["points"][-1])
+    start = tuple(float(c) for c in start_coords) if start_coords else end
+    wanted = {pkg['id']: pkg for pkg in packages}
+
+    # El nuevo inicio suele ser la parada recién entregada: sus tramos de salida ya se conocen
+    if _same_place(start, previous["points"][0]):
+        start_node = _START
+    else:
+        start_node = next((sid for sid in old_nodes[1:-1]
+                           if sid not in wanted and _same_place(old_coords[sid], start)), None)
+    kept = [sid for sid in old_nodes[1:-1] if sid in wanted]
+    nodes = [_START] + kept + [_END]
+    place = {_START: start, _END: end}
+    place.update({sid: _coords(wanted[sid]) for sid in kept})
+
+    legs = []
+    missing = []
+    for i, (a, b) in enumerate(zip(nodes, nodes[1:])):
+        leg = leg_of.get((start_node if a == _START else a, b))
+        legs.append(leg)
+        if leg is None:
+            missing.append(i)
+    if missing:
+        fresh = leg_costs([(place[nodes[i]], place[nodes[i + 1]]) for i in missing])
+        for i, leg in zip(missing, fresh):
+            legs[i] = leg
+
+    # Lo que la última optimización completa preveía desde el tramo que llegaba a la primera
+    # parada restante (las paradas que quedan siempre estaban en ese plan)
+    baseline = previous.get("baseline_duration") or _baseline_duration(old_nodes, old_legs)
+    reference = baseline[kept[0]]
+    cost = sum(leg["duration"] for leg in legs)
+    degradation = (cost - reference) / reference if reference > 0 else 0.0
+    if degradation > max_degradation:
+        return None
+
+    index_of = {pkg['id']: i + 1 for i, pkg in enumerate(packages)}
+    points = [start] + [_coords(pkg) for pkg in packages] + [end]
+    order = [0] + [index_of[sid] for sid in kept] + [len(packages) + 1]
+    return {
+        "total_time_minutes": int(cost / 60),
+        "total_distance_km": round(sum(leg.get("distance", 0) for leg in legs) / 1000, 2),
+        "points": points,
+        "waypoints_order": order,
+        "legs": legs,
+        # Líneas rectas entre paradas; el trazado por carretera se pide aparte (road_geometry)
+        "geometry": RouteGeometry([points[i] for i in order]),
+        "engine": "incremental",
+        "degradation": degradation,
+        "baseline_duration": baseline,
+    }
+
+
+def _baseline_duration(nodes: list, legs: List[dict]) -> dict:
+    """{id_parada: segundos previstos desde el tramo que llega a ella hasta el final} de un plan completo."""
+    remaining = {}
+    total = 0.0
+    for node, leg in zip(reversed(nodes), reversed(legs)):
+        total += leg["duration"]
+        if node != _END:
+            remaining[node] = total
+    return remaining
@@ -1,14 +1,15 @@
 from moval.usecases.errors import ValidationError, PermissionError, NotFoundError, ConflictError
-from moval.domain.enums import ShipmentStatus
+from moval.domain.enums import ShipmentStatus, GeocodeStatus
 
 class AssignShipments:
     """
     Gestiona la asignación masiva de paquetes a mensajeros por parte de un administrador.
     """
 
-    def __init__(self, shipment_repo, courier_repo):
+    def __init__(self, shipment_repo, courier_repo, route_cache=None):
         self.shipment_repo = shipment_repo
         self.courier_repo = courier_repo
+        self.route_cache = route_cache
 
     def execute(self, actor: dict, shipment_ids: list[int], courier_id: int) -> dict:
         """
@@ -20,7 +21,7 @@ class AssignShipments:
             courier_id (int): ID del mensajero.
 
         Returns:
-            dict: Lista de paquetes actualizados.
+            dict: Lista de paquetes actualizados y los que aún esperan coordenadas ("pending_geocode").
         """
         if not actor or "id" not in actor or "role" not in actor:
             raise ValidationError("Se requiere autenticación")
@@ -34,39 +35,59 @@ class AssignShipments:
         if not courier_id:
             raise ValidationError("Debe proporcionar el ID del mensajero")
 
-        # Verificar existencia del mensajero
-        courier = self.courier_repo.get(courier_id)
-        if not courier:
-            raise NotFoundError(f"Mensajero {courier_id} no encontrado")
-
-        # Removed availability check to allow assignment even if courier is not active
-
-        shipments = []
-        for shipment_id in shipment_ids:
-            shipment = self.shipment_repo.get(shipment_id)
-            if not shipment:
-                raise NotFoundError(f"Paquete {shipment_id} no encontrado")
-
-            # Se pueden asignar paquetes REGISTRADOS o en INCIDENCIA
-            if shipment["estado"] not in [ShipmentStatus.PENDING.value, ShipmentStatus.INCIDENT.value]:
-                raise ConflictError(f"El paquete {shipment_id} no está disponible para asignación (Estado: {shipment['estado']})")
-
-            # Resetear incidencias previas al reasignar
-            if shipment["estado"] == ShipmentStatus.INCIDENT.value:
-                shipment["ultima_incidencia"] = None
-                shipment["fecha_incidencia"] = None
-
-            shipments.append(shipment)
-
-        # Extraer IDs validados
-        valid_ids = [s["id"] for s in shipments]
-
-        # Realizar la asignación en lote usando el método específico del repositorio
-        self.shipment_repo.assign(shipment_id=valid_ids, courier_id=courier_id)
-
-        # Actualizar los objetos en memoria para el retorno
-        for shipment in shipments:
-            shipment["estado"] = ShipmentStatus.ASSIGNED.value
-            shipment["id_mensajero"] = courier_id
-
-        return {"assigned_shipments": shipments}
+        # Validaciones y asignación en una única transacción
+        with self.shipment_repo.transaction():
+            # Verificar existencia del mensajero
+            courier = self.courier_repo.get(courier_id)
+            if not courier:
+                raise NotFoundError(f"Mensajero {courier_id} no encontrado")
+
+            # Removed availability check to allow assignment even if courier is not active
+
+            # Una sola consulta para todos los paquetes seleccionados
+            requested_ids = list(dict.fromkeys(shipment_ids))
+            found = {s["id"]: s for s in self.shipment_repo.get_many(requested_ids)}
+
+            shipments = []
+            for shipment_id in requested_ids:
+                shipment = found.get(shipment_id)
+                if not shipment:
+                    raise NotFoundError(f"Paquete {shipment_id} no encontrado")
+
+                # Se pueden asignar paquetes REGISTRADOS o en INCIDENCIA
+                if shipment["estado"] not in [ShipmentStatus.PENDING.value, ShipmentStatus.INCIDENT.value]:
+                    raise ConflictError(f"El paquete {shipment_id} no está disponible para asignación (Estado: {shipment['estado']})")
+
+                # Sin coordenadas no puede entrar en una ruta: si la geocodificación falló hay que
+                # corregir la dirección antes; si está pendiente se asigna y entra al resolverse
+                if shipment.get("estado_geocodificacion") == GeocodeStatus.FAILED.value:
+                    raise ConflictError(f"La dirección del paquete {shipment_id} no se pudo geocodificar. Corríjala con 'Corregir dirección' antes de asignarlo.")
+
+                # Resetear incidencias previas al reasignar
+                if shipment["estado"] == ShipmentStatus.INCIDENT.value:
+                    shipment["ultima_incidencia"] = None
+                    shipment["fecha_incidencia"] = None
+
+                shipments.append(shipment)
+
+            # Extraer IDs validados
+            valid_ids = [s["id"] for s in shipments]
+
+            # Asignación en lote con una única sentencia; el repositorio vuelve a comprobar el estado
+            # en SQL y devuelve los ids realmente asignados
+            assigned_ids = self.shipment_repo.assign(shipment_id=valid_ids, courier_id=courier_id)
+            if set(assigned_ids or []) != set(valid_ids):
+                raise ConflictError("Algunos paquetes cambiaron de estado durante la asignación. Actualice la lista e inténtelo de nuevo.")
+
+            # Actualizar los objetos en memoria para el retorno
+            for shipment in shipments:
+                shipment["estado"] = ShipmentStatus.ASSIGNED.value
+                shipment["id_mensajero"] = courier_id
+
+        # El mensajero tiene paradas nuevas: su ruta cacheada ya no vale
+        if self.route_cache:
+            self.route_cache.invalidate_courier(courier_id)
+
+        pending_geocode = [s["id"] for s in shipments
+                           if s.get("estado_geocodificacion") == GeocodeStatus.PENDING.value]
+        return {"assigned_shipments": shipments, "pending_geocode": pending_geocode}
@@ -0,0 +1,122 @@
+import time
+
+from moval.usecases.errors import ValidationError, PermissionError, ConflictError
+from moval.services.fleet_assignment import assign_capacitated
+from moval.services.route_service import RouteService
+
+
+class AutoAssignShipments:
+    """
+    Reparto automático de los paquetes pendientes entre los mensajeros con jornada activa.
+
+    `execute` calcula una propuesta (sin tocar la base de datos) con un VRP con capacidad:
+    número máximo de paquetes por mensajero (el mismo criterio que CourierRepo.can_take_more,
+    descontando los que ya lleva) y peso máximo. `commit` aplica una propuesta en una única
+    transacción: o se asignan todos los paquetes propuestos o ninguno.
+    """
+
+    MAX_PER_COURIER = 20
+    MAX_WEIGHT_KG = 150.0
+
+    def __init__(self, shipment_repo, courier_repo, route_cache=None,
+                 max_per_courier: int = MAX_PER_COURIER, max_weight_kg: float = MAX_WEIGHT_KG,
+                 time_budget: float = 2.0):
+        self.shipment_repo = shipment_repo
+        self.courier_repo = courier_repo
+        self.route_cache = route_cache
+        self.max_per_courier = max_per_courier
+        self.max_weight_kg = max_weight_kg
+        self.time_budget = time_budget
+
+    @staticmethod
+    def _check_admin(actor: dict) -> None:
+        if not actor or "id" not in actor or "role" not in actor:
+            raise ValidationError("Se requiere autenticación")
+        if actor["role"] != "ADMIN":
+            raise PermissionError("Solo un administrador puede asignar paquetes")
+
+    def execute(self, actor: dict) -> dict:
+        """
+        Devuelve la propuesta:
+            {"assignments": [{"courier_id", "courier_name", "shipment_ids" (en orden de visita),
+                              "count", "weight", "distance_km"}],
+             "unassigned": [ids sin hueco], "missing_coords": [ids sin coordenadas],
+             "total_distance_km", "elapsed_ms"}
+        """
+        self._check_admin(actor)
+        started = time.perf_counter()
+
+        pending = self.shipment_repo.list_pending()
+        couriers = self.courier_repo.list_available()
+        routable = [s for s in pending if s.get("latitud") is not None and s.get("longitud") is not None]
+        missing_coords = [s["id"] for s in pending if s not in routable]
+
+        loads = self.courier_repo.active_loads([c["id"] for c in couriers])
+        max_stops, max_weight = [], []
+        for c in couriers:
+            load = loads.get(c["id"], {"paquetes": 0, "peso": 0.0})
+            max_stops.append(max(0, self.max_per_courier - load["paquetes"]))
+            max_weight.append(max(0.0, self.max_weight_kg - load["peso"]))
+
+        result = assign_capacitated(
+            (RouteService.WAREHOUSE_LAT, RouteService.WAREHOUSE_LON),
+            [(float(s["latitud"]), float(s["longitud"])) for s in routable],
+            [float(s.get("peso") or 0) for s in routable],
+            max_stops, max_weight, time_budget=self.time_budget
+        )
+
+        assignments = []
+        for courier, route, distance in zip(couriers, result["routes"], result["distances"]):
+            if not route:
+                continue
+            shipments = [routable[i] for i in route]
+            assignments.append({
+                "courier_id": courier["id"],
+                "courier_name": f"{courier.get('nombre', '')} {courier.get('apellidos', '')}".strip(),
+                "shipment_ids": [s["id"] for s in shipments],
+                "count": len(shipments),
+                "weight": round(sum(float(s.get("peso") or 0) for s in shipments), 2),
+                "distance_km": round(distance / 1000, 2),
+            })
+
+        return {
+            "assignments": assignments,
+            "unassigned": [routable[i]["id"] for i in result["unassigned"]],
+            "missing_coords": missing_coords,
+            "total_distance_km": round(sum(a["distance_km"] for a in assignments), 2),
+            "elapsed_ms": int((time.perf_counter() - started) * 1000),
+        }
+
+    def commit(self, actor: dict, preview: dict) -> dict:
+        """
+        Aplica la propuesta de `execute` en una transacción. Si algún paquete ya no está
+        pendiente o algún mensajero se pasaría de su límite, no se asigna nada (ConflictError).
+        """
+        self._check_admin(actor)
+        assignments = [a for a in (preview or {}).get("assignments", []) if a.get("shipment_ids")]
+        if not assignments:
+            raise ValidationError("La propuesta no contiene asignaciones")
+
+        with self.shipment_repo.transaction():
+            loads = self.courier_repo.active_loads([a["courier_id"] for a in assignments])
+            for a in assignments:
+                load = loads.get(a["courier_id"], {"paquetes": 0, "peso": 0.0})
+                if (load["paquetes"] + len(a["shipment_ids"]) > self.max_per_courier
+                        or load["peso"] + a.get("weight", 0.0) > self.max_weight_kg + 1e-6):
+                    raise ConflictError(
+                        f"El mensajero {a['courier_id']} ha recibido paquetes desde la propuesta. "
+                        "Vuelva a calcularla."
+                    )
+                # El repositorio comprueba en SQL que siguen pendientes y devuelve los asignados
+                assigned = self.shipment_repo.assign(shipment_id=a["shipment_ids"], courier_id=a["courier_id"])
+                if set(assigned or []) != set(a["shipment_ids"]):
+                    raise ConflictError(
+                        "Algunos paquetes cambiaron de estado desde la propuesta. Vuelva a calcularla."
+                    )
+
+        # Cada mensajero tiene paradas nuevas: su ruta cacheada ya no vale
+        if self.route_cache:
+            for a in assignments:
+                self.route_cache.invalidate_courier(a["courier_id"])
+
+        return {"assigned": {a["courier_id"]: a["shipment_ids"] for a in assignments}}
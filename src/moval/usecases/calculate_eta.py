@@ -1,17 +1,22 @@
 from datetime import timedelta
 from moval.usecases.errors import ValidationError, PermissionError, NotFoundError
 from moval.domain.enums import ShipmentStatus
+from moval.usecases.generate_delivery_route import stop_offsets
+from moval.usecases.calculate_route_etas import arrival_seconds, SERVICE_TIME_PER_STOP_MIN
 
 class CalculateETA:
     """
     Calcula el ETA usando el RouteService para obtener tiempos reales de ruta.
     """
-    def __init__(self, shipment_repo, route_service, clock, workday_repo):
+    def __init__(self, shipment_repo, route_service, clock, workday_repo, route_planner=None):
         self.shipment_repo = shipment_repo
         self.route_service = route_service
         self.clock = clock
         self.workday_repo = workday_repo
-        self.SERVICE_TIME_PER_STOP_MIN = 10 # Tiempo estimado por entrega
+        # GenerateDeliveryRoute con caché: si se pasa, el ETA sale de la ruta del mensajero ya
+        # calculada (la misma que ve él) en vez de volver a optimizarla en cada consulta
+        self.route_planner = route_planner
+        self.SERVICE_TIME_PER_STOP_MIN = SERVICE_TIME_PER_STOP_MIN # Tiempo estimado por entrega
 
     def execute(self, actor: dict, shipment_id: int) -> dict:
         if not actor: raise ValidationError("Auth required")
@@ -68,62 +73,13 @@ class CalculateETA:
              # Fallback heurístico
              return {"eta_minutos": 60, "info": "Aprox (Sin ruta)"}
 
-        # Preparar datos para RouteService
-        route_input = []
-        for p in active_pkgs:
-            route_input.append({
-                "id": p['id'],
-                "latitud": p['latitud'],
-                "longitud": p['longitud'],
-                "direccion": p['direccion_destino']
-            })
-
         try:
-            route_data = self.route_service.calculate_optimized_route(route_input)
-            
-            # Analizar la ruta para encontrar nuestro paquete
-            # waypoints_order: índices de la lista route_input. 
-            # 0 es Warehouse, 1..N son pkgs, N+1 es Warehouse.
-            # legs: duraciones entre paradas. legs[0] es Warehouse -> 1er Stop.
-            
-            accumulated_seconds = 0
-            found = False
-            
-            # route_data['waypoints_order'] son los indices originales
-            # route_data['legs'] son los tramos. len(legs) == len(waypoints) - 1
-            
-            waypoints = route_data['waypoints_order']
-            legs = route_data['legs']
+            offsets = self._route_offsets(courier_id, active_pkgs)
             
-            # Recorremos la ruta parada a parada
-            # i va de 0 a len(legs)-1
-            for i in range(len(legs)):
-                # Sumamos el viaje hasta el siguiente punto
-                leg_duration = legs[i]['duration']
-                accumulated_seconds += leg_duration
-                
-                # El punto al que llegamos es waypoints[i+1]
-                next_stop_idx = waypoints[i+1]
-                
-                # Es el warehouse final?
-                if next_stop_idx == len(route_input) + 1:
-                    break
-                    
-                # Es un paquete?
-                # Indice en route_input es next_stop_idx - 1
-                pkg_idx = next_stop_idx - 1
-                
-                if 0 <= pkg_idx < len(route_input):
-                    pkg = route_input[pkg_idx]
-                    
-                    if pkg['id'] == shipment_id:
-                        found = True
-                        break
-                    
-                    # Si no es nuestro paquete, añadimos tiempo de servicio (entrega)
-                    accumulated_seconds += (self.SERVICE_TIME_PER_STOP_MIN * 60)
-
-            if found:
+            # Tiempo de viaje hasta nuestro paquete + tiempo de servicio de cada entrega anterior
+            offset = offsets.get(shipment["id"])
+            if offset is not None:
+                accumulated_seconds = arrival_seconds(offset, self.SERVICE_TIME_PER_STOP_MIN)
                 eta_min = int(accumulated_seconds / 60)
                 arrival_time = self.clock.now() + timedelta(minutes=eta_min)
                 return {
@@ -145,4 +101,20 @@ class CalculateETA:
                 "eta_minutos": 60, 
                 "info": "Error ruta",
                 "texto_mostrar": "Calculando..."
-            }
\ No newline at end of file
+            }
+
+    def _route_offsets(self, courier_id: int, active_pkgs: list) -> dict:
+        if self.route_planner is not None:
+            return self.route_planner.execute(courier_id)["stop_offsets"]
+
+        # Sin planificador: ruta desde el almacén con las paradas activas
+        route_input = []
+        for p in active_pkgs:
+            route_input.append({
+                "id": p['id'],
+                "latitud": p['latitud'],
+                "longitud": p['longitud'],
+                "direccion": p['direccion_destino']
+            })
+        route_data = self.route_service.calculate_optimized_route(route_input)
+        return stop_offsets(route_data, route_input)
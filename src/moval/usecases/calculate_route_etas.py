@@ -0,0 +1,86 @@
+from datetime import timedelta
+from moval.usecases.errors import ValidationError, PermissionError
+from moval.domain.enums import ShipmentStatus
+
+# Tiempo estimado por entrega (aparcar, entregar, volver al vehículo)
+SERVICE_TIME_PER_STOP_MIN = 10
+
+
+def arrival_seconds(offset: dict, service_time_min: int = SERVICE_TIME_PER_STOP_MIN) -> float:
+    """Segundos hasta llegar a una parada: viaje acumulado + servicio de las entregas anteriores."""
+    return offset["travel_seconds"] + offset["stops_before"] * service_time_min * 60
+
+
+class CalculateRouteETAs:
+    """
+    Calcula de una vez el ETA de todas las paradas activas de un mensajero (o de los mensajeros
+    de una lista de paquetes) a partir de una única evaluación de su ruta, y los guarda en
+    Paquete.fecha_estimada_entrega para que los listados los muestren sin calcular nada.
+    """
+
+    ACTIVE_STATUSES = [ShipmentStatus.ASSIGNED.value, ShipmentStatus.EN_ROUTE.value]
+
+    def __init__(self, shipment_repo, workday_repo, route_planner, clock,
+                 service_time_min: int = SERVICE_TIME_PER_STOP_MIN):
+        self.shipment_repo = shipment_repo
+        self.workday_repo = workday_repo
+        # GenerateDeliveryRoute (idealmente con RouteCache): devuelve stop_offsets por paquete
+        self.route_planner = route_planner
+        self.clock = clock
+        self.service_time_min = service_time_min
+
+    def execute(self, actor: dict, courier_id: int | None = None, shipment_ids: list | None = None,
+                persist: bool = True) -> dict:
+        """
+        Devuelve {id_paquete: {"eta_minutos", "fecha_estimada"}}.
+        Con `courier_id` se calculan todas sus paradas; con `shipment_ids` solo se devuelven esos
+        paquetes (agrupados internamente por mensajero, una ruta por mensajero).
+        Los paquetes sin ruta (no asignados, mensajero sin jornada activa...) no aparecen.
+        """
+        if not actor or "id" not in actor or "role" not in actor:
+            raise ValidationError("Datos de usuario requeridos")
+
+        if (courier_id is None) == (shipment_ids is None):
+            raise ValidationError("Indique un mensajero o una lista de paquetes")
+
+        if courier_id is not None:
+            if actor["role"] == "COURIER" and courier_id != actor["id"]:
+                raise PermissionError("Solo puede consultar su propia ruta")
+            if actor["role"] not in ("ADMIN", "COURIER"):
+                raise PermissionError("No tiene permiso para consultar rutas de mensajeros")
+            couriers = [courier_id]
+            wanted = None
+        else:
+            shipments = self.shipment_repo.get_many(list(dict.fromkeys(shipment_ids)))
+            for s in shipments:
+                if actor["role"] == "CUSTOMER" and s["id_cliente"] != actor["id"]:
+                    raise PermissionError("No es tu paquete")
+                if actor["role"] == "COURIER" and s["id_mensajero"] != actor["id"]:
+                    raise PermissionError("No es tu paquete")
+            active = [s for s in shipments if s["estado"] in self.ACTIVE_STATUSES and s.get("id_mensajero")]
+            couriers = list(dict.fromkeys(s["id_mensajero"] for s in active))
+            wanted = {s["id"] for s in active}
+
+        now = self.clock.now()
+        etas = {}
+        for cid in couriers:
+            if not self.workday_repo.get_active_workday(cid):
+                continue
+            try:
+                offsets = self.route_planner.execute(cid)["stop_offsets"]
+            except ValueError:
+                # Sin paradas con coordenadas
+                continue
+            for sid, offset in offsets.items():
+                eta_min = int(arrival_seconds(offset, self.service_time_min) / 60)
+                etas[sid] = {"eta_minutos": eta_min, "fecha_estimada": now + timedelta(minutes=eta_min)}
+
+        # Se guardan todas las paradas evaluadas, no solo las pedidas: la ruta ya está calculada
+        if persist and etas:
+            self.shipment_repo.set_estimated_deliveries(
+                {sid: eta["fecha_estimada"] for sid, eta in etas.items()}
+            )
+
+        if wanted is not None:
+            etas = {sid: eta for sid, eta in etas.items() if sid in wanted}
+        return etas
@@ -2,11 +2,25 @@ import random
 import string
 from datetime import datetime
 
+from moval.services.geocode_cache import MISS
+
+def generate_tracking_code(suffix_length: int = 4) -> str:
+    """Código de seguimiento con formato PKG-YYYYMMDD-XXXX."""
+    suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=suffix_length))
+    return f"PKG-{datetime.now().strftime('%Y%m%d')}-{suffix}"
+
+
 class CreateShipment:
-    def __init__(self, shipment_repo, user_repo, geocoding_service):
+    def __init__(self, shipment_repo, user_repo, geocoding_service, geocode_resolver=None):
+        """
+        geocode_resolver: si se indica, el paquete se guarda sin esperar a Nominatim (salvo que la
+            dirección ya esté en la caché de geocodificación) y el resolver rellena sus coordenadas
+            en segundo plano.
+        """
         self.shipment_repo = shipment_repo
         self.user_repo = user_repo
         self.geocoding_service = geocoding_service
+        self.geocode_resolver = geocode_resolver
 
     def execute(self, actor_user: dict, shipment_data: dict) -> int:
         """
@@ -47,17 +61,19 @@ class CreateShipment:
                 'provincia': shipment_data.get('provincia')
             }
 
-        coords = self.geocoding_service.geocode_address(shipment_data['direccion_destino'], structured_query=structured)
-        if not coords:
+        if self.geocode_resolver is not None:
+            # Solo callejero local y caché; si no está ahí, lo resuelve el resolver más tarde
+            coords = self.geocoding_service.geocode_offline(shipment_data['direccion_destino'], structured)
+        else:
+            coords = self.geocoding_service.geocode_address(shipment_data['direccion_destino'], structured_query=structured)
+        if coords is None:
             raise ValueError(f"No se pudo validar la dirección: {shipment_data['direccion_destino']}. Verifique calle, número y ciudad.")
         
-        lat, lon = coords
+        # MISS: sin coordenadas todavía, el paquete queda pendiente de geocodificar
+        lat, lon = coords if coords is not MISS else (None, None)
 
         # 5. Generar Código de Seguimiento Único
-        # Formato: PKG-YYYYMMDD-XXXX
-        suffix = ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        date_str = datetime.now().strftime("%Y%m%d")
-        tracking_code = f"PKG-{date_str}-{suffix}"
+        tracking_code = generate_tracking_code()
 
         # 6. Guardar
         new_shipment = {
@@ -71,4 +87,8 @@ class CreateShipment:
             'id_cliente': int(shipment_data['id_cliente'])
         }
 
-        return self.shipment_repo.create(new_shipment)
+        new_id = self.shipment_repo.create(new_shipment)
+        if lat is None:
+            self.geocode_resolver.enqueue(new_id, structured)
+        return new_id
+
@@ -6,9 +6,10 @@ class DeliverShipment:
     Gestiona la entrega final de un paquete por parte de un mensajero.
     """
 
-    def __init__(self, shipment_repo, clock):
+    def __init__(self, shipment_repo, clock, route_cache=None):
         self.shipment_repo = shipment_repo
         self.clock = clock
+        self.route_cache = route_cache
 
     def execute(self, actor: dict, shipment_id: int) -> dict:
         """
@@ -34,23 +35,30 @@ class DeliverShipment:
         if actor["role"] != "COURIER":
             raise PermissionError("Solo los mensajeros pueden realizar entregas")
 
-        shipment = self.shipment_repo.get(shipment_id)
-        if not shipment:
-            raise NotFoundError("Paquete no encontrado")
+        # Lectura y actualización en la misma transacción
+        with self.shipment_repo.transaction():
+            shipment = self.shipment_repo.get(shipment_id)
+            if not shipment:
+                raise NotFoundError("Paquete no encontrado")
 
-        # Verificación de propiedad: Un mensajero solo puede entregar sus propios paquetes
-        if shipment["id_mensajero"] != actor["id"]:
-            raise PermissionError("No tiene permiso para entregar un paquete que no tiene asignado")
+            # Verificación de propiedad: Un mensajero solo puede entregar sus propios paquetes
+            if shipment["id_mensajero"] != actor["id"]:
+                raise PermissionError("No tiene permiso para entregar un paquete que no tiene asignado")
 
-        if shipment["estado"] == ShipmentStatus.DELIVERED.value:
-            raise ConflictError("El paquete ya consta como entregado")
+            if shipment["estado"] == ShipmentStatus.DELIVERED.value:
+                raise ConflictError("El paquete ya consta como entregado")
 
-        timestamp = self.clock.now()
+            timestamp = self.clock.now()
 
-        updated_shipment = self.shipment_repo.set_status(
-            shipment_id=shipment_id,
-            status=ShipmentStatus.DELIVERED,
-            delivered_at=timestamp
-        )
+            updated_shipment = self.shipment_repo.set_status(
+                shipment_id=shipment_id,
+                status=ShipmentStatus.DELIVERED,
+                delivered_at=timestamp
+            )
+
+        # La ruta del mensajero cambia (una parada menos y nuevo punto de inicio): se actualiza
+        # a partir de la anterior en la siguiente consulta
+        if self.route_cache:
+            self.route_cache.mark_stale(actor["id"])
 
         return updated_shipment
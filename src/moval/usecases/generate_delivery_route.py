@@ -1,13 +1,41 @@
 from moval.persistence.repositories import ShipmentRepo
 from moval.services.route_service import RouteService
+from moval.services.route_cache import RouteCache
+from moval.services.route_update import remaining_route, MAX_DEGRADATION
 from moval.domain.enums import ShipmentStatus
 from datetime import datetime
 
+def stop_offsets(route_result: dict, packages: list) -> dict:
+    """
+    Recorre los tramos de la ruta y devuelve, para cada paquete, el tiempo de viaje acumulado
+    hasta llegar a él y cuántas entregas hay antes: {id: {"travel_seconds", "stops_before"}}.
+    """
+    offsets = {}
+    waypoints = route_result['waypoints_order']
+    travel = 0
+    stops_before = 0
+    for i, leg in enumerate(route_result['legs']):
+        travel += leg['duration']
+        # legs[i] llega a waypoints[i+1]; 0 es el inicio y len+1 el almacén final
+        pkg_idx = waypoints[i + 1] - 1
+        if 0 <= pkg_idx < len(packages):
+            offsets[packages[pkg_idx]['id']] = {"travel_seconds": travel, "stops_before": stops_before}
+            stops_before += 1
+    return offsets
+
+
 class GenerateDeliveryRoute:
-    def __init__(self, shipment_repo: ShipmentRepo, route_service: RouteService, workday_repo):
+    def __init__(self, shipment_repo: ShipmentRepo, route_service: RouteService, workday_repo,
+                 route_cache: RouteCache | None = None, max_degradation: float | None = MAX_DEGRADATION):
+        """
+        max_degradation: con caché, tras una entrega o incidencia se actualiza la ruta anterior
+            (sin reoptimizar) salvo que empeore más de este porcentaje; None reoptimiza siempre.
+        """
         self.shipment_repo = shipment_repo
         self.route_service = route_service
         self.workday_repo = workday_repo
+        self.route_cache = route_cache
+        self.max_degradation = max_degradation
 
     def execute(self, courier_id: int) -> dict:
         """
@@ -51,8 +79,11 @@ class GenerateDeliveryRoute:
 
         # 3. Prepare data for RouteService
         route_packages = []
+        # Paquetes aún sin coordenadas (geocodificación pendiente o fallida): quedan fuera de la ruta
+        without_coords = []
         for s in active_shipments:
             if s.get('latitud') is None or s.get('longitud') is None:
+                without_coords.append(s['id'])
                 continue
             
             route_packages.append({
@@ -66,11 +97,36 @@ class GenerateDeliveryRoute:
             })
 
         if not route_packages:
+            if without_coords:
+                raise ValueError("Shipments are still pending geocoding; try again in a few moments.")
             raise ValueError("No shipments with valid coordinates found.")
 
-        # 4. Calculate Route
+        # 4. Calculate Route (una sola vez mientras no cambien las paradas ni el inicio)
+        if self.route_cache is None:
+            route_result = self._plan(route_packages, start_coords)
+        else:
+            previous = self.route_cache.peek(courier_id)
+            compute = lambda: self._update_or_plan(previous, route_packages, start_coords)
+            key = RouteCache.make_key(route_packages, start_coords)
+            # Copia superficial: el resultado cacheado se comparte entre llamadas
+            route_result = dict(self.route_cache.get_or_compute(courier_id, key, compute))
+        route_result['pending_geocode'] = without_coords
+        return route_result
+
+    def _update_or_plan(self, previous: dict | None, route_packages: list, start_coords: tuple | None) -> dict:
+        # Si solo han salido paradas, se quitan de la ruta anterior y se calculan los tramos nuevos
+        if previous is not None and self.max_degradation is not None:
+            updated = remaining_route(previous, route_packages, start_coords,
+                                      self.route_service.leg_costs, self.max_degradation)
+            if updated is not None:
+                return self._finish(updated, route_packages)
+        return self._plan(route_packages, start_coords)
+
+    def _plan(self, route_packages: list, start_coords: tuple | None) -> dict:
         route_result = self.route_service.calculate_optimized_route(route_packages, start_coords)
-        
+        return self._finish(route_result, route_packages)
+
+    def _finish(self, route_result: dict, route_packages: list) -> dict:
         # 5. Map back ordered shipments
         ordered_shipments = []
         for idx in route_result['waypoints_order']:
@@ -84,5 +140,7 @@ class GenerateDeliveryRoute:
                 ordered_shipments.append(route_packages[pkg_idx])
         
         route_result['ordered_shipments'] = ordered_shipments
+        # Precalculado para que cada consulta de ETA sea una búsqueda en un diccionario
+        route_result['stop_offsets'] = stop_offsets(route_result, route_packages)
         
         return route_result
@@ -31,30 +31,34 @@ class GetCourierProfile:
                 raise ValidationError("Repositorio de envíos no disponible")
 
             # Verificar que el cliente ha tenido relación con este mensajero (asignado o entregado)
-            shipments = self.shipment_repo.list_by_customer(
+            shared = self.shipment_repo.count_by_customer(
                 customer_id=actor["id"],
                 filters={"id_mensajero": courier_id}
             )
-            if not shipments:
+            if not shared:
                 raise PermissionError("No tiene envíos asociados a este mensajero.")
 
-        total_deliveries = 0
+        # Conteo por estado en una sola consulta agregada (no se cargan los paquetes)
+        status_counts = {}
         if self.shipment_repo:
-            total_deliveries = self.shipment_repo.count_by_courier(
-                courier_id,
-                filters={"estado": ShipmentStatus.DELIVERED.value}
-            )
+            status_counts = self.shipment_repo.count_by_status(courier_id=courier_id)
+        total_deliveries = status_counts.get(ShipmentStatus.DELIVERED.value, 0)
 
-        avg_rating = None
+        # Agregados de valoraciones mantenidos al valorar: lectura por clave, sin recorrer el histórico
+        rating_stats = None
         if self.rating_repo:
-            avg_rating = self.rating_repo.average_by_courier(courier_id)
+            rating_stats = self.rating_repo.get_courier_stats(courier_id)
+        avg_rating = rating_stats["media"] if rating_stats else None
 
         return {
             "id": courier.get("id"),
             "nombre": courier.get("nombre"),
             "apellidos": courier.get("apellidos"),
             "total_entregas": total_deliveries,
+            "envios_por_estado": status_counts,
             "puntuacion_media": avg_rating,
+            "num_valoraciones": rating_stats["num_valoraciones"] if rating_stats else 0,
+            "valoraciones_por_estrellas": rating_stats["estrellas"] if rating_stats else {},
         }
 
 
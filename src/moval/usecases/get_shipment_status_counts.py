@@ -0,0 +1,34 @@
+from moval.usecases.errors import ValidationError, PermissionError
+
+class GetShipmentStatusCounts:
+    """
+    Resumen de paquetes por estado, calculado en la base de datos (una consulta agregada).
+    - ADMIN: todos los paquetes.
+    - COURIER: los paquetes asignados a él.
+    - CUSTOMER: sus propios envíos.
+    """
+
+    def __init__(self, shipment_repo):
+        self.shipment_repo = shipment_repo
+
+    def execute(self, actor: dict) -> dict:
+        """
+        Args:
+            actor (dict): Usuario que realiza la consulta.
+
+        Returns:
+            dict: {estado: número de paquetes}.
+        """
+        if not actor or "id" not in actor or "role" not in actor:
+            raise ValidationError("Datos de usuario requeridos")
+
+        role = actor["role"]
+
+        if role == "ADMIN":
+            return self.shipment_repo.count_by_status()
+        elif role == "COURIER":
+            return self.shipment_repo.count_by_status(courier_id=actor["id"])
+        elif role == "CUSTOMER":
+            return self.shipment_repo.count_by_status(customer_id=actor["id"])
+
+        raise PermissionError("Rol no válido para consultar paquetes")
@@ -0,0 +1,209 @@
+import csv
+import io
+import json
+import os
+import time
+from typing import Callable, Iterator, Optional, Tuple
+
+from moval.usecases.errors import ValidationError, PermissionError
+from moval.usecases.create_shipment import generate_tracking_code
+
+
+def read_rows(source, fmt: str | None = None) -> Iterator[Tuple[int, dict]]:
+    """
+    Lee un fichero CSV, JSON (lista de objetos) o JSON Lines fila a fila y devuelve
+    (nº de fila, datos). `source` es una ruta o un fichero de texto ya abierto.
+    En CSV se detecta el separador (',' o ';'). Un JSON normal se carga entero; CSV y
+    JSON Lines se leen en streaming.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        fmt = fmt or os.path.splitext(str(source))[1].lstrip(".").lower()
+        with open(source, encoding="utf-8-sig", newline="") as f:
+            yield from read_rows(f, fmt)
+        return
+
+    fmt = (fmt or "csv").lower()
+    if fmt == "csv":
+        sample = source.read(4096)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        for n, row in enumerate(csv.DictReader(_chain(sample, source), dialect=dialect), start=2):
+            yield n, _clean(row)
+    elif fmt in ("jsonl", "ndjson"):
+        for n, line in enumerate(source, start=1):
+            if line.strip():
+                yield n, _clean(json.loads(line))
+    elif fmt == "json":
+        data = json.load(source)
+        if not isinstance(data, list):
+            raise ValidationError("El JSON debe ser una lista de paquetes")
+        for n, row in enumerate(data, start=1):
+            yield n, _clean(row)
+    else:
+        raise ValidationError(f"Formato no soportado: {fmt} (use csv, json o jsonl)")
+
+
+def _chain(sample: str, rest) -> Iterator[str]:
+    # El Sniffer ya consumió el principio del fichero: se vuelve a anteponer
+    yield from io.StringIO(sample + rest.readline())
+    yield from rest
+
+
+def _clean(row) -> dict:
+    if not isinstance(row, dict):
+        return {}
+    return {str(k).strip().lower(): (v.strip() if isinstance(v, str) else v)
+            for k, v in row.items() if k is not None}
+
+
+class ImportShipments:
+    """
+    Alta masiva de paquetes desde un fichero de un socio (CSV, JSON o JSON Lines).
+
+    Las filas se procesan por lotes de `batch_size`: se validan (mismas reglas que CreateShipment),
+    se geocodifican a través de `geocode_queue` (una petición por dirección distinta, a 1/s) y
+    se insertan con una sola sentencia por lote. Las filas erróneas no detienen la carga: se
+    informa de ellas con su número de fila. Pensado para ejecutarse fuera del hilo de la interfaz.
+    """
+
+    BATCH_SIZE = 500
+    # Cada cuántas filas geocodificadas se informa del progreso dentro de un lote
+    PROGRESS_EVERY = 25
+    DEFAULT_ORIGIN = "Almacén Central"
+
+    def __init__(self, shipment_repo, user_repo, geocode_queue, batch_size: int | None = None):
+        self.shipment_repo = shipment_repo
+        self.user_repo = user_repo
+        self.geocode_queue = geocode_queue
+        self.batch_size = batch_size or self.BATCH_SIZE
+
+    def execute(self, actor: dict, source, fmt: str | None = None,
+                on_progress: Optional[Callable[[dict], None]] = None, cancel_event=None) -> dict:
+        """
+        Importa `source` (ruta o fichero abierto). `on_progress` recibe
+        {"processed", "created", "errors", "geocoding"} y puede llamarse desde otro hilo.
+
+        Devuelve {"processed", "created", "shipment_ids", "errors": [{"row", "error"}],
+                  "cancelled", "elapsed_ms"}.
+        """
+        if not actor or "id" not in actor or "role" not in actor:
+            raise ValidationError("Se requiere autenticación")
+        if actor["role"] != "ADMIN":
+            raise PermissionError("Solo los administradores pueden importar paquetes")
+
+        started = time.perf_counter()
+        report = {"processed": 0, "created": 0, "shipment_ids": [], "errors": [], "cancelled": False}
+        clients = {}
+
+        def progress():
+            if on_progress:
+                on_progress({"processed": report["processed"], "created": report["created"],
+                             "errors": len(report["errors"]), "geocoding": self.geocode_queue.stats()})
+
+        batch = []
+        for row_number, row in read_rows(source, fmt):
+            if cancel_event is not None and cancel_event.is_set():
+                report["cancelled"] = True
+                break
+            batch.append((row_number, row))
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch, clients, report, progress, cancel_event)
+                batch = []
+        if batch and not report["cancelled"]:
+            self._import_batch(batch, clients, report, progress, cancel_event)
+
+        progress()
+        report["elapsed_ms"] = int((time.perf_counter() - started) * 1000)
+        return report
+
+    def _import_batch(self, batch, clients, report, progress, cancel_event) -> None:
+        # 1. Validación; las direcciones válidas se encolan enseguida para geocodificarlas
+        queued = []
+        for row_number, row in batch:
+            try:
+                shipment, structured = self._validate(row, clients)
+            except ValidationError as e:
+                report["errors"].append({"row": row_number, "error": str(e)})
+                report["processed"] += 1
+                continue
+            future = self.geocode_queue.submit(shipment["direccion_destino"], structured)
+            queued.append((row_number, shipment, future))
+
+        # 2. Esperar coordenadas (la cola ya las pide a su ritmo)
+        ready = []
+        codes = set()
+        for i, (row_number, shipment, future) in enumerate(queued, start=1):
+            if cancel_event is not None and cancel_event.is_set():
+                report["cancelled"] = True
+                return
+            try:
+                coords = future.result()
+            except Exception as e:
+                coords = None
+                print(f"[ImportShipments] Error geocodificando la fila {row_number}: {e}")
+            report["processed"] += 1
+            if not coords:
+                report["errors"].append({"row": row_number,
+                                         "error": f"No se pudo validar la dirección: {shipment['direccion_destino']}"})
+            else:
+                shipment["latitud"], shipment["longitud"] = coords
+                code = generate_tracking_code(suffix_length=6)
+                while code in codes:
+                    code = generate_tracking_code(suffix_length=6)
+                codes.add(code)
+                shipment["codigo_seguimiento"] = code
+                ready.append((row_number, shipment))
+            if i % self.PROGRESS_EVERY == 0:
+                progress()
+
+        # 3. Inserción del lote en bloque
+        if ready:
+            try:
+                ids = self.shipment_repo.create_many([s for _, s in ready])
+            except Exception as e:
+                report["errors"].extend({"row": n, "error": f"Error al guardar el lote: {e}"} for n, _ in ready)
+            else:
+                report["created"] += len(ids)
+                report["shipment_ids"].extend(ids)
+        progress()
+
+    def _validate(self, row: dict, clients: dict) -> Tuple[dict, Optional[dict]]:
+        structured = None
+        if row.get("calle"):
+            structured = {f: row.get(f) or "" for f in ("calle", "numero", "cp", "ciudad", "provincia")}
+            if not row.get("direccion_destino"):
+                if not structured["ciudad"]:
+                    raise ValidationError("Calle y ciudad son obligatorios para la dirección")
+                row["direccion_destino"] = ", ".join(
+                    str(structured[f]) for f in ("calle", "numero", "cp", "ciudad", "provincia") if structured[f])
+
+        for field in ("descripcion", "peso", "direccion_destino", "id_cliente"):
+            if not row.get(field):
+                raise ValidationError(f"El campo '{field}' es obligatorio.")
+
+        try:
+            peso = float(str(row["peso"]).replace(",", "."))
+            if peso <= 0:
+                raise ValueError
+        except ValueError:
+            raise ValidationError("El peso debe ser un número positivo.")
+
+        try:
+            client_id = int(row["id_cliente"])
+        except (TypeError, ValueError):
+            raise ValidationError("El id de cliente no es válido.")
+        # Cada cliente se comprueba una vez por importación
+        if client_id not in clients:
+            clients[client_id] = self.user_repo.get(client_id) is not None
+        if not clients[client_id]:
+            raise ValidationError(f"El cliente {client_id} no existe.")
+
+        return {
+            "descripcion": row["descripcion"],
+            "peso": peso,
+            "direccion_origen": row.get("direccion_origen") or self.DEFAULT_ORIGIN,
+            "direccion_destino": row["direccion_destino"],
+            "id_cliente": client_id,
+        }, structured
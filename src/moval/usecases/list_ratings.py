@@ -7,11 +7,19 @@ class ListRatings:
     def __init__(self, rating_repo):
         self.rating_repo = rating_repo
 
-    def execute(self, actor: dict) -> list[dict]:
+    def execute(self, actor: dict, stream: bool = False, page_size: int | None = None, after: tuple | None = None):
+        """
+        Con `stream=True` devuelve un iterador (cursor del lado del servidor) en vez de una lista.
+        Con `page_size` devuelve una página; la siguiente se pide con `after` = (fecha, id) de su última fila.
+        """
         if not actor or "role" not in actor:
             raise ValidationError("Datos de usuario requeridos")
 
         if actor["role"] != "ADMIN":
             raise PermissionError("Solo el administrador puede ver el listado de valoraciones")
 
+        if stream:
+            return self.rating_repo.iter_all()
+        if page_size:
+            return self.rating_repo.list_all(page_size=page_size, after=after)
         return self.rating_repo.list_all()
@@ -11,13 +11,20 @@ class ListShipments:
     def __init__(self, shipment_repo):
         self.shipment_repo = shipment_repo
 
-    def execute(self, actor: dict, filters: dict | None = None) -> list[dict]:
+    def execute(self, actor: dict, filters: dict | None = None, page_size: int | None = None,
+                after_id: int | None = None, after_ts=None, sort_by: str = "id",
+                descending: bool = False, statuses: list[str] | None = None) -> list[dict]:
         """
         Ejecuta la consulta de paquetes.
 
         Args:
             actor (dict): Usuario que realiza la consulta.
             filters (dict, optional): Filtros adicionales para la búsqueda.
+            page_size (int, optional): Tamaño de página. Si no se indica, se devuelven todos.
+            after_id / after_ts (optional): Cursor de la última fila de la página anterior.
+            sort_by (str): Clave de ordenación ("id" o "fecha_creacion").
+            descending (bool): Orden descendente (más recientes primero).
+            statuses (list, optional): Restringir a estos estados.
 
         Returns:
             list[dict]: Lista de paquetes encontrados.
@@ -34,13 +41,27 @@ class ListShipments:
         role = actor["role"]
         actor_id = actor["id"]
 
+        page = {}
+        if page_size is not None:
+            page["page_size"] = page_size
+        if after_id is not None:
+            page["after_id"] = after_id
+        if after_ts is not None:
+            page["after_ts"] = after_ts
+        if sort_by != "id":
+            page["sort_by"] = sort_by
+        if descending:
+            page["descending"] = True
+        if statuses:
+            page["statuses"] = statuses
+
         if role == "ADMIN":
-            shipments = self.shipment_repo.list_all(filters)
+            shipments = self.shipment_repo.list_all(filters, **page)
         elif role == "COURIER":
             # Corregido typo: listby_courier -> list_by_courier
-            shipments = self.shipment_repo.list_by_courier(actor_id, filters)
+            shipments = self.shipment_repo.list_by_courier(actor_id, filters, **page)
         elif role == "CUSTOMER":
-            shipments = self.shipment_repo.list_by_customer(actor_id, filters)
+            shipments = self.shipment_repo.list_by_customer(actor_id, filters, **page)
         else:
             raise PermissionError("Rol no válido para listar paquetes")
 
@@ -42,16 +42,21 @@ class RateDelivery:
         # Campo BD: id_mensajero
         courier_id = shipment.get("id_mensajero")
 
-        rating_info = self.rating_repo.create_delivery_rating(
-            shipment_id=shipment_id,
-            customer_id=customer_id,
-            courier_id=courier_id,
-            score=score,
-            comment=comment
-        )
-
-        # Si hay mensajero, podríamos recalcular su promedio (opcional según implementación de repo)
-        if courier_id is not None:
-            self.rating_repo.recalc_courier_avg(courier_id)
+        # La valoración y los agregados del mensajero se guardan en la misma transacción
+        with self.rating_repo.transaction():
+            rating_info = self.rating_repo.create_delivery_rating(
+                shipment_id=shipment_id,
+                customer_id=customer_id,
+                courier_id=courier_id,
+                score=score,
+                comment=comment
+            )
+
+            if courier_id is not None:
+                self.rating_repo.record_courier_rating(
+                    courier_id,
+                    score,
+                    rated_at=(rating_info or {}).get("fecha")
+                )
 
         return {"status": "success", "message": "Valoración registrada correctamente"}
@@ -7,10 +7,11 @@ class ReportIncident:
     Permite a mensajeros y clientes reportar problemas, actualizando el estado del envío.
     """
 
-    def __init__(self, shipment_repo, incident_repo, clock):
+    def __init__(self, shipment_repo, incident_repo, clock, route_cache=None):
         self.shipment_repo = shipment_repo
         self.incident_repo = incident_repo
         self.clock = clock
+        self.route_cache = route_cache
 
     def execute(self, actor: dict, shipment_id: int, description: str) -> dict:
         """
@@ -35,50 +36,58 @@ class ReportIncident:
         if not shipment_id or not description or not description.strip():
             raise ValidationError("ID del paquete y descripción son obligatorios")
 
-        shipment = self.shipment_repo.get(shipment_id)
-        if not shipment:
-            raise NotFoundError("Paquete no encontrado")
+        # Todas las operaciones en una única transacción: o se aplican todas o ninguna
+        with self.shipment_repo.transaction():
+            shipment = self.shipment_repo.get(shipment_id)
+            if not shipment:
+                raise NotFoundError("Paquete no encontrado")
 
-        # Verificación de permisos según rol
-        # BD fields: id_cliente, id_mensajero
-        if actor["role"] == "CUSTOMER":
-            if shipment["id_cliente"] != actor["id"]:
-                raise PermissionError("Un cliente solo puede reportar incidencias en sus propios envíos")
-        elif actor["role"] == "COURIER":
-            if shipment["id_mensajero"] != actor["id"]:
-                raise PermissionError("Un mensajero solo puede reportar incidencias en paquetes asignados")
-        elif actor["role"] != "ADMIN":
-            # Admin puede reportar en cualquier paquete (implícito por exclusión anterior)
-            # Pero si no es ninguno de los 3, error.
-            raise PermissionError("Rol no autorizado para reportar incidencias")
+            # Verificación de permisos según rol
+            # BD fields: id_cliente, id_mensajero
+            if actor["role"] == "CUSTOMER":
+                if shipment["id_cliente"] != actor["id"]:
+                    raise PermissionError("Un cliente solo puede reportar incidencias en sus propios envíos")
+            elif actor["role"] == "COURIER":
+                if shipment["id_mensajero"] != actor["id"]:
+                    raise PermissionError("Un mensajero solo puede reportar incidencias en paquetes asignados")
+            elif actor["role"] != "ADMIN":
+                # Admin puede reportar en cualquier paquete (implícito por exclusión anterior)
+                # Pero si no es ninguno de los 3, error.
+                raise PermissionError("Rol no autorizado para reportar incidencias")
 
-        timestamp = self.clock.now()
+            timestamp = self.clock.now()
 
-        # 1. Crear el registro de incidencia
-        # create_incident devuelve None o ID? El repo actual inserta pero no retorna nada explícito en el código visto.
-        # Asumiremos que retorna algo o modificaremos el repo si es necesario.
-        # Revisando repo: incident_repo.create_incident hace un INSERT y no retorna ID.
-        # Para mantener consistencia, deberíamos actualizar el repo, pero por ahora seguimos la firma.
-        self.incident_repo.create_incident(
-            shipment_id=shipment_id,
-            reported_id=actor["id"],
-            description=description.strip()
-        )
+            # 1. Crear el registro de incidencia
+            # create_incident devuelve None o ID? El repo actual inserta pero no retorna nada explícito en el código visto.
+            # Asumiremos que retorna algo o modificaremos el repo si es necesario.
+            # Revisando repo: incident_repo.create_incident hace un INSERT y no retorna ID.
+            # Para mantener consistencia, deberíamos actualizar el repo, pero por ahora seguimos la firma.
+            self.incident_repo.create_incident(
+                shipment_id=shipment_id,
+                reported_id=actor["id"],
+                description=description.strip()
+            )
 
-        # 2. Actualizar estado del paquete original a INCIDENCIA y MANTENER al mensajero (para trazabilidad)
-        # O desasignar? El usuario pidió "ese paquete se duplique y se cree el mismo desasigando"
-        # Interpretación: El original se queda en INCIDENCIA (histórico). El nuevo se crea en REGISTRADO (cola).
+            # 2. Actualizar estado del paquete original a INCIDENCIA y MANTENER al mensajero (para trazabilidad)
+            # O desasignar? El usuario pidió "ese paquete se duplique y se cree el mismo desasigando"
+            # Interpretación: El original se queda en INCIDENCIA (histórico). El nuevo se crea en REGISTRADO (cola).
         
-        self.shipment_repo.update(
-            shipment_id=shipment_id,
-            fields={
-                "estado": ShipmentStatus.INCIDENT.value
-                # No desasignamos el original para saber quién tuvo el problema
-            }
-        )
+            self.shipment_repo.update(
+                shipment_id=shipment_id,
+                fields={
+                    "estado": ShipmentStatus.INCIDENT.value,
+                    # Ya no se entregará en esta ruta: fuera su ETA
+                    "fecha_estimada_entrega": None
+                    # No desasignamos el original para saber quién tuvo el problema
+                }
+            )
 
-        # 3. Duplicar el paquete para reintento (Cola de asignación)
-        self.shipment_repo.create_copy(shipment)
+            # 3. Duplicar el paquete para reintento (Cola de asignación)
+            self.shipment_repo.create_copy(shipment)
+
+        # El paquete sale de la ruta de su mensajero
+        if self.route_cache:
+            self.route_cache.mark_stale(shipment.get("id_mensajero"))
 
         return {
             "status": "created",
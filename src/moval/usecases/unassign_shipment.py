@@ -6,8 +6,9 @@ class UnassignShipment:
     Permite desasignar un paquete de un mensajero.
     """
 
-    def __init__(self, shipment_repo):
+    def __init__(self, shipment_repo, route_cache=None):
         self.shipment_repo = shipment_repo
+        self.route_cache = route_cache
 
     def execute(self, actor: dict, shipment_id: int) -> dict:
         if not actor or "id" not in actor or "role" not in actor:
@@ -35,6 +36,8 @@ class UnassignShipment:
 
         # Usar el método específico del repositorio para desasignar
         self.shipment_repo.unassign(shipment_id)
+        if self.route_cache:
+            self.route_cache.invalidate_courier(shipment.get("id_mensajero"))
 
         # Retornar estado actualizado manualmente para la respuesta
         return {"id": shipment_id, "estado": ShipmentStatus.PENDING.value, "id_mensajero": None}
\ No newline at end of file
@@ -1,9 +1,13 @@
 from moval.usecases.errors import ValidationError, PermissionError, NotFoundError, ConflictError
-from moval.domain.enums import ShipmentStatus
+from moval.domain.enums import ShipmentStatus, GeocodeStatus
 
 class UpdateShipment:
     """
     Permite actualizar la información básica de un paquete.
+
+    Al cambiar la dirección de destino (o al guardarla de nuevo si su geocodificación había
+    fallado) se borran las coordenadas y el paquete vuelve a PENDIENTE de geocodificar: el
+    `geocode_resolver` las calcula en segundo plano.
     """
     ALLOWED_FIELDS = {
         "descripcion",
@@ -12,8 +16,10 @@ class UpdateShipment:
         "direccion_destino",
     }
 
-    def __init__(self, shipment_repo):
+    def __init__(self, shipment_repo, geocode_resolver=None, route_cache=None):
         self.shipment_repo = shipment_repo
+        self.geocode_resolver = geocode_resolver
+        self.route_cache = route_cache
 
     def execute(self, actor: dict, shipment_id: int, updates: dict) -> dict:
         if not actor or "id" not in actor or "role" not in actor:
@@ -42,7 +48,32 @@ class UpdateShipment:
         if "peso" in updates and updates["peso"] is not None and updates["peso"] <= 0:
             raise ValidationError("El peso debe ser mayor que cero")
 
-        self.shipment_repo.update(shipment_id, updates)
+        fields = dict(updates)
+        regeocode = False
+        if "direccion_destino" in fields:
+            address = (fields["direccion_destino"] or "").strip()
+            if not address:
+                raise ValidationError("La dirección de destino no puede estar vacía")
+            fields["direccion_destino"] = address
+            if address != shipment.get("direccion_destino") or \
+                    shipment.get("estado_geocodificacion") == GeocodeStatus.FAILED.value:
+                regeocode = True
+                fields.update({
+                    "latitud": None,
+                    "longitud": None,
+                    "estado_geocodificacion": GeocodeStatus.PENDING.value,
+                    "intentos_geocodificacion": 0,
+                    "proximo_intento_geocodificacion": None,
+                })
+
+        self.shipment_repo.update(shipment_id, fields)
+
+        if regeocode:
+            if self.geocode_resolver:
+                self.geocode_resolver.enqueue(shipment_id)
+            # Sin coordenadas sale de la ruta de su mensajero hasta que se resuelva
+            if self.route_cache and shipment.get("id_mensajero"):
+                self.route_cache.invalidate_courier(shipment["id_mensajero"])
 
         return self.shipment_repo.get(shipment_id)
 
@@ -1,6 +1,6 @@
 import customtkinter as ctk
-from moval.views.base_view import BaseView
-from tkinter import messagebox, simpledialog, ttk
+from moval.views.base_view import BaseView, PAGE_SIZE
+from tkinter import messagebox, simpledialog, ttk, filedialog
 from moval.views.shipment_dialog import ShipmentDialog
 from moval.views.create_shipment_dialog import CreateShipmentDialog
 import sqlite3
@@ -24,6 +24,14 @@ class AdminView(BaseView):
         self.setup_ratings()
 
     def setup_shipments(self):
+        # Resumen por estado (conteo agregado en BD)
+        self.summary_lbl = ctk.CTkLabel(self.tab_shipments, text="", font=ctk.CTkFont(size=13, weight="bold"))
+        self.summary_lbl.pack(anchor="w", padx=15, pady=(5, 0))
+
+        # Paginación por cursor de cada tabla
+        self.more_buttons = {}
+        self.page_cursor = {}
+
         # Crear Tabview para las 4 vistas
         self.shipment_tabview = ctk.CTkTabview(self.tab_shipments)
         self.shipment_tabview.pack(fill="both", expand=True, padx=10, pady=10)
@@ -45,10 +53,17 @@ class AdminView(BaseView):
         self.courier_combo.pack(side="left", padx=5)
         
         ctk.CTkButton(ctrl_reg, text="Asignar", width=100, command=self.assign).pack(side="left", padx=5)
+        self.btn_import = ctk.CTkButton(ctrl_reg, text="Importar", width=100, fg_color="#10b981", hover_color="#059669", command=self.import_shipments)
+        self.btn_import.pack(side="left", padx=5)
+        self.btn_auto_assign = ctk.CTkButton(ctrl_reg, text="Asignación automática", width=160, fg_color="#8b5cf6", hover_color="#7c3aed", command=self.auto_assign)
+        self.btn_auto_assign.pack(side="left", padx=5)
         ctk.CTkButton(ctrl_reg, text="Ver Detalles", width=100, fg_color="#3b82f6", command=self.show_details).pack(side="left", padx=5)
+        ctk.CTkButton(ctrl_reg, text="Corregir dirección", width=130, fg_color="#f59e0b", hover_color="#d97706", command=self.correct_address).pack(side="left", padx=5)
         ctk.CTkButton(ctrl_reg, text="Actualizar", width=100, fg_color="#64748b", command=self.refresh_data).pack(side="right", padx=5)
+        self.more_buttons["tree_reg"] = ctk.CTkButton(ctrl_reg, text="Cargar más", width=100, fg_color="#64748b", command=lambda: self.load_more(self.tree_reg))
+        self.more_buttons["tree_reg"].pack(side="right", padx=5)
         
-        self.tree_reg = self.create_tree(self.tab_reg, ["ID", "Código", "Origen", "Destino", "Estado"])
+        self.tree_reg = self.create_tree(self.tab_reg, ["ID", "Código", "Origen", "Destino", "Estado", "Geocodificación"])
 
         # --- 2. ASIGNADOS (Controles de Desasignación) ---
         ctrl_asg = ctk.CTkFrame(self.tab_asg, fg_color="transparent")
@@ -57,8 +72,10 @@ class AdminView(BaseView):
         ctk.CTkButton(ctrl_asg, text="Desasignar", width=100, fg_color="#f59e0b", hover_color="#d97706", command=self.unassign).pack(side="left", padx=5)
         ctk.CTkButton(ctrl_asg, text="Ver Detalles", width=100, fg_color="#3b82f6", command=self.show_details).pack(side="left", padx=5)
         ctk.CTkButton(ctrl_asg, text="Actualizar", width=100, fg_color="#64748b", command=self.refresh_data).pack(side="right", padx=5)
+        self.more_buttons["tree_asg"] = ctk.CTkButton(ctrl_asg, text="Cargar más", width=100, fg_color="#64748b", command=lambda: self.load_more(self.tree_asg))
+        self.more_buttons["tree_asg"].pack(side="right", padx=5)
         
-        self.tree_asg = self.create_tree(self.tab_asg, ["ID", "Código", "Origen", "Destino", "Estado", "Repartidor"])
+        self.tree_asg = self.create_tree(self.tab_asg, ["ID", "Código", "Origen", "Destino", "Estado", "Repartidor", "ETA"])
 
         # --- 3. ENTREGADOS (Solo visualización) ---
         ctrl_ent = ctk.CTkFrame(self.tab_ent, fg_color="transparent")
@@ -66,6 +83,8 @@ class AdminView(BaseView):
         
         ctk.CTkButton(ctrl_ent, text="Ver Detalles", width=100, fg_color="#3b82f6", command=self.show_details).pack(side="left", padx=5)
         ctk.CTkButton(ctrl_ent, text="Actualizar", width=100, fg_color="#64748b", command=self.refresh_data).pack(side="right", padx=5)
+        self.more_buttons["tree_ent"] = ctk.CTkButton(ctrl_ent, text="Cargar más", width=100, fg_color="#64748b", command=lambda: self.load_more(self.tree_ent))
+        self.more_buttons["tree_ent"].pack(side="right", padx=5)
         
         self.tree_ent = self.create_tree(self.tab_ent, ["ID", "Código", "Destino", "Repartidor", "Fecha Entrega"])
 
@@ -79,9 +98,23 @@ class AdminView(BaseView):
         
         ctk.CTkButton(ctrl_inc, text="Reasignar", width=100, command=self.assign_incident).pack(side="left", padx=5)
         ctk.CTkButton(ctrl_inc, text="Ver Detalles", width=100, fg_color="#3b82f6", command=self.show_details).pack(side="left", padx=5)
+        ctk.CTkButton(ctrl_inc, text="Corregir dirección", width=130, fg_color="#f59e0b", hover_color="#d97706", command=self.correct_address).pack(side="left", padx=5)
         ctk.CTkButton(ctrl_inc, text="Actualizar", width=100, fg_color="#64748b", command=self.refresh_data).pack(side="right", padx=5)
-        
-        self.tree_inc = self.create_tree(self.tab_inc, ["ID", "Código", "Destino", "Estado", "Repartidor"])
+        self.more_buttons["tree_inc"] = ctk.CTkButton(ctrl_inc, text="Cargar más", width=100, fg_color="#64748b", command=lambda: self.load_more(self.tree_inc))
+        self.more_buttons["tree_inc"].pack(side="right", padx=5)
+        
+        self.tree_inc = self.create_tree(self.tab_inc, ["ID", "Código", "Destino", "Estado", "Repartidor", "Geocodificación"])
+
+        self.tree_statuses = {
+            self.tree_reg: ['REGISTRADO'],
+            self.tree_asg: ['ASIGNADO', 'EN_REPARTO'],
+            self.tree_ent: ['ENTREGADO'],
+            self.tree_inc: ['INCIDENCIA'],
+        }
+        self.tree_names = {
+            self.tree_reg: "tree_reg", self.tree_asg: "tree_asg",
+            self.tree_ent: "tree_ent", self.tree_inc: "tree_inc",
+        }
 
     def open_create_dialog(self):
         CreateShipmentDialog(self, self.controller, on_success_callback=self.refresh_data)
@@ -103,8 +136,10 @@ class AdminView(BaseView):
         
         sid = int(tree.item(selection[0])['values'][0])
         det = self.controller.get_shipment_details(sid)
-        eta = self.controller.calculate_eta(sid)
-        
+        # El ETA puede requerir optimizar la ruta: se muestra cuando llega, sin bloquear la ventana
+        self.controller.calculate_eta(sid, lambda eta: self.show_details_message(sid, det, eta))
+
+    def show_details_message(self, sid, det, eta):
         msg = f"--- DETALLES DEL PEDIDO ---\n\n"
         msg += f"Código: {det.get('codigo_seguimiento')}\n"
         msg += f"Descripción: {det.get('descripcion')}\n"
@@ -171,6 +206,13 @@ class AdminView(BaseView):
         )
 
     def setup_ratings(self):
+        ctrl_rat = ctk.CTkFrame(self.tab_ratings, fg_color="transparent")
+        ctrl_rat.pack(fill="x", pady=5)
+        ctk.CTkButton(ctrl_rat, text="Actualizar", width=100, fg_color="#64748b", command=self.refresh_data).pack(side="right", padx=5)
+        self.btn_more_rat = ctk.CTkButton(ctrl_rat, text="Cargar más", width=100, fg_color="#64748b", command=self.load_more_ratings)
+        self.btn_more_rat.pack(side="right", padx=5)
+        self.rat_cursor = None
+
         self.tree_rat = self.create_tree(self.tab_ratings, ["Fecha", "Autor", "Mensajero", "Nota", "Comentario"])
 
     def create_tree(self, parent, cols):
@@ -204,45 +246,27 @@ class AdminView(BaseView):
             self.courier_combo.set(c_vals[0])
             self.courier_combo_inc.set(c_vals[0])
 
-        # Envíos - Limpiar tablas
+        # Resumen de envíos por estado
+        counts = self.controller.get_shipment_status_counts()
+        self.summary_lbl.configure(text=(
+            f"Registrados: {counts.get('REGISTRADO', 0)}   |   "
+            f"Asignados: {counts.get('ASIGNADO', 0) + counts.get('EN_REPARTO', 0)}   |   "
+            f"Entregados: {counts.get('ENTREGADO', 0)}   |   "
+            f"Incidencias: {counts.get('INCIDENCIA', 0)}"
+        ))
+
+        # Envíos - Limpiar tablas y cargar solo la primera página de cada una
         for t in [self.tree_reg, self.tree_asg, self.tree_ent, self.tree_inc]:
             t.delete(*t.get_children())
+            self.page_cursor[t] = None
+            self.more_buttons[self.tree_names[t]].configure(state="normal")
+            self.load_more(t)
 
-        shipments = self.controller.get_all_shipments()
-        for s in shipments:
-            st = s['estado']
-            # REGISTRADOS
-            if st == 'REGISTRADO':
-                self.tree_reg.insert("", "end", values=(
-                    s['id'], s['codigo_seguimiento'], s['direccion_origen'], s['direccion_destino'], st
-                ))
-            # ASIGNADOS (y En Reparto)
-            elif st in ['ASIGNADO', 'EN_REPARTO']:
-                self.tree_asg.insert("", "end", values=(
-                    s['id'], s['codigo_seguimiento'], s['direccion_origen'], s['direccion_destino'], st,
-                    s.get('id_mensajero') or ''
-                ))
-            # ENTREGADOS
-            elif st == 'ENTREGADO':
-                self.tree_ent.insert("", "end", values=(
-                    s['id'], s['codigo_seguimiento'], s['direccion_destino'],
-                    s.get('id_mensajero') or '', s.get('fecha_entrega_real') or ''
-                ))
-            # INCIDENCIAS
-            elif st == 'INCIDENCIA':
-                self.tree_inc.insert("", "end", values=(
-                    s['id'], s['codigo_seguimiento'], s['direccion_destino'], st,
-                    s.get('id_mensajero') or ''
-                ))
-
-        # Ratings
-        ratings = self.controller.get_all_ratings()
+        # Ratings - primera página
         self.tree_rat.delete(*self.tree_rat.get_children())
-        for r in ratings:
-            score = r['puntuacion']
-            stars_str = "★" * int(score) + "☆" * (5 - int(score))
-            score_display = f"{stars_str} ({score})"
-            self.tree_rat.insert("", "end", values=(r['fecha'], r['autor'], r['mensajero'] or "", score_display, r['comentario']))
+        self.rat_cursor = None
+        self.btn_more_rat.configure(state="normal")
+        self.load_more_ratings()
 
         # Reporte Repartidores
         report = self.controller.get_all_couriers_report()
@@ -276,6 +300,65 @@ class AdminView(BaseView):
                 media_display
             ))
 
+    def load_more(self, tree):
+        """Añade a la tabla la siguiente página de envíos (paginación por cursor)."""
+        page = self.controller.get_shipments_page(
+            statuses=self.tree_statuses[tree], after_id=self.page_cursor.get(tree), page_size=PAGE_SIZE
+        )
+        for s in page:
+            self.insert_shipment_row(tree, s)
+
+        if page:
+            self.page_cursor[tree] = page[-1]['id']
+        if len(page) < PAGE_SIZE:
+            self.more_buttons[self.tree_names[tree]].configure(state="disabled")
+
+    def load_more_ratings(self):
+        """Añade la siguiente página de valoraciones (cursor por fecha e id)."""
+        page = self.controller.get_ratings_page(after=self.rat_cursor, page_size=PAGE_SIZE)
+        if page is None:
+            # Error ya mostrado: se puede reintentar con "Cargar más"
+            return
+        for r in page:
+            score = r['puntuacion']
+            stars_str = "★" * int(score) + "☆" * (5 - int(score))
+            score_display = f"{stars_str} ({score})"
+            self.tree_rat.insert("", "end", values=(r['fecha'], r['autor'], r['mensajero'] or "", score_display, r['comentario']))
+
+        if page:
+            self.rat_cursor = (page[-1]['fecha'], page[-1]['id'])
+        if len(page) < PAGE_SIZE:
+            self.btn_more_rat.configure(state="disabled")
+
+    def insert_shipment_row(self, tree, s):
+        st = s['estado']
+        # REGISTRADOS
+        if tree is self.tree_reg:
+            values = (s['id'], s['codigo_seguimiento'], s['direccion_origen'], s['direccion_destino'], st,
+                      s.get('estado_geocodificacion') or '')
+        # ASIGNADOS (y En Reparto)
+        elif tree is self.tree_asg:
+            values = (
+                s['id'], s['codigo_seguimiento'], s['direccion_origen'], s['direccion_destino'], st,
+                s.get('id_mensajero') or '', self.format_eta(s.get('fecha_estimada_entrega'))
+            )
+        # ENTREGADOS
+        elif tree is self.tree_ent:
+            values = (
+                s['id'], s['codigo_seguimiento'], s['direccion_destino'],
+                s.get('id_mensajero') or '', s.get('fecha_entrega_real') or ''
+            )
+        # INCIDENCIAS
+        else:
+            values = (s['id'], s['codigo_seguimiento'], s['direccion_destino'], st, s.get('id_mensajero') or '',
+                      s.get('estado_geocodificacion') or '')
+        tree.insert("", "end", values=values)
+
+    @staticmethod
+    def format_eta(eta):
+        # ETA guardado al calcular la ruta del mensajero (no se calcula al listar)
+        return eta.strftime("%d/%m %H:%M") if eta else "---"
+
     def assign(self):
         selection = self.tree_reg.selection()
         c_val = self.courier_combo.get()
@@ -285,6 +368,58 @@ class AdminView(BaseView):
         self.controller.assign_shipments(sids, cid)
         self.refresh_data()
 
+    def import_shipments(self):
+        path = filedialog.askopenfilename(
+            title="Importar paquetes",
+            filetypes=[("Paquetes", "*.csv *.json *.jsonl"), ("Todos los ficheros", "*.*")]
+        )
+        if not path: return
+        self.btn_import.configure(state="disabled", text="Importando...")
+        self.controller.import_shipments(path, self.show_import_progress, self.finish_import)
+
+    def show_import_progress(self, progress):
+        if not self.winfo_exists(): return
+        self.summary_lbl.configure(
+            text=f"Importando: {progress['processed']} filas, {progress['created']} creadas, {progress['errors']} con error")
+
+    def finish_import(self, report):
+        if not self.winfo_exists(): return
+        self.btn_import.configure(state="normal", text="Importar")
+        if report is None: return
+        lines = [f"Paquetes creados: {report['created']} de {report['processed']} filas."]
+        if report["errors"]:
+            lines.append(f"Filas con error: {len(report['errors'])}")
+            lines += [f"  Fila {e['row']}: {e['error']}" for e in report["errors"][:10]]
+            if len(report["errors"]) > 10:
+                lines.append("  ...")
+        messagebox.showinfo("Importación terminada", "\n".join(lines))
+        self.refresh_data()
+
+    def auto_assign(self):
+        # El cálculo va en segundo plano; la propuesta se confirma antes de escribir nada
+        self.btn_auto_assign.configure(state="disabled", text="Calculando...")
+        self.controller.preview_auto_assign(self.confirm_auto_assign)
+
+    def confirm_auto_assign(self, preview):
+        if not self.winfo_exists():
+            return
+        self.btn_auto_assign.configure(state="normal", text="Asignación automática")
+        if preview is None:
+            return
+        if not preview["assignments"]:
+            messagebox.showinfo("Asignación automática", "No hay paquetes pendientes o mensajeros con hueco.")
+            return
+        lines = [f"{a['courier_name']}: {a['count']} paquetes, {a['weight']} kg, {a['distance_km']} km"
+                 for a in preview["assignments"]]
+        if preview["unassigned"]:
+            lines.append(f"Sin hueco: {len(preview['unassigned'])} paquetes")
+        if preview["missing_coords"]:
+            lines.append(f"Sin coordenadas: {len(preview['missing_coords'])} paquetes")
+        lines.append(f"\nDistancia total estimada: {preview['total_distance_km']} km")
+        if messagebox.askyesno("Confirmar asignación automática", "\n".join(lines)):
+            if self.controller.commit_auto_assign(preview):
+                self.refresh_data()
+
     def assign_incident(self):
         selection = self.tree_inc.selection()
         c_val = self.courier_combo_inc.get()
@@ -294,6 +429,20 @@ class AdminView(BaseView):
         self.controller.assign_shipments(sids, cid)
         self.refresh_data()
 
+    def correct_address(self):
+        # Sobre todo para paquetes con la geocodificación FALLIDA: vuelven a PENDIENTE
+        tree = self.get_active_tree()
+        if tree not in (self.tree_reg, self.tree_inc): return
+        selection = tree.selection()
+        if not selection: return
+        sid = int(tree.item(selection[0])['values'][0])
+        current = self.controller.get_shipment_details(sid) or {}
+        address = simpledialog.askstring("Corregir dirección", "Nueva dirección de destino:",
+                                         initialvalue=current.get('direccion_destino', ''), parent=self)
+        if address is None: return
+        if self.controller.correct_shipment_address(sid, address):
+            self.refresh_data()
+
     def unassign(self):
         selection = self.tree_asg.selection()
         if not selection: return
@@ -2,6 +2,9 @@
 import customtkinter as ctk
 from tkinter import messagebox, simpledialog, ttk
 
+# Filas por página en los listados paginados (botón "Cargar más")
+PAGE_SIZE = 50
+
 
 class BaseView(ctk.CTkFrame):
     def __init__(self, parent, controller):
@@ -6,6 +6,8 @@ from tkinter import messagebox
 from moval.views.incident_dialog import VentanaIncidencia
 
 class CourierView(BaseView):
+    ROUTE_ZOOM = 13
+
     def __init__(self, parent, controller):
         super().__init__(parent, controller)
         self.create_header("Panel del Repartidor")
@@ -28,6 +30,10 @@ class CourierView(BaseView):
         self.btn_toggle_wd = ctk.CTkButton(status_card, text="Iniciar/Fin", width=100, command=self.toggle_wd)
         self.btn_toggle_wd.pack(side="right", padx=15)
 
+        # Resumen de mis paquetes por estado
+        self.summary_lbl = ctk.CTkLabel(self.left_col, text="", font=ctk.CTkFont(size=13))
+        self.summary_lbl.pack(fill="x", pady=(0, 10))
+
         # 2. Next Stop
         self.next_stop_frame = ctk.CTkFrame(self.left_col, fg_color=("#e2e8f0", "#1e293b"), border_width=2, border_color="#3b82f6")
         self.next_stop_frame.pack(fill="x", pady=(0, 10))
@@ -48,10 +54,14 @@ class CourierView(BaseView):
         act_f = ctk.CTkFrame(self.left_col, fg_color="transparent")
         act_f.pack(fill="x", pady=10)
         
-        act_f.grid_columnconfigure((0, 1), weight=1)
+        act_f.grid_columnconfigure((0, 1, 2), weight=1)
         
         ctk.CTkButton(act_f, text="Generar Ruta", fg_color="#3b82f6", command=self.generate_route).grid(row=0, column=0, padx=2, pady=2, sticky="ew")
-        ctk.CTkButton(act_f, text="Actualizar", fg_color="#64748b", command=self.refresh_data).grid(row=0, column=1, padx=2, pady=2, sticky="ew")
+        ctk.CTkButton(act_f, text="Ver mapa", fg_color="#0ea5e9", command=self.open_route_map).grid(row=0, column=1, padx=2, pady=2, sticky="ew")
+        ctk.CTkButton(act_f, text="Actualizar", fg_color="#64748b", command=self.refresh_data).grid(row=0, column=2, padx=2, pady=2, sticky="ew")
+
+        # Última ruta generada (para abrir su mapa HTML bajo demanda)
+        self.route_data = None
 
         # --- RIGHT COLUMN (Map) ---
         self.right_col = ctk.CTkFrame(self.main_content, fg_color="transparent")
@@ -72,6 +82,13 @@ class CourierView(BaseView):
             self.status_lbl.configure(text="Jornada: INACTIVA", text_color="#ef4444")
             self.btn_toggle_wd.configure(text="Iniciar Jornada", fg_color="#10b981")
 
+        counts = self.controller.get_shipment_status_counts()
+        self.summary_lbl.configure(text=(
+            f"Pendientes: {counts.get('ASIGNADO', 0) + counts.get('EN_REPARTO', 0)}  ·  "
+            f"Entregados: {counts.get('ENTREGADO', 0)}  ·  "
+            f"Incidencias: {counts.get('INCIDENCIA', 0)}"
+        ))
+
         shipments = self.controller.get_my_shipments()
         
         # Clear existing cards
@@ -141,7 +158,11 @@ class CourierView(BaseView):
             if not route_data:
                 return
 
+            self.route_data = route_data
             ordered = route_data.get('ordered_shipments', [])
+            if route_data.get('pending_geocode'):
+                messagebox.showinfo("Ruta parcial", f"{len(route_data['pending_geocode'])} paquete(s) aún sin coordenadas "
+                                    "no se han incluido en la ruta. Vuelve a generarla en unos minutos.")
             
             if ordered:
                 # Update Next Stop
@@ -181,24 +202,37 @@ class CourierView(BaseView):
 
             # Update Map on widget
             self.plot_route_on_widget(route_data)
+            # Trazado por carretera en segundo plano; se redibuja si sigue siendo la ruta mostrada
+            self.controller.load_road_geometry(
+                route_data,
+                lambda geometry, r=route_data: self.plot_route_on_widget(r, geometry) if self.route_data is r else None
+            )
 
         except Exception as e:
             messagebox.showerror("Error Ruta", str(e))
 
-    def plot_route_on_widget(self, route_data):
+    def open_route_map(self):
+        if not self.route_data:
+            messagebox.showinfo("Mapa", "Genera primero la ruta.")
+            return
+        self.controller.open_route_map(self.route_data)
+
+    def plot_route_on_widget(self, route_data, geometry=None):
         self.map_widget.delete_all_marker()
         self.map_widget.delete_all_path()
 
-        coords = route_data.get('geometry_coordinates', [])
-        if not coords: return
+        geometry = geometry if geometry is not None else route_data.get('geometry')
+        if geometry is None or len(geometry) < 2: return
 
-        # Set Path
-        self.map_widget.set_path(coords, color="blue", width=5)
-        
         # Fit map (take first coord)
-        if len(coords) > 0:
-            self.map_widget.set_position(coords[0][0], coords[0][1])
-            self.map_widget.set_zoom(13)
+        start = tuple(geometry.coords[0])
+        self.map_widget.set_position(start[0], start[1])
+        self.map_widget.set_zoom(self.ROUTE_ZOOM)
+
+        # Set Path: solo los vértices que se distinguen a este zoom (las rutas largas traen
+        # decenas de miles y el widget los redibuja todos en cada movimiento)
+        coords = geometry.simplified(self.ROUTE_ZOOM)
+        self.map_widget.set_path(coords, color="blue", width=5)
 
         # Markers
         # Start
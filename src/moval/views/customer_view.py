@@ -1,6 +1,6 @@
 import customtkinter as ctk
 from tkinter import messagebox, simpledialog, ttk
-from moval.views.base_view import BaseView
+from moval.views.base_view import BaseView, PAGE_SIZE
 from moval.views.rating_dialog import VentanaValoracion
 from moval.views.notification_dialog import NotificationDialog
 
@@ -37,34 +37,53 @@ class CustomerView(BaseView):
         
         ctk.CTkButton(act_f, text="Actualizar Lista", command=self.refresh_data).pack(side="right")
 
+        # Paginación por cursor de cada pestaña
+        self.frame_statuses = {
+            self.scroll_active: ['REGISTRADO', 'ASIGNADO', 'EN_REPARTO'],
+            self.scroll_incidents: ['INCIDENCIA'],
+            self.scroll_delivered: ['ENTREGADO'],
+        }
+        self.page_cursor = {}
+        self.more_buttons = {}
+
     def refresh_data(self):
-        shipments = self.controller.get_my_shipments()
         self.update_bell_status()
         
         # Clear all
         for f in [self.scroll_active, self.scroll_incidents, self.scroll_delivered]:
             for w in f.winfo_children():
                 w.destroy()
+            self.page_cursor[f] = None
+            self.more_buttons[f] = None
+
+        # Cada pestaña carga solo su primera página; el resto bajo demanda
+        for f in [self.scroll_active, self.scroll_incidents, self.scroll_delivered]:
+            self.load_more(f)
 
-        if not shipments:
+        if not self.page_cursor[self.scroll_active]:
              ctk.CTkLabel(self.scroll_active, text="No tienes pedidos activos.", font=ctk.CTkFont(size=16)).pack(pady=20)
-             return
 
-        for s in shipments:
-            st = s['estado']
-            target_frame = self.scroll_active
-            
-            if st == 'ENTREGADO':
-                target_frame = self.scroll_delivered
-            elif st == 'INCIDENCIA':
-                target_frame = self.scroll_incidents
-            elif st in ['REGISTRADO', 'ASIGNADO', 'EN_REPARTO']:
-                target_frame = self.scroll_active
-            else:
-                # Fallback
-                target_frame = self.scroll_active
+    def load_more(self, target_frame):
+        """Añade a la pestaña la siguiente página de pedidos (paginación por cursor)."""
+        if self.more_buttons.get(target_frame):
+            self.more_buttons[target_frame].destroy()
+            self.more_buttons[target_frame] = None
 
+        page = self.controller.get_shipments_page(
+            statuses=self.frame_statuses[target_frame],
+            after_id=self.page_cursor.get(target_frame),
+            page_size=PAGE_SIZE
+        )
+        for s in page:
             self.create_shipment_card(s, target_frame)
+
+        if page:
+            self.page_cursor[target_frame] = page[-1]['id']
+        if len(page) == PAGE_SIZE:
+            btn = ctk.CTkButton(target_frame, text="Cargar más", fg_color="#64748b",
+                                command=lambda: self.load_more(target_frame))
+            btn.pack(pady=10)
+            self.more_buttons[target_frame] = btn
             
     def update_bell_status(self):
         notifs = self.controller.get_customer_notifications()
@@ -109,6 +128,12 @@ class CustomerView(BaseView):
         desc = shipment.get('descripcion') or "Sin descripción"
         ctk.CTkLabel(body, text=desc, font=ctk.CTkFont(size=14), wraplength=600, anchor="w", justify="left").pack(fill="x")
 
+        # ETA guardado al calcular la ruta del mensajero
+        eta = shipment.get('fecha_estimada_entrega')
+        if eta and shipment['estado'] in ("ASIGNADO", "EN_REPARTO"):
+            ctk.CTkLabel(body, text=f"Entrega estimada: {eta.strftime('%d/%m %H:%M')}", text_color="#64748b",
+                         anchor="w").pack(fill="x")
+
         # Footer: Buttons
         footer = ctk.CTkFrame(card, fg_color="transparent")
         footer.pack(fill="x", padx=15, pady=(10, 15))
@@ -130,11 +155,13 @@ class CustomerView(BaseView):
         
         # Lógica de ETA modificada para Incidencias
         if det['estado'] == 'INCIDENCIA':
-            eta_str = "INCIDENCIA: Su pedido será reasignado."
+            self.show_details_message(det, "INCIDENCIA: Su pedido será reasignado.")
         else:
-            eta = self.controller.calculate_eta(sid)
-            eta_str = eta.get("texto_mostrar", f"{eta.get('eta_minutos', '?')} min")
-        
+            # El ETA se calcula en segundo plano y la ventana se abre al tenerlo
+            self.controller.calculate_eta(sid, lambda eta: self.show_details_message(
+                det, eta.get("texto_mostrar", f"{eta.get('eta_minutos', '?')} min")))
+
+    def show_details_message(self, det, eta_str):
         msg = f"--- DETALLES ---\n\n"
         msg += f"Código: {det.get('codigo_seguimiento')}\n"
         msg += f"Descripción: {det.get('descripcion')}\n"
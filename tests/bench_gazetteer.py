@@ -0,0 +1,83 @@
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.gazetteer import Gazetteer
+
+# Benchmark del callejero local: construcción del índice y búsquedas por segundo.
+#
+#   python tests/bench_gazetteer.py                    -> callejero sintético de 3.000 calles
+#   python tests/bench_gazetteer.py --csv docs/gazetteer/leon_direcciones.csv
+#
+# Se mide por separado cada tipo de búsqueda: nombre exacto con portal conocido, número
+# interpolado, prefijo y calle con erratas (trigramas). Como referencia, Nominatim público
+# admite 1 petición/s.
+
+TYPES = ("calle", "avenida", "plaza", "paseo", "travesia")
+SYLLABLES = ("san", "ta", "ma", "ri", "lo", "de", "ro", "ca", "mi", "no", "al", "ver", "gil", "cen", "to", "bur")
+
+
+def synthetic(streets: int, seed: int = 7):
+    """Callejero alrededor de León: `streets` calles con hasta 120 portales cada una."""
+    rnd = random.Random(seed)
+    names = set()
+    while len(names) < streets:
+        words = ["".join(rnd.choice(SYLLABLES) for _ in range(rnd.randint(2, 4))) for _ in range(rnd.randint(1, 3))]
+        names.add(" ".join(words).title())
+    g = Gazetteer()
+    rows = []
+    for name in sorted(names):
+        kind = rnd.choice(TYPES)
+        lat, lon = 42.60 + rnd.uniform(-0.03, 0.03), -5.57 + rnd.uniform(-0.04, 0.04)
+        heading = rnd.uniform(0, 3.14)
+        for n in range(1, rnd.randint(4, 120), rnd.choice((1, 2, 3))):
+            g.add(f"{kind} {name}", str(n), "24001", "León", lat + n * 0.00004, lon + n * 0.00004 * heading)
+        rows.append((kind, name, n))
+    return g.build(), rows
+
+
+def typo(name: str, rnd: random.Random) -> str:
+    i = rnd.randrange(1, len(name) - 1)
+    return name[:i] + name[i + 1:] if rnd.random() < 0.5 else name[:i] + name[i] + name[i:]
+
+
+def run(label, g, queries):
+    started = time.perf_counter()
+    found = sum(1 for street, number in queries if g.lookup(street, number))
+    elapsed = time.perf_counter() - started
+    print(f"{label:<22}{len(queries) / elapsed:>14,.0f}/s{100 * found / len(queries):>11.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", help="Callejero real (formato de Gazetteer.from_csv)")
+    parser.add_argument("--streets", type=int, default=3000)
+    parser.add_argument("--queries", type=int, default=20000)
+    args = parser.parse_args()
+    rnd = random.Random(1)
+
+    started = time.perf_counter()
+    if args.csv:
+        g = Gazetteer.from_csv(args.csv)
+        rows = [(s.kind, s.name, max([n for side in s.numbers.values() for n, _, _ in side] or [1]))
+                for s in g._streets]
+    else:
+        g, rows = synthetic(args.streets)
+    stats = g.stats()
+    print(f"Callejero: {stats['streets']} calles, {stats['addresses']} portales "
+          f"(índice en {(time.perf_counter() - started) * 1000:.0f} ms)\n")
+
+    sample = [rnd.choice(rows) for _ in range(args.queries)]
+    print(f"{'búsqueda':<22}{'ritmo':>16}{'encontradas':>12}")
+    run("exacta", g, [(f"{k} {n}", "1") for k, n, _ in sample])
+    run("número interpolado", g, [(f"{k} {n}", str(rnd.randint(1, top))) for k, n, top in sample])
+    run("prefijo", g, [(n[:max(4, len(n) - 3)], "") for _, n, _ in sample[:args.queries // 4]])
+    run("con erratas", g, [(typo(n, rnd), "") for _, n, _ in sample[:args.queries // 4]])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from moval.services.geometry import RouteGeometry
+
+# Benchmark de la geometría de rutas: memoria, simplificación y tiempo de dibujo en el widget.
+#
+#   python tests/bench_route_geometry.py                 -> rutas de 5k, 20k y 50k vértices
+#   python tests/bench_route_geometry.py --sizes 100000
+#
+# "Antes" es la lista de tuplas completa que se pasaba a tkintermapview.set_path; "después" es
+# RouteGeometry (array numpy) y su versión simplificada para el zoom de la vista (13).
+# El dibujo necesita pantalla; sin ella solo se miden memoria y simplificación.
+
+SIZES = (5_000, 20_000, 50_000)
+ZOOM = 13
+
+
+def synthetic_route(n: int, seed: int = 7) -> np.ndarray:
+    """Paseo aleatorio por León con pasos de ~10 m, como la geometría `overview=full` de OSRM."""
+    rng = np.random.default_rng(seed)
+    heading = np.cumsum(rng.normal(0, 0.35, n))
+    step = 0.00009
+    lat = 42.60 + np.cumsum(np.sin(heading) * step)
+    lon = -5.57 + np.cumsum(np.cos(heading) * step / 0.74)
+    return np.column_stack([lat, lon])
+
+
+def measure_alloc(build):
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def draw_time(map_widget, root, coords) -> float:
+    map_widget.delete_all_path()
+    root.update()
+    started = time.perf_counter()
+    map_widget.set_path(coords, color="blue", width=5)
+    root.update()
+    # Un desplazamiento obliga a recalcular todas las posiciones del trazado
+    map_widget.set_position(coords[0][0], coords[0][1])
+    root.update()
+    return time.perf_counter() - started
+
+
+def open_widget():
+    try:
+        import tkinter
+        import tkintermapview
+        root = tkinter.Tk()
+    except Exception as e:
+        print(f"(sin pantalla: no se mide el dibujo -> {e})")
+        return None, None
+    map_widget = tkintermapview.TkinterMapView(root, width=800, height=600)
+    map_widget.pack()
+    # Sin teselas: se mide solo el trazado
+    map_widget.set_tile_server("http://localhost:9/{z}/{x}/{y}.png")
+    map_widget.set_zoom(ZOOM)
+    return root, map_widget
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de la geometría de rutas")
+    parser.add_argument("--sizes", type=int, nargs="*", default=list(SIZES))
+    args = parser.parse_args()
+
+    root, map_widget = open_widget()
+    print(f"{'vértices':>9} | {'lista (MB)':>10} | {'array (MB)':>10} | {'simplif.':>8} | "
+          f"{'t simpl. (ms)':>13} | {'dibujo antes (ms)':>17} | {'dibujo después (ms)':>19}")
+    for n in args.sizes:
+        raw = synthetic_route(n)
+        as_list, list_bytes = measure_alloc(lambda: [(float(a), float(b)) for a, b in raw.tolist()])
+        geometry, array_bytes = measure_alloc(lambda: RouteGeometry(raw.copy()))
+
+        started = time.perf_counter()
+        simplified = geometry.simplified(ZOOM)
+        simplify_ms = (time.perf_counter() - started) * 1000
+
+        before = after = float("nan")
+        if map_widget is not None:
+            before = draw_time(map_widget, root, as_list) * 1000
+            after = draw_time(map_widget, root, simplified) * 1000
+
+        print(f"{n:>9} | {list_bytes / 1e6:>10.2f} | {array_bytes / 1e6:>10.2f} | {len(simplified):>8} | "
+              f"{simplify_ms:>13.1f} | {before:>17.1f} | {after:>19.1f}")
+
+    if root is not None:
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.route_optimizer import LocalRouteOptimizer, haversine_matrix, path_length
+from moval.services.route_service import RouteService
+
+# Benchmark del optimizador local frente a respuestas de OSRM /trip grabadas.
+#
+#   python tests/bench_route_optimizer.py            -> compara con las respuestas grabadas
+#   python tests/bench_route_optimizer.py --record   -> (re)graba las respuestas de OSRM
+#
+# El servidor público de OSRM limita /trip a 100 puntos; para grabar el caso de 200 paradas
+# hace falta un OSRM propio (--osrm-url http://localhost:5000/trip/v1/driving/{coords}).
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), 'fixtures', 'osrm_trips')
+SIZES = (10, 50, 200)
+
+
+def make_points(stops: int, seed: int = 42) -> list:
+    """Inicio y fin en el almacén y `stops` paradas aleatorias (reproducibles) por León."""
+    rnd = random.Random(seed + stops)
+    warehouse = (RouteService.WAREHOUSE_LAT, RouteService.WAREHOUSE_LON)
+    stops_pts = [(42.60 + rnd.uniform(-0.025, 0.025), -5.57 + rnd.uniform(-0.035, 0.035)) for _ in range(stops)]
+    return [warehouse] + stops_pts + [warehouse]
+
+
+def fixture_path(stops: int) -> str:
+    return os.path.join(FIXTURES_DIR, f"trip_{stops}.json")
+
+
+def record(osrm_url: str | None) -> None:
+    service = RouteService(engine="osrm", fallback=False)
+    if osrm_url:
+        service.OSRM_API_URL = osrm_url
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    for stops in SIZES:
+        points = make_points(stops)
+        try:
+            started = time.perf_counter()
+            trip = service._solve_osrm(points)
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            print(f" > {stops} paradas: no se pudo grabar ({e})")
+            continue
+        with open(fixture_path(stops), "w", encoding="utf-8") as f:
+            json.dump({
+                "points": points,
+                "order": trip["order"],
+                "distance": trip["distance"],
+                "duration": trip["duration"],
+                "request_seconds": elapsed,
+            }, f)
+        print(f" > {stops} paradas grabadas ({elapsed * 1000:.0f} ms)")
+
+
+def compare() -> None:
+    optimizer = LocalRouteOptimizer(time_limit=None)
+    print(f"{'paradas':>7} {'local ms':>9} {'osrm ms':>8} {'local km':>9} {'osrm km':>8} {'dif.':>7}")
+    for stops in SIZES:
+        path = fixture_path(stops)
+        recorded = None
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                recorded = json.load(f)
+        points = [tuple(p) for p in recorded["points"]] if recorded else make_points(stops)
+
+        started = time.perf_counter()
+        trip = optimizer.solve(points)
+        elapsed = time.perf_counter() - started
+
+        # Ambos órdenes se miden con la misma métrica (línea recta) para comparar la calidad del tour
+        dist = haversine_matrix(points)
+        local_km = path_length(dist, trip["order"]) / 1000
+        if recorded:
+            osrm_km = path_length(dist, recorded["order"]) / 1000
+            print(f"{stops:>7} {elapsed * 1000:>9.1f} {recorded['request_seconds'] * 1000:>8.0f} "
+                  f"{local_km:>9.2f} {osrm_km:>8.2f} {(local_km / osrm_km - 1) * 100:>+6.1f}%")
+        else:
+            print(f"{stops:>7} {elapsed * 1000:>9.1f} {'-':>8} {local_km:>9.2f} {'-':>8} {'-':>7}  (sin grabación)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del optimizador de rutas local")
+    parser.add_argument("--record", action="store_true", help="graba las respuestas de OSRM")
+    parser.add_argument("--osrm-url", help="endpoint /trip alternativo con {coords}")
+    args = parser.parse_args()
+
+    if args.record:
+        record(args.osrm_url)
+    else:
+        compare()
+
+
+if __name__ == "__main__":
+    main()
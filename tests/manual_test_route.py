@@ -6,6 +6,7 @@ import webbrowser
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 
 from moval.services.route_service import RouteService
+from moval.services.route_map import RouteMapRenderer
 
 def test_route_generation():
     print("--- Iniciando prueba de RouteService ---")
@@ -42,12 +43,14 @@ def test_route_generation():
         print("\n¡Ruta calculada con éxito!")
         print(f"Tiempo Total: {result['total_time_minutes']} minutos")
         print(f"Distancia Total: {result['total_distance_km']} km")
-        print(f"Archivo de mapa generado: {result['map_path']}")
+        ordered = [packages[i - 1] for i in result['waypoints_order'] if 0 < i <= len(packages)]
+        map_path = RouteMapRenderer().render(result, ordered)
+        print(f"Archivo de mapa generado: {map_path}")
         print(f"Orden de waypoints (índices): {result['waypoints_order']}")
         
         # Intentar abrir el mapa automáticamente
         print(f"\nAbriendo mapa en el navegador...")
-        webbrowser.open('file://' + os.path.realpath(result['map_path']))
+        webbrowser.open('file://' + os.path.realpath(map_path))
         
     except Exception as e:
         print(f"\nERROR: Falló el cálculo de la ruta: {e}")
@@ -8,6 +8,7 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
 from moval.persistence.repositories import ShipmentRepo
 from moval.services.route_service import RouteService
 from moval.usecases.generate_delivery_route import GenerateDeliveryRoute
+from moval.services.route_map import RouteMapRenderer
 
 def test_usecase():
     print("--- Probando Use Case: Generar Ruta de Reparto ---")
@@ -27,14 +28,15 @@ def test_usecase():
         print("\n¡Éxito!")
         print(f"Tiempo estimado: {result['total_time_minutes']} min")
         print(f"Distancia: {result['total_distance_km']} km")
-        print(f"Mapa: {result['map_path']}")
+        map_path = RouteMapRenderer().render(result, result['ordered_shipments'])
+        print(f"Mapa: {map_path}")
         
         print("\nOrden optimizado de entrega:")
         for i, pkg in enumerate(result['ordered_shipments'], 1):
             print(f" {i}. {pkg['codigo']} - {pkg['direccion']}")
             
         # Abrir mapa
-        webbrowser.open('file://' + os.path.realpath(result['map_path']))
+        webbrowser.open('file://' + os.path.realpath(map_path))
         
     except ValueError as ve:
         print(f"Validación: {ve}")
@@ -25,8 +25,9 @@ class TestAssignShipment(unittest.TestCase):
         # Mock de mensajero NO disponible (esto antes fallaba, ahora debe pasar)
         self.mock_courier_repo.get.return_value = {"id": courier_id, "status": "UNAVAILABLE"}
         
-        # Mock del paquete pendiente
-        self.mock_shipment_repo.get.return_value = {"id": 101, "estado": ShipmentStatus.PENDING.value}
+        # Mock del paquete pendiente (carga en bloque)
+        self.mock_shipment_repo.get_many.return_value = [{"id": 101, "estado": ShipmentStatus.PENDING.value}]
+        self.mock_shipment_repo.assign.return_value = [101]
         
         # Ejecución
         result = self.usecase.execute(actor, shipment_ids, courier_id)
@@ -53,11 +54,50 @@ class TestAssignShipment(unittest.TestCase):
         
         self.mock_courier_repo.get.return_value = {"id": 5, "status": "AVAILABLE"}
         # El paquete ya está en reparto
-        self.mock_shipment_repo.get.return_value = {"id": 101, "estado": ShipmentStatus.EN_ROUTE.value}
+        self.mock_shipment_repo.get_many.return_value = [{"id": 101, "estado": ShipmentStatus.EN_ROUTE.value}]
         
         with self.assertRaises(ConflictError):
             self.usecase.execute(actor, [101], 5)
 
+        self.mock_shipment_repo.assign.assert_not_called()
+
+    def test_bulk_assign_uses_constant_queries(self):
+        actor = {"id": 1, "role": "ADMIN"}
+        ids = list(range(1, 301))
+        self.mock_courier_repo.get.return_value = {"id": 5}
+        self.mock_shipment_repo.get_many.return_value = [
+            {"id": i, "estado": ShipmentStatus.PENDING.value} for i in ids
+        ]
+        self.mock_shipment_repo.assign.return_value = ids
+
+        result = self.usecase.execute(actor, ids, 5)
+
+        self.assertEqual(len(result["assigned_shipments"]), 300)
+        self.mock_shipment_repo.get.assert_not_called()
+        self.mock_shipment_repo.get_many.assert_called_once_with(ids)
+        self.mock_shipment_repo.assign.assert_called_once_with(shipment_id=ids, courier_id=5)
+
+    def test_missing_shipment_in_bulk(self):
+        actor = {"id": 1, "role": "ADMIN"}
+        self.mock_courier_repo.get.return_value = {"id": 5}
+        self.mock_shipment_repo.get_many.return_value = [{"id": 101, "estado": ShipmentStatus.PENDING.value}]
+
+        with self.assertRaises(NotFoundError):
+            self.usecase.execute(actor, [101, 102], 5)
+
+    def test_state_changed_concurrently_raises_conflict(self):
+        actor = {"id": 1, "role": "ADMIN"}
+        self.mock_courier_repo.get.return_value = {"id": 5}
+        self.mock_shipment_repo.get_many.return_value = [
+            {"id": 101, "estado": ShipmentStatus.PENDING.value},
+            {"id": 102, "estado": ShipmentStatus.PENDING.value},
+        ]
+        # El SQL no asignó nada porque otro administrador se adelantó
+        self.mock_shipment_repo.assign.return_value = []
+
+        with self.assertRaises(ConflictError):
+            self.usecase.execute(actor, [101, 102], 5)
+
     def test_courier_not_found(self):
         actor = {"id": 1, "role": "ADMIN"}
         self.mock_courier_repo.get.return_value = None
@@ -0,0 +1,61 @@
+import unittest
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.security.async_hasher import AsyncPasswordHasher
+from moval.security.password_hasher import PasswordHasher
+from moval.usecases.login import Login
+from moval.usecases.errors import ValidationError
+
+
+class TestAsyncPasswordHasher(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.hasher = AsyncPasswordHasher(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.hasher.shutdown()
+
+    def test_async_hash_is_compatible_with_the_sync_hasher(self):
+        future = self.hasher.hash_async("Secreta123")
+        hashed = future.result(timeout=30)
+
+        # Mismos parámetros Argon2id: los hashes existentes siguen siendo válidos en ambos sentidos
+        self.assertTrue(hashed.startswith("$argon2id$"))
+        self.assertTrue(PasswordHasher().verify("Secreta123", hashed))
+        legacy = PasswordHasher().hash("Antigua123")
+        self.assertTrue(self.hasher.verify_async("Antigua123", legacy).result(timeout=30))
+        self.assertFalse(self.hasher.verify_async("Otra123", legacy).result(timeout=30))
+
+    def test_empty_or_malformed_hash_does_not_match(self):
+        self.assertFalse(self.hasher.verify_async("x", "").result())
+        self.assertFalse(self.hasher.verify("x", "no-es-un-hash"))
+
+    def test_hash_many_keeps_order(self):
+        passwords = [f"Usuario{i}Clave" for i in range(6)]
+        hashes = self.hasher.hash_many(passwords)
+
+        self.assertEqual(len(set(hashes)), 6)
+        self.assertTrue(all(self.hasher.verify(p, h) for p, h in zip(passwords, hashes)))
+        self.assertEqual(self.hasher.hash_many([]), [])
+
+    def test_login_works_with_the_pooled_hasher(self):
+        user_repo = MagicMock()
+        user_repo.get_by_email.return_value = {"id": 7, "role": "CUSTOMER", "is_blocked": False,
+                                               "password_hash": self.hasher.hash("Clave1234")}
+        session_repo = MagicMock()
+        session_repo.create_session.return_value = "token"
+        login = Login(user_repo, session_repo, self.hasher)
+
+        self.assertEqual(login.execute("a@moval.com", "Clave1234")["user_id"], 7)
+        with self.assertRaises(ValidationError):
+            login.execute("a@moval.com", "Mala1234")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from unittest.mock import MagicMock
+import random
+import time
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.fleet_assignment import assign_capacitated
+from moval.usecases.auto_assign_shipments import AutoAssignShipments
+from moval.usecases.errors import PermissionError, ConflictError
+
+DEPOT = (42.5987, -5.5671)
+
+
+def random_stops(n, seed=7):
+    rnd = random.Random(seed)
+    return [(DEPOT[0] + rnd.uniform(-0.05, 0.05), DEPOT[1] + rnd.uniform(-0.07, 0.07)) for _ in range(n)]
+
+
+class TestCapacitatedAssignment(unittest.TestCase):
+
+    def test_respects_stop_and_weight_limits(self):
+        stops = random_stops(60)
+        weights = [random.Random(i).uniform(1, 8) for i in range(60)]
+        result = assign_capacitated(DEPOT, stops, weights, max_stops=[20, 20, 10], max_weight=[120, 80, 200],
+                                    time_budget=0.5)
+
+        for route, limit, cap in zip(result["routes"], [20, 20, 10], [120, 80, 200]):
+            self.assertLessEqual(len(route), limit)
+            self.assertLessEqual(sum(weights[i] for i in route), cap + 1e-9)
+        assigned = [i for route in result["routes"] for i in route]
+        self.assertEqual(sorted(assigned + result["unassigned"]), list(range(60)))
+        self.assertEqual(len(assigned), len(set(assigned)))
+
+    def test_splits_the_load_between_couriers(self):
+        result = assign_capacitated(DEPOT, random_stops(30), [1.0] * 30, max_stops=[20, 20, 20],
+                                    max_weight=[100] * 3, time_budget=0.5)
+
+        self.assertEqual(result["unassigned"], [])
+        self.assertEqual(sorted(len(r) for r in result["routes"]), [10, 10, 10])
+
+    def test_large_fleet_stays_within_time_budget(self):
+        started = time.perf_counter()
+        result = assign_capacitated(DEPOT, random_stops(400), [2.0] * 400, max_stops=[25] * 20,
+                                    max_weight=[150] * 20, time_budget=1.0)
+
+        self.assertLess(time.perf_counter() - started, 1.5)
+        self.assertEqual(sum(len(r) for r in result["routes"]), 400)
+
+
+class TestAutoAssignShipments(unittest.TestCase):
+
+    def setUp(self):
+        stops = random_stops(12)
+        self.pending = [{"id": i + 1, "latitud": lat, "longitud": lon, "peso": 2.0} for i, (lat, lon) in enumerate(stops)]
+        self.pending.append({"id": 99, "latitud": None, "longitud": None, "peso": 1.0})
+        self.shipment_repo = MagicMock()
+        self.shipment_repo.list_pending.return_value = self.pending
+        self.shipment_repo.assign.side_effect = lambda shipment_id, courier_id: list(shipment_id)
+        self.shipment_repo.transaction.return_value.__enter__.return_value = None
+        self.shipment_repo.transaction.return_value.__exit__.return_value = False
+        self.courier_repo = MagicMock()
+        self.courier_repo.list_available.return_value = [{"id": 2, "nombre": "Ana", "apellidos": "Gil"},
+                                                         {"id": 3, "nombre": "Luis", "apellidos": "Paz"}]
+        self.courier_repo.active_loads.return_value = {2: {"paquetes": 17, "peso": 10.0},
+                                                       3: {"paquetes": 0, "peso": 0.0}}
+        self.route_cache = MagicMock()
+        self.admin = {"id": 1, "role": "ADMIN"}
+        self.uc = AutoAssignShipments(self.shipment_repo, self.courier_repo, self.route_cache,
+                                      max_per_courier=20, time_budget=0.3)
+
+    def test_preview_uses_remaining_capacity_and_does_not_write(self):
+        preview = self.uc.execute(self.admin)
+
+        by_courier = {a["courier_id"]: a for a in preview["assignments"]}
+        self.assertLessEqual(by_courier[2]["count"], 3)
+        self.assertEqual(sum(a["count"] for a in preview["assignments"]), 12)
+        self.assertEqual(preview["missing_coords"], [99])
+        self.assertEqual(by_courier[3]["courier_name"], "Luis Paz")
+        self.shipment_repo.assign.assert_not_called()
+
+    def test_commit_assigns_everything_in_one_transaction(self):
+        preview = self.uc.execute(self.admin)
+        self.courier_repo.active_loads.return_value = {2: {"paquetes": 17, "peso": 10.0},
+                                                       3: {"paquetes": 0, "peso": 0.0}}
+
+        result = self.uc.commit(self.admin, preview)
+
+        self.shipment_repo.transaction.assert_called_once()
+        self.assertEqual(self.shipment_repo.assign.call_count, len(preview["assignments"]))
+        self.assertEqual(set(result["assigned"]), {a["courier_id"] for a in preview["assignments"]})
+        self.assertEqual(self.route_cache.invalidate_courier.call_count, len(preview["assignments"]))
+
+    def test_commit_conflict_aborts_without_invalidating_routes(self):
+        preview = self.uc.execute(self.admin)
+        # Otro administrador ha asignado paquetes a un mensajero desde que se calculó la propuesta
+        self.courier_repo.active_loads.return_value = {2: {"paquetes": 20, "peso": 30.0},
+                                                       3: {"paquetes": 20, "peso": 30.0}}
+
+        with self.assertRaises(ConflictError):
+            self.uc.commit(self.admin, preview)
+        exit_args = self.shipment_repo.transaction.return_value.__exit__.call_args[0]
+        self.assertIs(exit_args[0], ConflictError)
+        self.route_cache.invalidate_courier.assert_not_called()
+
+    def test_only_admin_can_auto_assign(self):
+        with self.assertRaises(PermissionError):
+            self.uc.execute({"id": 2, "role": "COURIER"})
+        self.shipment_repo.list_pending.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.usecases.calculate_route_etas import CalculateRouteETAs
+from moval.usecases.errors import PermissionError
+
+NOW = datetime(2024, 1, 1, 10, 0)
+
+
+class TestCalculateRouteETAs(unittest.TestCase):
+
+    def setUp(self):
+        self.shipment_repo = MagicMock()
+        self.workday_repo = MagicMock()
+        self.workday_repo.get_active_workday.return_value = {"id": 1}
+        self.planner = MagicMock()
+        self.planner.execute.side_effect = lambda cid: {"stop_offsets": {
+            2: {10: {"travel_seconds": 300, "stops_before": 0}, 11: {"travel_seconds": 900, "stops_before": 1}},
+            3: {20: {"travel_seconds": 600, "stops_before": 0}},
+        }[cid]}
+        self.clock = MagicMock()
+        self.clock.now.return_value = NOW
+        self.usecase = CalculateRouteETAs(self.shipment_repo, self.workday_repo, self.planner, self.clock)
+
+    def test_courier_route_gives_every_stop_eta_and_persists_once(self):
+        etas = self.usecase.execute({"id": 1, "role": "ADMIN"}, courier_id=2)
+
+        self.assertEqual(etas[10]["eta_minutos"], 5)
+        self.assertEqual(etas[11]["eta_minutos"], 25)   # 15 min de viaje + 10 de la entrega anterior
+        self.assertEqual(etas[11]["fecha_estimada"], NOW + timedelta(minutes=25))
+        self.planner.execute.assert_called_once_with(2)
+        self.shipment_repo.set_estimated_deliveries.assert_called_once_with({
+            10: NOW + timedelta(minutes=5), 11: NOW + timedelta(minutes=25)
+        })
+
+    def test_shipment_ids_are_grouped_by_courier(self):
+        self.shipment_repo.get_many.return_value = [
+            {"id": 10, "id_cliente": 5, "id_mensajero": 2, "estado": "ASIGNADO"},
+            {"id": 20, "id_cliente": 5, "id_mensajero": 3, "estado": "ASIGNADO"},
+            {"id": 30, "id_cliente": 5, "id_mensajero": None, "estado": "REGISTRADO"},
+        ]
+
+        etas = self.usecase.execute({"id": 5, "role": "CUSTOMER"}, shipment_ids=[10, 20, 30, 10])
+
+        self.assertEqual(set(etas), {10, 20})
+        self.assertEqual(self.planner.execute.call_count, 2)
+        # Se guardan también las demás paradas de las rutas evaluadas
+        persisted = self.shipment_repo.set_estimated_deliveries.call_args.args[0]
+        self.assertEqual(set(persisted), {10, 11, 20})
+
+    def test_customer_cannot_query_other_shipments(self):
+        self.shipment_repo.get_many.return_value = [
+            {"id": 10, "id_cliente": 99, "id_mensajero": 2, "estado": "ASIGNADO"},
+        ]
+        with self.assertRaises(PermissionError):
+            self.usecase.execute({"id": 5, "role": "CUSTOMER"}, shipment_ids=[10])
+        self.shipment_repo.set_estimated_deliveries.assert_not_called()
+
+    def test_inactive_courier_has_no_etas(self):
+        self.workday_repo.get_active_workday.return_value = None
+
+        self.assertEqual(self.usecase.execute({"id": 2, "role": "COURIER"}, courier_id=2), {})
+        self.planner.execute.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
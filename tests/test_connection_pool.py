@@ -0,0 +1,193 @@
+import unittest
+import threading
+import time
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import psycopg2.extensions
+from moval.persistence.connection_pool import (ConnectionPool, PoolTimeoutError, RollbackOnlyError, get_pool,
+                                               close_all_pools)
+
+
+class FakeConnection:
+    """Conexión mínima que imita lo que usa el pool de psycopg2."""
+
+    def __init__(self):
+        self.closed = 0
+        self.commits = 0
+        self.rollbacks = 0
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def cursor(self):
+        conn = self
+
+        class _Cursor:
+            def __enter__(self): return self
+            def __exit__(self, *exc): return False
+            def execute(self, sql, params=None):
+                if conn.closed:
+                    raise Exception("connection closed")
+
+        return _Cursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+
+    def get_transaction_status(self):
+        return self.status
+
+    def close(self):
+        self.closed = 1
+
+
+class TestConnectionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.opened = []
+
+        def connect(**kwargs):
+            conn = FakeConnection()
+            self.opened.append(conn)
+            return conn
+
+        self.pool = ConnectionPool({"database": "test"}, min_size=1, max_size=2, timeout=0.2, connect=connect)
+
+    def test_reuses_connections(self):
+        for _ in range(5):
+            with self.pool.connection() as conn:
+                pass
+
+        self.assertEqual(len(self.opened), 1)
+        self.assertEqual(conn.commits, 5)
+        stats = self.pool.stats()
+        self.assertEqual(stats["checkouts"], 5)
+        self.assertEqual(stats["open"], 1)
+        self.assertEqual(stats["idle"], 1)
+
+    def test_rollback_on_exception(self):
+        with self.assertRaises(ValueError):
+            with self.pool.connection() as conn:
+                raise ValueError("boom")
+
+        self.assertEqual(conn.rollbacks, 1)
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+    def test_broken_connection_is_replaced_on_checkout(self):
+        with self.pool.connection() as first:
+            pass
+        first.closed = 1
+
+        with self.pool.connection() as second:
+            self.assertIsNot(first, second)
+
+        self.assertEqual(self.pool.stats()["discarded"], 1)
+        self.assertEqual(self.pool.stats()["open"], 1)
+
+    def test_waits_and_times_out_when_exhausted(self):
+        c1 = self.pool.getconn()
+        c2 = self.pool.getconn()
+
+        with self.assertRaises(PoolTimeoutError):
+            self.pool.getconn()
+
+        # Al devolver una conexión, un hilo en espera la recibe
+        result = {}
+        t = threading.Thread(target=lambda: result.setdefault("conn", self.pool.getconn()))
+        t.start()
+        time.sleep(0.05)
+        self.pool.putconn(c1)
+        t.join(1)
+
+        self.assertIs(result["conn"], c1)
+        stats = self.pool.stats()
+        self.assertEqual(stats["waits"], 2)
+        self.assertEqual(stats["timeouts"], 1)
+        self.assertLessEqual(stats["open"], 2)
+        self.pool.putconn(c2)
+
+    def test_transaction_shares_connection_and_commits_once(self):
+        with self.pool.transaction():
+            with self.pool.connection() as a:
+                a.commit()  # el commit de cada repositorio se ignora dentro de la transacción
+            with self.pool.connection() as b:
+                b.commit()
+            with self.pool.transaction():
+                with self.pool.connection() as c:
+                    pass
+
+        self.assertIs(a._conn, b._conn)
+        self.assertIs(a._conn, c._conn)
+        self.assertEqual(a._conn.commits, 1)
+        self.assertEqual(self.pool.stats()["checkouts"], 1)
+        self.assertFalse(self.pool.in_transaction())
+
+    def test_transaction_rolls_back_everything_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.pool.transaction():
+                with self.pool.connection() as a:
+                    a.commit()
+                raise ValueError("fallo a mitad")
+
+        self.assertEqual(a._conn.commits, 0)
+        self.assertEqual(a._conn.rollbacks, 1)
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+    def test_after_transaction_callbacks_run_once_transaction_ends(self):
+        events = []
+        self.pool.call_after_transaction(lambda: events.append("sin_transaccion"))
+        with self.pool.transaction():
+            self.pool.call_after_transaction(lambda: events.append("tras_commit"))
+            self.assertEqual(events, ["sin_transaccion"])
+
+        self.assertEqual(events, ["sin_transaccion", "tras_commit"])
+
+    def test_callbacks_skip_rollback_and_do_not_mask_the_commit(self):
+        events = []
+        with self.assertRaises(ValueError):
+            with self.pool.transaction():
+                self.pool.call_after_transaction(lambda: events.append("no"))
+                raise ValueError("fallo")
+
+        def broken():
+            raise RuntimeError("callback roto")
+        with self.pool.transaction() as conn:
+            self.pool.call_after_transaction(broken)
+            self.pool.call_after_transaction(lambda: events.append("sí"))
+
+        self.assertEqual(events, ["sí"])
+        self.assertEqual(conn._conn.commits, 1)
+
+    def test_repo_rollback_inside_transaction_prevents_commit(self):
+        with self.assertRaises(RollbackOnlyError):
+            with self.pool.transaction():
+                with self.pool.connection() as a:
+                    a.rollback()  # p. ej. ShipmentRepo.assign al detectar un conflicto
+
+        self.assertEqual(a._conn.commits, 0)
+        self.assertEqual(a._conn.rollbacks, 1)
+        self.assertFalse(self.pool.in_transaction())
+        with self.pool.transaction():
+            pass
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+    def test_one_pool_per_dsn(self):
+        info = {"database": "shared_dsn_test"}
+        try:
+            self.assertIs(get_pool(info), get_pool(dict(info)))
+            self.assertIsNot(get_pool(info), get_pool({"database": "other_dsn_test"}))
+            # Los tamaños solo los fija la primera llamada: pedir otros avisa en lugar de ignorarse en silencio
+            with self.assertWarns(RuntimeWarning):
+                pool = get_pool(info, min_size=2, max_size=20)
+            self.assertEqual((pool.min_size, pool.max_size), (1, 10))
+        finally:
+            close_all_pools()
+
+
+if __name__ == '__main__':
+    unittest.main()
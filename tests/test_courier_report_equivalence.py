@@ -0,0 +1,57 @@
+import unittest
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'db'))
+
+import psycopg2
+import psycopg2.extensions
+
+from bench_courier_report import run_legacy, normalize
+from seed_large_dataset import seed
+from moval.persistence.connection_pool import close_all_pools
+from moval.persistence.repositories import CourierRepo
+
+# Regresión del informe de repartidores contra un PostgreSQL real: la consulta por conjuntos de
+# CourierRepo.list_all_with_workday_info debe devolver lo mismo que la original (subconsultas
+# correlacionadas). Se ejecuta solo si MOVAL_TEST_DSN apunta a un servidor, p. ej.:
+#   MOVAL_TEST_DSN="host=localhost dbname=moval user=postgres password=..." python -m pytest
+# Los datos se crean en un esquema propio que se borra al terminar.
+
+DSN = os.environ.get("MOVAL_TEST_DSN")
+SCHEMA = "moval_test_informe"
+
+
+@unittest.skipUnless(DSN, "MOVAL_TEST_DSN no definido: sin PostgreSQL para la prueba de equivalencia")
+class TestCourierReportEquivalence(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.base = psycopg2.extensions.parse_dsn(DSN)
+        cls.conn_info = seed(couriers=40, customers=300, shipments=5000, ratings=3000,
+                             schema=SCHEMA, base_conn_info=cls.base)
+
+    @classmethod
+    def tearDownClass(cls):
+        close_all_pools()
+        conn = psycopg2.connect(**cls.base)
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            conn.commit()
+        finally:
+            conn.close()
+
+    def test_report_matches_the_original_query(self):
+        legacy = run_legacy(self.conn_info)
+        report = CourierRepo(self.conn_info).list_all_with_workday_info()
+
+        self.assertEqual(len(report), 40)
+        self.assertTrue(any(r["media"] is not None for r in report))
+        self.assertTrue(any(r["estado_jornada"] == "ACTIVA" for r in report))
+        self.assertEqual(normalize(legacy), normalize(report))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+from unittest.mock import MagicMock
+import tempfile
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from moval.services.distance_matrix import MatrixCache, DistanceMatrixService, coord_key
+from moval.services.route_service import RouteService
+
+
+POINTS = [(42.6136, -5.5583), (42.6000, -5.5700), (42.5900, -5.5600), (42.6136, -5.5583)]
+
+
+def fake_table(sources, destinations):
+    """OSRM /table simulado: 100 m y 10 s por cada milésima de grado de diferencia en latitud."""
+    durations = [[abs(s[0] - d[0]) * 10000 for d in destinations] for s in sources]
+    distances = [[abs(s[0] - d[0]) * 100000 for d in destinations] for s in sources]
+    return durations, distances
+
+
+class TestDistanceMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'matriz.sqlite3')
+        self.client = MagicMock()
+        self.client.table.side_effect = fake_table
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_second_plan_needs_no_network_and_survives_restart(self):
+        service = DistanceMatrixService(cache=MatrixCache(self.path), table_client=self.client)
+        dist, dur = service(POINTS)
+        self.assertEqual(self.client.table.call_count, 1)
+        self.assertAlmostEqual(dist[0, 2], abs(POINTS[0][0] - POINTS[2][0]) * 100000)
+        self.assertEqual(dist[0, 3], 0.0)
+        service.cache.close()
+
+        # Nueva instancia sobre el mismo fichero: todo sale de disco
+        service = DistanceMatrixService(cache=MatrixCache(self.path), table_client=self.client)
+        dist2, dur2 = service(POINTS)
+        self.assertEqual(self.client.table.call_count, 1)
+        np.testing.assert_allclose(dist, dist2)
+        np.testing.assert_allclose(dur, dur2)
+        self.assertEqual(service.stats()["fetched"], 0)
+        service.cache.close()
+
+    def test_only_rows_with_gaps_are_requested(self):
+        service = DistanceMatrixService(cache=MatrixCache(self.path), table_client=self.client)
+        service(POINTS[:2])
+        service(POINTS[:3])
+
+        sources, destinations = self.client.table.call_args[0]
+        self.assertEqual(len(sources), 3)    # los 2 conocidos tienen hueco hacia el nuevo punto
+        self.assertEqual(len(destinations), 3)
+        service(POINTS[:3])
+        self.assertEqual(self.client.table.call_count, 2)
+        service.cache.close()
+
+    def test_fallback_is_not_persisted(self):
+        self.client.table.side_effect = Exception("timeout")
+        cache = MatrixCache(self.path)
+        service = DistanceMatrixService(cache=cache, table_client=self.client)
+
+        dist, dur = service(POINTS)
+        self.assertTrue(np.all(dist[0, 1:3] > 0))
+        self.assertEqual(cache.size(), 0)
+        self.assertEqual(service.stats()["errors"], 1)
+
+        # Cuando OSRM vuelve, se consultan los pares estimados
+        self.client.table.side_effect = fake_table
+        service(POINTS)
+        self.assertGreater(cache.size(), 0)
+        cache.close()
+
+    def test_lru_eviction_keeps_recently_used_pairs(self):
+        cache = MatrixCache(self.path, max_entries=10)
+        a, b = coord_key(*POINTS[0]), coord_key(*POINTS[1])
+        cache.put_many({(a, b): (1.0, 10.0)})
+        for i in range(12):
+            # Se consulta el par (a, b) para que sea el más reciente
+            cache.get_many([a, b])
+            cache.put_many({(f"x{i}", f"y{i}"): (1.0, 1.0)})
+
+        self.assertLessEqual(cache.size(), 10)
+        self.assertIn((a, b), cache.get_many([a, b]))
+        self.assertGreater(cache.stats()["evictions"], 0)
+        cache.close()
+
+    def test_optimizer_uses_provider_durations(self):
+        service = DistanceMatrixService(cache=MatrixCache(self.path), table_client=self.client)
+        route_service = RouteService(engine="local", matrix_service=service)
+        trip = route_service.optimizer.solve(POINTS)
+
+        self.assertEqual(trip["order"][0], 0)
+        self.assertEqual(trip["order"][-1], 3)
+        expected = sum(abs(POINTS[a][0] - POINTS[b][0]) * 10000 for a, b in zip(trip["order"][:-1], trip["order"][1:]))
+        self.assertAlmostEqual(trip["duration"], expected)
+        service.cache.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import threading
+from unittest.mock import patch
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.domain.enums import ShipmentStatus
+from moval.persistence.cache import EntityCache
+from moval.persistence.cached_repositories import CachedShipmentRepo, CachedUserRepo
+from moval.persistence.repositories import ShipmentRepo, UserRepo
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEntityCache(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = EntityCache(max_entries=2, ttl=10, clock=self.clock)
+
+    def test_hit_after_first_load(self):
+        calls = []
+        loader = lambda: calls.append(1) or {"id": 1}
+
+        self.cache.get_or_load(("user", 1), loader)
+        self.cache.get_or_load(("user", 1), loader)
+
+        self.assertEqual(len(calls), 1)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_returns_copies(self):
+        self.cache.get_or_load(("user", 1), lambda: {"id": 1, "nombre": "Ana"})["nombre"] = "X"
+        self.assertEqual(self.cache.get_or_load(("user", 1), lambda: None)["nombre"], "Ana")
+
+    def test_never_serves_entries_older_than_ttl(self):
+        self.cache.get_or_load(("user", 1), lambda: {"v": 1})
+        self.clock.now = 10
+        self.assertEqual(self.cache.get_or_load(("user", 1), lambda: {"v": 2}), {"v": 2})
+        self.assertEqual(self.cache.stats()["expirations"], 1)
+
+    def test_evicts_least_recently_used(self):
+        self.cache.get_or_load(("s", 1), lambda: 1)
+        self.cache.get_or_load(("s", 2), lambda: 2)
+        self.cache.get_or_load(("s", 1), lambda: 1)   # 1 pasa a ser el más reciente
+        self.cache.get_or_load(("s", 3), lambda: 3)   # expulsa 2
+
+        self.assertEqual(self.cache.get_or_load(("s", 1), lambda: "recargado"), 1)
+        self.assertEqual(self.cache.get_or_load(("s", 2), lambda: "recargado"), "recargado")
+        self.assertGreaterEqual(self.cache.stats()["evictions"], 1)
+
+    def test_load_racing_with_invalidation_is_not_stored(self):
+        def loader():
+            # Otro hilo escribe e invalida mientras se lee el valor antiguo
+            self.cache.invalidate(("s", 1))
+            return "antiguo"
+
+        self.cache.get_or_load(("s", 1), loader)
+        self.assertEqual(self.cache.get_or_load(("s", 1), lambda: "nuevo"), "nuevo")
+
+    def test_invalidate_namespace(self):
+        self.cache.get_or_load(("shipment", 1), lambda: 1)
+        self.cache.get_or_load(("user", 1), lambda: 1)
+        self.cache.invalidate_namespace("shipment")
+
+        self.assertEqual(self.cache.get_or_load(("shipment", 1), lambda: 2), 2)
+        self.assertEqual(self.cache.get_or_load(("user", 1), lambda: 2), 1)
+
+    def test_thread_safe_under_concurrent_access(self):
+        cache = EntityCache(max_entries=50, ttl=60)
+        errors = []
+
+        def worker(n):
+            try:
+                for i in range(500):
+                    key = ("s", (i * n) % 80)
+                    cache.get_or_load(key, lambda: {"id": key[1]})
+                    if i % 7 == 0:
+                        cache.invalidate(key)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(1, 9)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertLessEqual(cache.stats()["size"], 50)
+
+
+class TestCachedRepositories(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = EntityCache(max_entries=100, ttl=60)
+        self.shipments = CachedShipmentRepo({"database": "cache_test"}, cache=self.cache)
+        self.users = CachedUserRepo({"database": "cache_test"}, cache=self.cache)
+
+    def test_shipment_reads_are_cached_and_writes_invalidate(self):
+        with patch.object(ShipmentRepo, "get", side_effect=[{"id": 7, "estado": "ASIGNADO"},
+                                                             {"id": 7, "estado": "ENTREGADO"}]) as db_get, \
+             patch.object(ShipmentRepo, "set_status") as db_set_status:
+            self.assertEqual(self.shipments.get(7)["estado"], "ASIGNADO")
+            self.assertEqual(self.shipments.get(7)["estado"], "ASIGNADO")
+            self.assertEqual(db_get.call_count, 1)
+
+            self.shipments.set_status(7, ShipmentStatus.DELIVERED)
+
+            self.assertEqual(self.shipments.get(7)["estado"], "ENTREGADO")
+            self.assertEqual(db_get.call_count, 2)
+            db_set_status.assert_called_once_with(7, ShipmentStatus.DELIVERED, None)
+
+    def test_assign_invalidates_every_shipment(self):
+        self.cache.get_or_load(("shipment", 1), lambda: {"id": 1})
+        self.cache.get_or_load(("shipment", 2), lambda: {"id": 2})
+
+        with patch.object(ShipmentRepo, "assign", return_value=[1, 2]):
+            self.shipments.assign([1, 2], 9)
+
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_user_update_invalidates_courier_entry(self):
+        self.cache.get_or_load(("courier", 3), lambda: {"id": 3, "rol": "COURIER"})
+
+        with patch.object(UserRepo, "update"):
+            self.users.update(3, {"rol": "CUSTOMER"})
+
+        self.assertEqual(self.cache.get_or_load(("courier", 3), lambda: None), None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from unittest.mock import MagicMock
+import os
+import tempfile
+
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.gazetteer import Gazetteer, parse_address, write_csv
+from moval.services.geocoding_service import GeocodingService
+
+
+def leon_gazetteer():
+    g = Gazetteer()
+    # Calle Ancha: pares en una acera, impares en la otra
+    for n, lat in ((2, 42.5980), (10, 42.5990), (1, 42.5981), (9, 42.5991)):
+        g.add("Calle Ancha", str(n), "24003", "León", lat, -5.5690 if n % 2 else -5.5692)
+    g.add("Avenida Ordoño II", "10", "24001", "León", 42.5970, -5.5740)
+    g.add("Plaza de Santo Domingo", "", "24001", "León", 42.5985, -5.5712)
+    g.add("Plaza de Santo Domingo", "", "24001", "León", 42.5987, -5.5716)
+    g.add("Calle Mayor", "5", "24700", "Astorga", 42.4580, -6.0560)
+    return g.build()
+
+
+class TestGazetteer(unittest.TestCase):
+
+    def setUp(self):
+        self.g = leon_gazetteer()
+
+    def test_exact_number_and_interpolation_on_the_same_side(self):
+        self.assertEqual(self.g.geocode("Calle Ancha 10, León"), (42.5990, -5.5692))
+        (lat, lon), info = self.g.lookup("Calle Ancha", "6")
+        self.assertAlmostEqual(lat, 42.5985)
+        self.assertEqual(lon, -5.5692)
+        self.assertTrue(info["interpolated"])
+        (lat, _), _ = self.g.lookup("Calle Ancha", "5")
+        self.assertAlmostEqual(lat, 42.5986)
+
+    def test_fuzzy_prefix_and_type_insensitive_matching(self):
+        self.assertEqual(self.g.lookup("C/ Anchaa", "10")[1]["match"], "fuzzy")
+        self.assertEqual(self.g.lookup("Plaza Santo Domngo")[1]["street"], "plaza santo domingo")
+        self.assertEqual(self.g.lookup("Ordoño", "10")[1]["match"], "prefix")
+        self.assertEqual(self.g.geocode(None, {"calle": "Ordoño II", "numero": "10", "ciudad": "León"}), (42.5970, -5.5740))
+        # Sin número: centro de la calle
+        lat, lon = self.g.geocode("Plaza Santo Domingo, León")
+        self.assertAlmostEqual(lat, 42.5986)
+
+    def test_unknown_street_or_other_city_is_a_miss(self):
+        self.assertIsNone(self.g.geocode("Calle Inexistente 3, León"))
+        self.assertIsNone(self.g.geocode("Calle Ancha 3, Madrid"))
+        self.assertIsNotNone(self.g.geocode("Calle Mayor 5, Astorga"))
+
+    def test_parses_dialog_and_free_text_formats(self):
+        self.assertEqual(parse_address("Calle Ancha, 3, 24003, León, León"),
+                         {"calle": "Calle Ancha", "numero": "3", "cp": "24003", "ciudad": "León"})
+        self.assertEqual(parse_address("Avda. Ordoño II 10, 24001 León")["numero"], "10")
+
+    def test_csv_round_trip(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "callejero.csv")
+            write_csv([{"calle": "Calle Ancha", "numero": "2", "cp": "24003", "ciudad": "León",
+                        "latitud": 42.598, "longitud": -5.5692}], path)
+            self.assertEqual(Gazetteer.from_csv(path).geocode("Calle Ancha 2"), (42.598, -5.5692))
+
+    def test_service_uses_gazetteer_first_and_nominatim_as_fallback(self):
+        http = MagicMock()
+        http.get_json.return_value = [{"lat": "40.4", "lon": "-3.7"}]
+        service = GeocodingService(http_client=http, gazetteer=self.g)
+
+        self.assertEqual(service.geocode_address("Calle Ancha 10, León"), (42.5990, -5.5692))
+        http.get_json.assert_not_called()
+        self.assertEqual(service.geocode_address("Gran Vía 1, Madrid"), (40.4, -3.7))
+        http.get_json.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
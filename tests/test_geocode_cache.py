@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import MagicMock
+import tempfile
+import time
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.geocode_cache import GeocodeCache, address_key, normalize_address, MISS
+from moval.services.geocoding_service import GeocodingService
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestAddressKeys(unittest.TestCase):
+
+    def test_equivalent_spellings_share_a_key(self):
+        self.assertEqual(normalize_address("Avda. de la Constitución, nº 5 (León)"), "avenida constitucion 5 leon")
+        self.assertEqual(normalize_address("C/ Ancha 3, León"), normalize_address("CALLE ANCHA, 3 - LEON"))
+        self.assertEqual(
+            address_key(None, {"calle": "C/ Ancha", "numero": "3", "cp": "24003", "ciudad": "León"}),
+            address_key(None, {"calle": "calle ancha", "numero": " 3", "cp": "24003", "ciudad": "LEON", "provincia": ""})
+        )
+        self.assertNotEqual(address_key("Calle Ancha 3, León"), address_key("Calle Ancha 5, León"))
+
+
+class TestGeocodeCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = FakeClock()
+        self.cache = GeocodeCache(os.path.join(self.tmp.name, "geo.sqlite3"), ttl=1000, negative_ttl=10,
+                                  clock=self.clock)
+        self.http = MagicMock()
+        self.service = GeocodingService(http_client=self.http, cache=self.cache)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_repeated_addresses_resolve_without_network(self):
+        self.http.get_json.return_value = [{"lat": "42.6", "lon": "-5.57"}]
+        structured = {"calle": "Ancha", "numero": "3", "cp": "24003", "ciudad": "León", "provincia": "León"}
+        self.assertEqual(self.service.geocode_address("Calle Ancha 3", structured), (42.6, -5.57))
+
+        started = time.perf_counter()
+        for _ in range(200):
+            self.assertEqual(self.service.geocode_address("Calle Ancha 3", dict(structured, calle="C/ Ancha")),
+                             (42.6, -5.57))
+        per_lookup = (time.perf_counter() - started) / 200
+
+        self.assertEqual(self.http.get_json.call_count, 1)
+        self.assertLess(per_lookup, 0.001)
+        self.assertGreater(self.cache.stats()["hit_rate"], 0.99)
+
+    def test_not_found_is_cached_with_a_shorter_ttl(self):
+        self.http.get_json.return_value = []
+        self.assertIsNone(self.service.geocode_address("Calle Inventada 99"))
+        self.assertIsNone(self.service.geocode_address("calle inventada, 99"))
+        self.assertEqual(self.http.get_json.call_count, 1)
+        self.assertEqual(self.cache.stats()["negative_hits"], 1)
+
+        self.clock.now += 11
+        self.http.get_json.return_value = [{"lat": "42.5", "lon": "-5.6"}]
+        self.assertEqual(self.service.geocode_address("Calle Inventada 99"), (42.5, -5.6))
+        self.assertEqual(self.http.get_json.call_count, 2)
+
+    def test_expired_entry_is_used_when_nominatim_is_down(self):
+        key = address_key("Plaza Mayor 1, León")
+        self.cache.put(key, (42.59, -5.56))
+        self.clock.now += 2000
+        self.assertIs(self.cache.get(key), MISS)
+
+        self.http.get_json.side_effect = ConnectionError("sin red")
+        self.assertEqual(self.service.geocode_address("Plaza Mayor 1, León"), (42.59, -5.56))
+
+    def test_cache_persists_across_instances(self):
+        self.cache.put(address_key("Calle Ancha 3"), (42.6, -5.57))
+        other = GeocodeCache(self.cache.path, clock=self.clock)
+        try:
+            self.assertEqual(other.get(address_key("calle ancha, 3")), (42.6, -5.57))
+        finally:
+            other.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,202 @@
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+import threading
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.geocode_cache import GeocodeCache, address_key
+from moval.services.geocode_resolver import GeocodeResolver
+from moval.services.geocoding_service import GeocodingService
+from moval.services.http_client import CircuitOpenError
+from moval.services.route_service import RouteService
+from moval.usecases.create_shipment import CreateShipment
+from moval.usecases.generate_delivery_route import GenerateDeliveryRoute
+from moval.usecases.assign_shipment import AssignShipments
+from moval.usecases.errors import ConflictError
+
+NOW = datetime(2024, 1, 1, 10)
+
+
+class TestDeferredGeocoding(unittest.TestCase):
+
+    def setUp(self):
+        self.shipment_repo = MagicMock()
+        self.shipment_repo.create.return_value = 42
+        self.user_repo = MagicMock()
+        self.user_repo.get.return_value = {"id": 10}
+        self.http = MagicMock()
+        self.geocoder = GeocodingService(http_client=self.http, cache=GeocodeCache(":memory:"))
+        self.resolver = MagicMock()
+        self.uc = CreateShipment(self.shipment_repo, self.user_repo, self.geocoder, geocode_resolver=self.resolver)
+        self.data = {"descripcion": "Caja", "peso": "2", "direccion_origen": "Almacén",
+                     "direccion_destino": "Calle Ancha, 3, León", "id_cliente": 10,
+                     "calle": "Calle Ancha", "numero": "3", "cp": "", "ciudad": "León", "provincia": ""}
+
+    def tearDown(self):
+        self.geocoder.cache.close()
+
+    def test_shipment_is_saved_without_waiting_for_nominatim(self):
+        self.assertEqual(self.uc.execute({"role": "ADMIN"}, self.data), 42)
+
+        self.http.get_json.assert_not_called()
+        saved = self.shipment_repo.create.call_args[0][0]
+        self.assertIsNone(saved["latitud"])
+        shipment_id, structured = self.resolver.enqueue.call_args[0]
+        self.assertEqual(shipment_id, 42)
+        self.assertEqual(structured["ciudad"], "León")
+
+    def test_cached_address_is_saved_resolved(self):
+        structured = {f: self.data[f] for f in ("calle", "numero", "cp", "ciudad", "provincia")}
+        self.geocoder.cache.put(address_key(self.data["direccion_destino"], structured), (42.6, -5.57))
+
+        self.uc.execute({"role": "ADMIN"}, self.data)
+
+        self.assertEqual(self.shipment_repo.create.call_args[0][0]["latitud"], 42.6)
+        self.resolver.enqueue.assert_not_called()
+
+    def test_known_invalid_address_is_still_rejected(self):
+        structured = {f: self.data[f] for f in ("calle", "numero", "cp", "ciudad", "provincia")}
+        self.geocoder.cache.put(address_key(self.data["direccion_destino"], structured), None)
+
+        with self.assertRaises(ValueError):
+            self.uc.execute({"role": "ADMIN"}, self.data)
+        self.shipment_repo.create.assert_not_called()
+
+
+class TestGeocodeResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.shipment_repo = MagicMock()
+        self.geocoder = MagicMock()
+        self.clock = MagicMock()
+        self.clock.now.return_value = NOW
+        self.route_cache = MagicMock()
+        self.resolver = GeocodeResolver(self.shipment_repo, self.geocoder, self.clock, self.route_cache,
+                                        max_attempts=3, base_delay=timedelta(minutes=1))
+
+    def test_resolves_pending_and_refreshes_the_courier_route(self):
+        self.shipment_repo.list_pending_geocodes.return_value = [
+            {"id": 1, "direccion_destino": "Calle Ancha 3", "id_mensajero": 2, "intentos_geocodificacion": 0}]
+        self.shipment_repo.set_geocode.return_value = 2
+        self.geocoder.geocode_address.return_value = (42.6, -5.57)
+        self.resolver.enqueue(1, {"calle": "Ancha", "numero": "3", "ciudad": "León"})
+
+        self.assertEqual(self.resolver.run_once(), 1)
+
+        self.assertEqual(self.geocoder.geocode_address.call_args[1]["structured_query"]["calle"], "Ancha")
+        self.shipment_repo.set_geocode.assert_called_once_with(1, 42.6, -5.57)
+        self.route_cache.invalidate_courier.assert_called_once_with(2)
+        self.assertEqual(self.resolver.stats()["hints"], 0)
+
+    def test_failures_back_off_then_give_up(self):
+        # Nominatim responde, pero no encuentra la dirección
+        self.geocoder.geocode_address.return_value = None
+        for attempts in (0, 1):
+            self.shipment_repo.list_pending_geocodes.return_value = [
+                {"id": 1, "direccion_destino": "X", "intentos_geocodificacion": attempts}]
+            self.resolver.run_once()
+            self.shipment_repo.record_geocode_failure.assert_called_with(1, NOW + timedelta(minutes=2 ** attempts))
+
+        self.shipment_repo.list_pending_geocodes.return_value = [
+            {"id": 1, "direccion_destino": "X", "intentos_geocodificacion": 2}]
+        self.resolver.run_once()
+        self.shipment_repo.record_geocode_failure.assert_called_with(1, None)
+        self.assertEqual(self.resolver.stats()["failed"], 1)
+
+    def test_every_attempt_asks_nominatim_despite_the_negative_cache(self):
+        http = MagicMock()
+        http.get_json.return_value = []
+        geocoder = GeocodingService(http_client=http, cache=GeocodeCache(":memory:"))
+        self.addCleanup(geocoder.cache.close)
+        resolver = GeocodeResolver(self.shipment_repo, geocoder, self.clock, max_attempts=5)
+        shipment = {"id": 1, "direccion_destino": "Calle Inventada 7, León", "intentos_geocodificacion": 0}
+        self.shipment_repo.list_pending_geocodes.return_value = [shipment]
+
+        for attempt in range(1, 6):
+            resolver.run_once()
+            self.assertEqual(http.get_json.call_count, attempt)
+            shipment["intentos_geocodificacion"] = attempt
+
+        self.shipment_repo.record_geocode_failure.assert_called_with(1, None)
+        # Otros usos (alta, importación) siguen aprovechando el "no encontrada" cacheado
+        self.assertIsNone(geocoder.geocode_address("Calle Inventada 7, León"))
+        self.assertEqual(http.get_json.call_count, 5)
+
+    def test_outage_postpones_without_spending_attempts(self):
+        http = MagicMock()
+        http.get_json.side_effect = CircuitOpenError("nominatim")
+        resolver = GeocodeResolver(self.shipment_repo, GeocodingService(http_client=http), self.clock,
+                                   max_attempts=5, outage_delay=timedelta(minutes=1))
+        self.shipment_repo.list_pending_geocodes.return_value = [
+            {"id": 1, "direccion_destino": "Calle Ancha 3", "intentos_geocodificacion": 4},
+            {"id": 2, "direccion_destino": "Plaza Mayor 1", "intentos_geocodificacion": 0}]
+
+        self.assertEqual(resolver.run_once(), 1)
+
+        self.shipment_repo.postpone_geocode.assert_called_once_with(1, NOW + timedelta(minutes=1))
+        self.shipment_repo.record_geocode_failure.assert_not_called()
+        self.assertEqual(http.get_json.call_count, 1)
+
+    def test_background_thread_wakes_on_enqueue(self):
+        self.shipment_repo.list_pending_geocodes.return_value = []
+        self.resolver.idle_interval = 60
+        self.resolver.start()
+        try:
+            calls = self.shipment_repo.list_pending_geocodes.call_count
+            self.resolver.enqueue(5)
+            for _ in range(100):
+                if self.shipment_repo.list_pending_geocodes.call_count > calls:
+                    break
+                threading.Event().wait(0.01)
+            self.assertGreater(self.shipment_repo.list_pending_geocodes.call_count, calls)
+        finally:
+            self.resolver.stop(timeout=1)
+
+
+class TestPendingGeocodeAwareness(unittest.TestCase):
+
+    def _shipment(self, sid, lat, lon, geo="RESUELTA"):
+        return {"id": sid, "estado": "ASIGNADO", "codigo_seguimiento": f"C{sid}", "direccion_destino": "D",
+                "latitud": lat, "longitud": lon, "estado_geocodificacion": geo}
+
+    def test_route_leaves_out_and_reports_pending_shipments(self):
+        shipment_repo = MagicMock()
+        shipment_repo.list_by_courier.return_value = [self._shipment(1, 42.60, -5.57),
+                                                      self._shipment(2, None, None, "PENDIENTE")]
+        workday_repo = MagicMock()
+        workday_repo.get_active_workday.return_value = None
+        planner = GenerateDeliveryRoute(shipment_repo, RouteService(engine="local"), workday_repo)
+
+        route = planner.execute(2)
+        self.assertEqual([s["id"] for s in route["ordered_shipments"]], [1])
+        self.assertEqual(route["pending_geocode"], [2])
+
+        shipment_repo.list_by_courier.return_value = [self._shipment(2, None, None, "PENDIENTE")]
+        with self.assertRaisesRegex(ValueError, "pending geocoding"):
+            planner.execute(2)
+
+    def test_assign_rejects_failed_geocode_and_reports_pending(self):
+        shipment_repo = MagicMock()
+        shipment_repo.transaction.return_value.__enter__.return_value = None
+        shipment_repo.transaction.return_value.__exit__.return_value = False
+        shipment_repo.assign.side_effect = lambda shipment_id, courier_id: list(shipment_id)
+        courier_repo = MagicMock()
+        courier_repo.get.return_value = {"id": 2}
+        uc = AssignShipments(shipment_repo, courier_repo)
+        admin = {"id": 1, "role": "ADMIN"}
+
+        pending = dict(self._shipment(1, None, None, "PENDIENTE"), estado="REGISTRADO")
+        shipment_repo.get_many.return_value = [pending]
+        self.assertEqual(uc.execute(admin, [1], 2)["pending_geocode"], [1])
+
+        failed = dict(self._shipment(3, None, None, "FALLIDA"), estado="REGISTRADO")
+        shipment_repo.get_many.return_value = [failed]
+        with self.assertRaises(ConflictError):
+            uc.execute(admin, [3], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
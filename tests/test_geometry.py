@@ -0,0 +1,99 @@
+import unittest
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+
+from moval.services.geometry import RouteGeometry, encode_polyline, decode_polyline, douglas_peucker
+from moval.services.route_service import RouteService
+
+
+def wiggly_route(n: int = 5000) -> np.ndarray:
+    """Línea de ~5 km hacia el este con un zigzag de ±0,5 m y un desvío de 300 m a mitad."""
+    lon = np.linspace(-5.60, -5.54, n)
+    lat = np.full(n, 42.60) + np.where(np.arange(n) % 2, 0.0000045, -0.0000045)
+    lat[n // 2] += 0.0027
+    return np.column_stack([lat, lon])
+
+
+class TestPolyline(unittest.TestCase):
+
+    def test_reference_example(self):
+        # Ejemplo de la documentación de Google
+        coords = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+        self.assertEqual(encode_polyline(coords), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        np.testing.assert_allclose(decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@"), coords)
+
+    def test_roundtrip_precision_6(self):
+        coords = wiggly_route(200)
+        np.testing.assert_allclose(decode_polyline(encode_polyline(coords, 6), 6), coords, atol=1e-6)
+
+
+class TestSimplification(unittest.TestCase):
+
+    def test_keeps_endpoints_and_real_detours(self):
+        coords = wiggly_route()
+        keep = douglas_peucker(coords, tolerance_m=5.0)
+
+        self.assertTrue(keep[0] and keep[-1])
+        self.assertTrue(keep[len(coords) // 2])
+        self.assertLess(keep.sum(), 10)
+
+    def test_zero_tolerance_keeps_everything(self):
+        coords = wiggly_route(100)
+        self.assertTrue(douglas_peucker(coords, 0).all())
+
+    def test_zoom_levels(self):
+        geometry = RouteGeometry(wiggly_route())
+
+        low, high = geometry.simplified(10), geometry.simplified(17)
+        self.assertLess(len(low), len(high))
+        self.assertLess(len(high), len(geometry))
+        self.assertEqual(low[0], geometry.full()[0])
+        self.assertEqual(low[-1], geometry.full()[-1])
+        # Cada nivel se calcula una vez
+        level = geometry._levels[10]
+        geometry.simplified(10.7)
+        self.assertIs(geometry._levels[10], level)
+        self.assertEqual(geometry.nbytes, len(geometry) * 16)
+
+
+class TestRouteServiceGeometry(unittest.TestCase):
+
+    def setUp(self):
+        self.packages = [{"id": 1, "latitud": 42.60, "longitud": -5.57, "direccion": "A"},
+                         {"id": 2, "latitud": 42.61, "longitud": -5.56, "direccion": "B"}]
+
+    def test_local_route_has_compact_geometry(self):
+        route = RouteService(engine="local").calculate_optimized_route(self.packages)
+
+        self.assertIsInstance(route["geometry"], RouteGeometry)
+        self.assertEqual(len(route["geometry"]), len(self.packages) + 2)
+
+    def test_road_geometry_on_demand_is_cached(self):
+        road = [(42.6136, -5.5583), (42.605, -5.565), (42.60, -5.57), (42.61, -5.56), (42.6136, -5.5583)]
+        http = MagicMock()
+        http.get_json.return_value = {"code": "Ok", "routes": [{"geometry": encode_polyline(road, 6)}]}
+        service = RouteService(engine="local", http_client=http)
+        route = service.calculate_optimized_route(self.packages)
+
+        first = service.road_geometry(route)
+        second = service.road_geometry(route)
+
+        self.assertIs(first, second)
+        self.assertEqual(http.get_json.call_count, 1)
+        np.testing.assert_allclose(first.coords, road, atol=1e-6)
+
+    def test_road_geometry_falls_back_to_straight_lines(self):
+        http = MagicMock()
+        http.get_json.side_effect = Exception("timeout")
+        service = RouteService(engine="local", http_client=http)
+        route = service.calculate_optimized_route(self.packages)
+
+        self.assertIs(service.road_geometry(route), route["geometry"])
+
+if __name__ == '__main__':
+    unittest.main()
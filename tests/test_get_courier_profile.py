@@ -0,0 +1,64 @@
+import unittest
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.usecases.get_courier_profile import GetCourierProfile
+from moval.usecases.errors import PermissionError
+
+class TestGetCourierProfile(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_courier_repo = MagicMock()
+        self.mock_rating_repo = MagicMock()
+        self.mock_shipment_repo = MagicMock()
+        self.usecase = GetCourierProfile(self.mock_courier_repo, self.mock_rating_repo, self.mock_shipment_repo)
+
+        self.mock_courier_repo.get.return_value = {"id": 2, "nombre": "Juan", "apellidos": "Pérez"}
+        self.mock_rating_repo.get_courier_stats.return_value = {
+            "num_valoraciones": 4,
+            "media": 4.5,
+            "estrellas": {1: 0, 2: 0, 3: 0, 4: 2, 5: 2},
+            "fecha_ultima_valoracion": None,
+        }
+
+    def test_profile_uses_sql_aggregates(self):
+        actor = {"id": 1, "role": "ADMIN"}
+        self.mock_shipment_repo.count_by_status.return_value = {"ENTREGADO": 25000, "ASIGNADO": 3}
+
+        result = self.usecase.execute(actor, 2)
+
+        self.assertEqual(result["total_entregas"], 25000)
+        self.assertEqual(result["envios_por_estado"]["ASIGNADO"], 3)
+        self.mock_shipment_repo.count_by_status.assert_called_once_with(courier_id=2)
+        # No se materializan listados de paquetes
+        self.mock_shipment_repo.list_by_courier.assert_not_called()
+        self.mock_shipment_repo.list_by_customer.assert_not_called()
+
+    def test_rating_comes_from_courier_aggregates(self):
+        actor = {"id": 1, "role": "ADMIN"}
+        self.mock_shipment_repo.count_by_status.return_value = {}
+
+        result = self.usecase.execute(actor, 2)
+
+        self.assertEqual(result["puntuacion_media"], 4.5)
+        self.assertEqual(result["num_valoraciones"], 4)
+        self.assertEqual(result["valoraciones_por_estrellas"][5], 2)
+        self.mock_rating_repo.get_courier_stats.assert_called_once_with(2)
+        self.mock_rating_repo.average_by_courier.assert_not_called()
+
+    def test_customer_without_shared_shipments_is_rejected(self):
+        actor = {"id": 5, "role": "CUSTOMER"}
+        self.mock_shipment_repo.count_by_customer.return_value = 0
+
+        with self.assertRaises(PermissionError):
+            self.usecase.execute(actor, 2)
+
+        self.mock_shipment_repo.count_by_customer.assert_called_once_with(
+            customer_id=5, filters={"id_mensajero": 2}
+        )
+
+if __name__ == '__main__':
+    unittest.main()
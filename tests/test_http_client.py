@@ -0,0 +1,158 @@
+import unittest
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import requests
+
+from moval.services.http_client import HttpClient, EndpointPolicy, CircuitOpenError, CircuitBreaker
+from moval.services.geocoding_service import GeocodingService
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Servidor de pruebas: /ok, /slow, /flaky (503 las primeras veces), /down (siempre 503), /bad (400)."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path.split("?")[0]] = server.hits.get(self.path.split("?")[0], 0) + 1
+            server.client_ports.add(self.client_address[1])
+        path = self.path.split("?")[0]
+        if path == "/slow":
+            time.sleep(0.5)
+        if path == "/flaky":
+            with server.lock:
+                server.flaky_left -= 1
+                failing = server.flaky_left >= 0
+            if failing:
+                return self._send(503, {"error": "busy"})
+        if path == "/down":
+            return self._send(503, {"error": "down"})
+        if path == "/bad":
+            return self._send(400, {"code": "InvalidQuery"})
+        if path == "/search":
+            return self._send(200, [{"lat": "42.6", "lon": "-5.57"}])
+        self._send(200, {"code": "Ok", "path": path})
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestHttpClient(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.hits = {}
+        self.server.client_ports = set()
+        self.server.flaky_left = 0
+        self.sleeps = []
+        self.clock = FakeClock()
+        self.client = HttpClient(policies={
+            "api": EndpointPolicy(timeout=(1, 0.2), retries=2, backoff=0.1, failure_threshold=2, reset_timeout=30),
+        }, clock=self.clock, sleep=self.sleeps.append)
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_keep_alive_reuses_the_connection(self):
+        for _ in range(5):
+            self.assertEqual(self.client.get_json("api", self.base + "/ok")["code"], "Ok")
+
+        self.assertEqual(len(self.server.client_ports), 1)
+        metrics = self.client.metrics()["api"]
+        self.assertEqual(metrics["requests"], 5)
+        self.assertIn("p95", metrics["latency_ms"])
+
+    def test_retries_with_backoff_then_succeeds(self):
+        self.server.flaky_left = 2
+
+        self.assertEqual(self.client.get_json("api", self.base + "/flaky")["code"], "Ok")
+        self.assertEqual(self.server.hits["/flaky"], 3)
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertGreater(self.sleeps[1], self.sleeps[0])
+        self.assertEqual(self.client.metrics()["api"]["retries"], 2)
+
+    def test_read_timeout_is_enforced(self):
+        started = time.perf_counter()
+        with self.assertRaises(requests.Timeout):
+            self.client.get_json("api", self.base + "/slow")
+        # 3 intentos de 0,2 s, muy por debajo de los 0,5 s x 3 del servidor
+        self.assertLess(time.perf_counter() - started, 1.2)
+
+    def test_circuit_opens_and_fails_fast(self):
+        for _ in range(2):
+            with self.assertRaises(requests.HTTPError):
+                self.client.get_json("api", self.base + "/down")
+        hits = self.server.hits["/down"]
+
+        with self.assertRaises(CircuitOpenError):
+            self.client.get_json("api", self.base + "/ok")
+        self.assertEqual(self.server.hits["/down"], hits)
+        self.assertNotIn("/ok", self.server.hits)
+        self.assertEqual(self.client.metrics()["api"]["state"], CircuitBreaker.OPEN)
+
+        # Pasado reset_timeout una petición de prueba cierra el circuito si va bien
+        self.clock.now += 31
+        self.assertEqual(self.client.get_json("api", self.base + "/ok")["code"], "Ok")
+        self.assertEqual(self.client.breaker("api").state, CircuitBreaker.CLOSED)
+
+    def test_client_errors_do_not_retry_or_open_the_circuit(self):
+        for _ in range(3):
+            with self.assertRaises(requests.HTTPError):
+                self.client.get_json("api", self.base + "/bad")
+
+        self.assertEqual(self.server.hits["/bad"], 3)
+        self.assertEqual(self.sleeps, [])
+        self.assertEqual(self.client.breaker("api").state, CircuitBreaker.CLOSED)
+
+    def test_geocoding_falls_back_to_last_known_result(self):
+        client = HttpClient(policies={"nominatim": EndpointPolicy(retries=0, failure_threshold=1)},
+                            clock=self.clock, sleep=self.sleeps.append)
+        service = GeocodingService(http_client=client)
+        service.BASE_URL = self.base + "/search"
+        self.assertEqual(service.geocode_address("Calle Ancha 1, León"), (42.6, -5.57))
+
+        service.BASE_URL = self.base + "/down"
+        self.assertEqual(service.geocode_address("Calle Ancha 1, León"), (42.6, -5.57))
+        self.assertIsNone(service.geocode_address("Otra calle"))
+        client.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
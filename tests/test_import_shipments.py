@@ -0,0 +1,134 @@
+import unittest
+from unittest.mock import MagicMock
+import io
+import threading
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.geocode_cache import MISS, address_key
+from moval.services.geocode_queue import GeocodeQueue
+from moval.usecases.import_shipments import ImportShipments, read_rows
+from moval.usecases.errors import PermissionError
+
+CSV = """descripcion;peso;direccion_destino;id_cliente
+Libros;2,5;Calle Ancha 3, León;10
+Ropa;1;calle ancha, 3 - LEON;10
+Zapatos;0;Plaza Mayor 1, León;10
+Móvil;0.3;Plaza Mayor 1, León;99
+Lámpara;4;Calle Inventada 7, León;10
+Cuadro;3;Avenida Ordoño II 10, León;10
+"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class TestImportShipments(unittest.TestCase):
+
+    def setUp(self):
+        # Geocodificador con una caché mínima, como GeocodingService con GeocodeCache
+        self.geocoder = MagicMock()
+        self.geocoded = {}
+        self.geocoder.geocode_offline.side_effect = (
+            lambda address, structured_query=None: self.geocoded.get(address_key(address, structured_query), MISS))
+        self.geocoder.geocode_address.side_effect = self._geocode
+        self.clock = FakeClock()
+        self.queue = GeocodeQueue(self.geocoder, min_interval=1.0, clock=self.clock, sleep=self.clock.sleep)
+
+        self.shipment_repo = MagicMock()
+        self.created = []
+        self.shipment_repo.create_many.side_effect = self._create_many
+        self.user_repo = MagicMock()
+        self.user_repo.get.side_effect = lambda uid: {"id": uid} if uid == 10 else None
+        self.admin = {"id": 1, "role": "ADMIN"}
+        self.uc = ImportShipments(self.shipment_repo, self.user_repo, self.queue, batch_size=4)
+
+    def tearDown(self):
+        self.queue.shutdown()
+
+    def _geocode(self, address, structured_query=None):
+        coords = None if "Inventada" in address else (42.6, -5.57)
+        self.geocoded[address_key(address, structured_query)] = coords
+        return coords
+
+    def _create_many(self, shipments):
+        ids = list(range(len(self.created) + 1, len(self.created) + len(shipments) + 1))
+        self.created.extend(shipments)
+        return ids
+
+    def test_imports_valid_rows_and_reports_errors_by_row(self):
+        progress = []
+        report = self.uc.execute(self.admin, io.StringIO(CSV), fmt="csv", on_progress=progress.append)
+
+        self.assertEqual(report["processed"], 6)
+        self.assertEqual(report["created"], 3)
+        self.assertEqual(sorted(e["row"] for e in report["errors"]), [4, 5, 6])
+        self.assertEqual(self.shipment_repo.create_many.call_count, 2)
+        self.assertEqual(self.created[0]["peso"], 2.5)
+        self.assertEqual(self.created[0]["direccion_origen"], ImportShipments.DEFAULT_ORIGIN)
+        self.assertEqual(len({s["codigo_seguimiento"] for s in self.created}), 3)
+        self.assertEqual(self.user_repo.get.call_count, 2)
+        self.assertEqual(progress[-1]["created"], 3)
+
+    def test_geocodes_each_distinct_address_once_at_one_per_second(self):
+        self.uc.execute(self.admin, io.StringIO(CSV), fmt="csv")
+
+        # "Calle Ancha 3, León" aparece escrita de dos formas (la segunda comparte la petición en
+        # curso o sale de la caché); las filas con peso o cliente inválidos no se geocodifican
+        self.assertEqual(self.geocoder.geocode_address.call_count, 3)
+        stats = self.queue.stats()
+        self.assertEqual(stats["deduplicated"] + stats["cached"], 1)
+        self.assertGreaterEqual(self.clock.now, 2.0)
+
+    def test_resolved_addresses_are_not_kept_by_the_queue(self):
+        # Un None por fallo de red (sin caché) no se reutiliza: la siguiente vez se vuelve a pedir
+        self.geocoder.geocode_address.side_effect = [None, (42.6, -5.57)]
+        self.assertIsNone(self.queue.submit("Calle Ancha 3, León").result())
+        self.assertEqual(self.queue.submit("Calle Ancha 3, León").result(), (42.6, -5.57))
+        self.assertEqual(self.geocoder.geocode_address.call_count, 2)
+        self.queue.shutdown()
+        self.assertEqual(self.queue._pending, {})
+
+    def test_reads_json_lines_with_structured_addresses(self):
+        data = io.StringIO(
+            '{"descripcion": "Caja", "peso": 1, "id_cliente": 10, "calle": "Ancha", "numero": "3", "ciudad": "León"}\n'
+            '\n'
+            '{"descripcion": "Sobre", "peso": 0.1, "id_cliente": 10}\n'
+        )
+        report = self.uc.execute(self.admin, data, fmt="jsonl")
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(self.created[0]["direccion_destino"], "Ancha, 3, León")
+        self.assertEqual(self.geocoder.geocode_address.call_args[1]["structured_query"]["calle"], "Ancha")
+        self.assertEqual(report["errors"][0]["row"], 3)
+
+    def test_cancel_stops_before_inserting(self):
+        cancel = threading.Event()
+        cancel.set()
+        report = self.uc.execute(self.admin, io.StringIO(CSV), fmt="csv", cancel_event=cancel)
+
+        self.assertTrue(report["cancelled"])
+        self.shipment_repo.create_many.assert_not_called()
+
+    def test_only_admin_can_import(self):
+        with self.assertRaises(PermissionError):
+            self.uc.execute({"id": 5, "role": "CUSTOMER"}, io.StringIO(CSV), fmt="csv")
+
+    def test_csv_delimiter_is_detected(self):
+        rows = list(read_rows(io.StringIO("descripcion,peso,id_cliente\nA,1,10\nB,2,10\n"), "csv"))
+        self.assertEqual([n for n, _ in rows], [2, 3])
+        self.assertEqual(rows[1][1]["descripcion"], "B")
+
+
+if __name__ == '__main__':
+    unittest.main()
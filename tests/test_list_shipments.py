@@ -0,0 +1,46 @@
+import unittest
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.usecases.list_shipments import ListShipments
+from moval.usecases.errors import PermissionError
+
+class TestListShipments(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_shipment_repo = MagicMock()
+        self.usecase = ListShipments(self.mock_shipment_repo)
+
+    def test_admin_without_page_lists_everything(self):
+        self.usecase.execute({"id": 1, "role": "ADMIN"})
+
+        self.mock_shipment_repo.list_all.assert_called_with({})
+
+    def test_customer_page_is_scoped_and_forwarded(self):
+        actor = {"id": 5, "role": "CUSTOMER"}
+
+        self.usecase.execute(actor, page_size=50, after_id=120, descending=True, statuses=["ENTREGADO"])
+
+        self.mock_shipment_repo.list_by_customer.assert_called_with(
+            5, {}, page_size=50, after_id=120, descending=True, statuses=["ENTREGADO"]
+        )
+        self.mock_shipment_repo.list_all.assert_not_called()
+
+    def test_courier_page_sorted_by_date(self):
+        actor = {"id": 2, "role": "COURIER"}
+
+        self.usecase.execute(actor, page_size=20, after_id=7, after_ts="2026-01-01", sort_by="fecha_creacion")
+
+        self.mock_shipment_repo.list_by_courier.assert_called_with(
+            2, {}, page_size=20, after_id=7, after_ts="2026-01-01", sort_by="fecha_creacion"
+        )
+
+    def test_invalid_role(self):
+        with self.assertRaises(PermissionError):
+            self.usecase.execute({"id": 1, "role": "GUEST"})
+
+if __name__ == '__main__':
+    unittest.main()
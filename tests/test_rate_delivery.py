@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.usecases.rate_delivery import RateDelivery
+from moval.usecases.errors import ConflictError
+
+class TestRateDelivery(unittest.TestCase):
+
+    def setUp(self):
+        self.mock_shipment_repo = MagicMock()
+        self.mock_rating_repo = MagicMock()
+        self.usecase = RateDelivery(self.mock_shipment_repo, self.mock_rating_repo)
+
+        self.actor = {"id": 5, "role": "CUSTOMER"}
+        self.mock_shipment_repo.get.return_value = {
+            "id": 10, "estado": "ENTREGADO", "id_cliente": 5, "id_mensajero": 2
+        }
+        self.mock_rating_repo.has_rating_for_shipment.return_value = False
+        self.mock_rating_repo.create_delivery_rating.return_value = {"id": 1, "fecha": "2024-01-01"}
+
+    def test_rating_updates_courier_aggregates_in_same_transaction(self):
+        events = []
+        tx = self.mock_rating_repo.transaction.return_value
+        tx.__enter__.side_effect = lambda *a: events.append("begin")
+        tx.__exit__.side_effect = lambda *a: events.append("end")
+        self.mock_rating_repo.create_delivery_rating.side_effect = \
+            lambda **kw: events.append("insert") or {"id": 1, "fecha": "2024-01-01"}
+        self.mock_rating_repo.record_courier_rating.side_effect = lambda *a, **kw: events.append("record")
+
+        self.usecase.execute(self.actor, 10, 4, "Bien")
+
+        self.assertEqual(events, ["begin", "insert", "record", "end"])
+        self.mock_rating_repo.record_courier_rating.assert_called_once_with(2, 4, rated_at="2024-01-01")
+        # Ya no se recalcula la media recorriendo todas las valoraciones
+        self.mock_rating_repo.recalc_courier_avg.assert_not_called()
+
+    def test_duplicate_rating_does_not_touch_aggregates(self):
+        self.mock_rating_repo.has_rating_for_shipment.return_value = True
+
+        with self.assertRaises(ConflictError):
+            self.usecase.execute(self.actor, 10, 4)
+
+        self.mock_rating_repo.create_delivery_rating.assert_not_called()
+        self.mock_rating_repo.record_courier_rating.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -52,7 +52,8 @@ class TestReportIncident(unittest.TestCase):
         self.mock_shipment_repo.update.assert_called_with(
             shipment_id=shipment_id,
             fields={
-                "estado": ShipmentStatus.INCIDENT.value
+                "estado": ShipmentStatus.INCIDENT.value,
+                "fecha_estimada_entrega": None
             }
         )
         
@@ -78,7 +79,8 @@ class TestReportIncident(unittest.TestCase):
         self.mock_shipment_repo.update.assert_called_with(
             shipment_id=shipment_id,
             fields={
-                "estado": ShipmentStatus.INCIDENT.value
+                "estado": ShipmentStatus.INCIDENT.value,
+                "fecha_estimada_entrega": None
             }
         )
         self.mock_shipment_repo.create_copy.assert_called()
@@ -0,0 +1,82 @@
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.route_cache import RouteCache
+from moval.usecases.generate_delivery_route import GenerateDeliveryRoute
+from moval.usecases.calculate_eta import CalculateETA
+from moval.usecases.deliver_shipment import DeliverShipment
+
+
+def shipment(sid, customer, estado="ASIGNADO", lat=42.60, lon=-5.56):
+    return {"id": sid, "id_cliente": customer, "id_mensajero": 2, "estado": estado,
+            "codigo_seguimiento": f"C{sid}", "direccion_destino": f"Calle {sid}",
+            "latitud": lat, "longitud": lon}
+
+
+class TestRouteCache(unittest.TestCase):
+
+    def setUp(self):
+        self.shipments = [shipment(10, 5, lat=42.60), shipment(11, 6, lat=42.61), shipment(12, 7, lat=42.62)]
+        self.shipment_repo = MagicMock()
+        self.shipment_repo.list_by_courier.side_effect = lambda cid: [dict(s) for s in self.shipments]
+        self.shipment_repo.get.side_effect = lambda sid: next(dict(s) for s in self.shipments if s["id"] == sid)
+
+        self.workday_repo = MagicMock()
+        self.workday_repo.get_active_workday.return_value = {"id": 1, "fecha_inicio": datetime(2024, 1, 1, 8)}
+
+        # Ruta: inicio -> paquete 12 -> paquete 10 -> paquete 11 -> almacén, 5 min por tramo
+        self.route_service = MagicMock()
+        self.route_service.calculate_optimized_route.side_effect = lambda pkgs, start=None: {
+            "waypoints_order": [0] + [1 + [p["id"] for p in pkgs].index(sid) for sid in (12, 10, 11) if sid in [p["id"] for p in pkgs]] + [len(pkgs) + 1],
+            "legs": [{"duration": 300}] * (len(pkgs) + 1),
+        }
+
+        self.clock = MagicMock()
+        self.clock.now.return_value = datetime(2024, 1, 1, 10)
+
+        self.cache = RouteCache()
+        self.planner = GenerateDeliveryRoute(self.shipment_repo, self.route_service, self.workday_repo, self.cache)
+        self.eta = CalculateETA(self.shipment_repo, self.route_service, self.clock, self.workday_repo,
+                                route_planner=self.planner)
+
+    def test_route_is_optimized_once_for_every_eta_lookup(self):
+        results = {}
+        for s in self.shipments:
+            for _ in range(3):
+                results[s["id"]] = self.eta.execute({"id": s["id_cliente"], "role": "CUSTOMER"}, s["id"])
+        self.planner.execute(2)
+
+        self.assertEqual(self.route_service.calculate_optimized_route.call_count, 1)
+        # 12 es la primera parada; 10 la segunda (+10 min de servicio); 11 la tercera
+        self.assertEqual(results[12]["eta_minutos"], 5)
+        self.assertEqual(results[10]["eta_minutos"], 20)
+        self.assertEqual(results[11]["eta_minutos"], 35)
+        self.assertEqual(self.cache.stats()["hits"], 9)
+
+    def test_changed_stops_miss_the_cache(self):
+        self.planner.execute(2)
+        self.shipments[0]["latitud"] = 42.65   # dirección corregida
+        self.planner.execute(2)
+
+        self.assertEqual(self.route_service.calculate_optimized_route.call_count, 2)
+
+    def test_delivery_marks_courier_route_stale(self):
+        self.planner.execute(2)
+        self.shipment_repo.set_status.return_value = {}
+        DeliverShipment(self.shipment_repo, self.clock, self.cache).execute({"id": 2, "role": "COURIER"}, 10)
+
+        # Se conserva como base para actualizarla, pero ya no se sirve tal cual
+        self.assertEqual(self.cache.stats()["size"], 1)
+        self.assertEqual(self.cache.stats()["invalidations"], 1)
+        self.assertIsNotNone(self.cache.peek(2))
+        self.planner.execute(2)
+        self.assertEqual(self.cache.stats()["hits"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
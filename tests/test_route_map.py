@@ -0,0 +1,74 @@
+import unittest
+import tempfile
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.route_service import RouteService
+from moval.services.route_map import RouteMapRenderer
+
+
+def packages(*lats):
+    return [{"id": i, "latitud": lat, "longitud": -5.56, "direccion": f"Calle {i}"} for i, lat in enumerate(lats)]
+
+
+def visit_order(route, pkgs):
+    return [pkgs[i - 1] for i in route["waypoints_order"] if 0 < i <= len(pkgs)]
+
+
+class TestRouteMapRenderer(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.renderer = RouteMapRenderer(output_dir=self.tmp.name)
+        self.service = RouteService(engine="local")
+
+    def tearDown(self):
+        self.renderer.shutdown()
+        self.tmp.cleanup()
+
+    def test_route_computation_writes_nothing(self):
+        route = self.service.calculate_optimized_route(packages(42.60, 42.61))
+
+        self.assertNotIn("map_path", route)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_same_route_reuses_the_file(self):
+        pkgs = packages(42.60, 42.61, 42.62)
+        route = self.service.calculate_optimized_route(pkgs)
+        stops = visit_order(route, pkgs)
+
+        first = self.renderer.render(route, stops, timeout=30)
+        second = self.renderer.render(route, stops, timeout=30)
+
+        self.assertEqual(first, second)
+        self.assertTrue(os.path.exists(first))
+        self.assertEqual(self.renderer.stats()["rendered"], 1)
+        self.assertEqual(self.renderer.stats()["reused"], 1)
+
+    def test_different_routes_get_different_files(self):
+        pkgs_a, pkgs_b = packages(42.60, 42.61), packages(42.60, 42.63)
+        route_a = self.service.calculate_optimized_route(pkgs_a)
+        route_b = self.service.calculate_optimized_route(pkgs_b)
+
+        path_a = self.renderer.render(route_a, visit_order(route_a, pkgs_a), timeout=30)
+        path_b = self.renderer.render(route_b, visit_order(route_b, pkgs_b), timeout=30)
+
+        self.assertNotEqual(path_a, path_b)
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), sorted([os.path.basename(path_a), os.path.basename(path_b)]))
+
+    def test_concurrent_requests_share_one_render(self):
+        pkgs = packages(42.60, 42.61)
+        route = self.service.calculate_optimized_route(pkgs)
+        stops = visit_order(route, pkgs)
+
+        futures = [self.renderer.request(route, stops) for _ in range(3)]
+        paths = {f.result(timeout=30) for f in futures}
+
+        self.assertEqual(len(paths), 1)
+        self.assertEqual(self.renderer.stats()["rendered"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
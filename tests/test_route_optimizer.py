@@ -0,0 +1,162 @@
+import unittest
+import itertools
+import random
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import numpy as np
+from moval.services.route_optimizer import haversine_matrix, solve_open_path, path_length, LocalRouteOptimizer
+from moval.services.route_service import RouteService
+from moval.services.http_client import CircuitOpenError
+from moval.services.geometry import encode_polyline
+
+
+def random_points(n, seed=1):
+    rnd = random.Random(seed)
+    return [(42.60 + rnd.uniform(-0.02, 0.02), -5.56 + rnd.uniform(-0.03, 0.03)) for _ in range(n)]
+
+
+class TestRouteOptimizer(unittest.TestCase):
+
+    def test_haversine_matrix(self):
+        # León -> Madrid (Puerta del Sol) ~ 285 km en línea recta
+        d = haversine_matrix([(42.5987, -5.5671), (40.4169, -3.7035)])
+        self.assertAlmostEqual(d[0, 1] / 1000, 285, delta=5)
+        self.assertEqual(d[0, 0], 0)
+        self.assertAlmostEqual(d[0, 1], d[1, 0])
+
+    def test_open_path_keeps_endpoints_and_visits_every_stop(self):
+        dist = haversine_matrix(random_points(60))
+        order = solve_open_path(dist)
+
+        self.assertEqual(order[0], 0)
+        self.assertEqual(order[-1], 59)
+        self.assertEqual(sorted(order), list(range(60)))
+
+    def test_matches_brute_force_on_small_instances(self):
+        for seed in range(5):
+            dist = haversine_matrix(random_points(8, seed))
+            best = min(
+                path_length(dist, [0, *perm, 7]) for perm in itertools.permutations(range(1, 7))
+            )
+            self.assertAlmostEqual(path_length(dist, solve_open_path(dist)), best, delta=best * 0.02)
+
+    def test_collinear_stops_are_visited_in_line(self):
+        points = [(42.0, -5.0)] + [(42.0 + i * 0.01, -5.0) for i in (4, 1, 3, 2)] + [(42.05, -5.0)]
+        order = LocalRouteOptimizer().solve(points)["order"]
+        self.assertEqual(order, [0, 2, 4, 3, 1, 5])
+
+    def test_solve_returns_trip_contract(self):
+        points = random_points(12)
+        trip = LocalRouteOptimizer(speed_kmh=36).solve(points)
+
+        self.assertEqual(len(trip["legs"]), len(points) - 1)
+        self.assertAlmostEqual(trip["distance"], sum(l["distance"] for l in trip["legs"]))
+        self.assertAlmostEqual(trip["duration"], trip["distance"] / 10)
+        self.assertEqual(len(trip["geometry"]["coordinates"]), len(points))
+
+
+class TestRouteServiceEngines(unittest.TestCase):
+
+    def setUp(self):
+        self.packages = [{"id": i, "latitud": lat, "longitud": lon, "direccion": f"Calle {i}"}
+                         for i, (lat, lon) in enumerate(random_points(5))]
+
+    def test_local_engine(self):
+        result = RouteService(engine="local").calculate_optimized_route(self.packages)
+
+        self.assertEqual(result["engine"], "local")
+        self.assertEqual(result["waypoints_order"][0], 0)
+        self.assertEqual(result["waypoints_order"][-1], len(self.packages) + 1)
+        self.assertEqual(len(result["legs"]), len(self.packages) + 1)
+
+    def test_falls_back_to_local_when_osrm_fails(self):
+        http = MagicMock()
+        http.get_json.side_effect = CircuitOpenError("osrm: servicio no disponible temporalmente")
+
+        result = RouteService(http_client=http).calculate_optimized_route(self.packages)
+
+        self.assertEqual(result["engine"], "local")
+        self.assertEqual(http.get_json.call_args[0][0], "osrm")
+
+    def test_osrm_waypoint_index_is_turned_into_visit_order(self):
+        # Entrada: inicio, p1, p2, almacén. OSRM visita inicio -> p2 -> p1 -> almacén
+        http = MagicMock()
+        http.get_json.return_value = {
+            "code": "Ok",
+            "waypoints": [{"waypoint_index": 0}, {"waypoint_index": 2}, {"waypoint_index": 1}, {"waypoint_index": 3}],
+            "trips": [{"geometry": {"coordinates": []}, "duration": 600, "distance": 5000,
+                       "legs": [{"duration": 200}, {"duration": 200}, {"duration": 200}]}],
+        }
+
+        result = RouteService(fallback=False, http_client=http).calculate_optimized_route(self.packages[:2])
+
+        self.assertEqual(result["waypoints_order"], [0, 2, 1, 3])
+        self.assertEqual(result["engine"], "osrm")
+
+
+def fake_osrm(endpoint, url, params=None):
+    """OSRM /trip y /route simulados: en /trip visita las paradas interiores en orden inverso."""
+    coords = [tuple(map(float, c.split(","))) for c in url.split("/driving/")[1].split(";")]
+    points = [(lat, lon) for lon, lat in coords]
+    n = len(points)
+    if "/route/" in url:
+        return {"code": "Ok", "routes": [{"geometry": encode_polyline(points, 6)}]}
+    position = [0] + [n - 1 - i for i in range(1, n - 1)] + [n - 1]
+    visit = sorted(range(n), key=lambda i: position[i])
+    return {
+        "code": "Ok",
+        "waypoints": [{"waypoint_index": position[i]} for i in range(n)],
+        "trips": [{"geometry": encode_polyline([points[i] for i in visit], 6),
+                   "duration": 60.0 * (n - 1), "distance": 500.0 * (n - 1),
+                   "legs": [{"duration": 60.0, "distance": 500.0}] * (n - 1)}],
+    }
+
+
+class TestChunkedRouting(unittest.TestCase):
+
+    def setUp(self):
+        self.packages = [{"id": i, "latitud": lat, "longitud": lon, "direccion": f"Calle {i}"}
+                         for i, (lat, lon) in enumerate(random_points(35, seed=3))]
+        self.http = MagicMock()
+        self.http.get_json.side_effect = fake_osrm
+        self.service = RouteService(fallback=False, http_client=self.http, max_waypoints=10)
+
+    def test_large_route_is_split_and_stitched(self):
+        result = self.service.calculate_optimized_route(self.packages)
+        n = len(self.packages) + 2
+
+        # 37 puntos en tramos de 10 que comparten el punto de unión: 4 peticiones
+        self.assertEqual(self.http.get_json.call_count, 4)
+        for call in self.http.get_json.call_args_list:
+            self.assertLessEqual(len(call[0][1].split("/driving/")[1].split(";")), 10)
+
+        order = result["waypoints_order"]
+        self.assertEqual(order[0], 0)
+        self.assertEqual(order[-1], n - 1)
+        self.assertEqual(sorted(order), list(range(n)))
+        self.assertEqual(len(result["legs"]), n - 1)
+        self.assertEqual(result["total_time_minutes"], n - 1)
+        self.assertEqual(len(result["geometry"]), n)
+        # La geometría sigue el orden de visita
+        np.testing.assert_allclose(result["geometry"].coords, [result["points"][i] for i in order], atol=1e-6)
+
+    def test_small_route_uses_a_single_trip(self):
+        self.service.calculate_optimized_route(self.packages[:8])
+        self.assertEqual(self.http.get_json.call_count, 1)
+
+    def test_road_geometry_is_fetched_in_chunks(self):
+        service = RouteService(engine="local", http_client=self.http, max_waypoints=10)
+        route = service.calculate_optimized_route(self.packages)
+
+        geometry = service.road_geometry(route)
+
+        self.assertEqual(self.http.get_json.call_count, 4)
+        np.testing.assert_allclose(geometry.coords, [route["points"][i] for i in route["waypoints_order"]], atol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
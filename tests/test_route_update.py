@@ -0,0 +1,131 @@
+import unittest
+from unittest.mock import MagicMock
+from datetime import datetime
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.services.route_cache import RouteCache
+from moval.services.route_service import RouteService
+from moval.services.route_update import remaining_route
+from moval.usecases.generate_delivery_route import GenerateDeliveryRoute
+from moval.usecases.deliver_shipment import DeliverShipment
+from moval.usecases.report_incident import ReportIncident
+
+
+def shipment(sid, lat, lon):
+    return {"id": sid, "id_cliente": 100 + sid, "id_mensajero": 2, "estado": "ASIGNADO",
+            "codigo_seguimiento": f"C{sid}", "direccion_destino": f"Calle {sid}",
+            "latitud": lat, "longitud": lon}
+
+
+class TestIncrementalRouteUpdate(unittest.TestCase):
+
+    def setUp(self):
+        self.shipments = [shipment(1, 42.600, -5.570), shipment(2, 42.595, -5.580), shipment(3, 42.590, -5.565),
+                          shipment(4, 42.605, -5.590), shipment(5, 42.585, -5.575)]
+        self.shipment_repo = MagicMock()
+        self.shipment_repo.list_by_courier.side_effect = lambda cid: [dict(s) for s in self.shipments]
+        self.shipment_repo.get.side_effect = lambda sid: next(dict(s) for s in self.shipments if s["id"] == sid)
+        self.shipment_repo.set_status.side_effect = self._set_status
+        self.shipment_repo.transaction.return_value.__enter__.return_value = None
+        self.shipment_repo.transaction.return_value.__exit__.return_value = False
+
+        self.workday_repo = MagicMock()
+        self.workday_repo.get_active_workday.return_value = {"id": 1, "fecha_inicio": datetime(2024, 1, 1, 8)}
+        self.clock = MagicMock()
+        self.clock.now.return_value = datetime(2024, 1, 1, 10)
+
+        self.route_service = RouteService(engine="local")
+        self.route_service.calculate_optimized_route = MagicMock(wraps=self.route_service.calculate_optimized_route)
+        self.route_service.leg_costs = MagicMock(wraps=self.route_service.leg_costs)
+        self.cache = RouteCache()
+        self.planner = GenerateDeliveryRoute(self.shipment_repo, self.route_service, self.workday_repo, self.cache)
+
+    def _set_status(self, shipment_id, status, delivered_at=None):
+        for s in self.shipments:
+            if s["id"] == shipment_id:
+                s["estado"] = status.value
+                s["fecha_entrega_real"] = delivered_at
+        return {}
+
+    def _deliver(self, sid):
+        DeliverShipment(self.shipment_repo, self.clock, self.cache).execute({"id": 2, "role": "COURIER"}, sid)
+
+    def test_delivering_in_order_reuses_every_leg(self):
+        first = self.planner.execute(2)
+        order = [s["id"] for s in first["ordered_shipments"]]
+
+        self._deliver(order[0])
+        updated = self.planner.execute(2)
+
+        self.assertEqual(self.route_service.calculate_optimized_route.call_count, 1)
+        self.route_service.leg_costs.assert_not_called()
+        self.assertEqual(updated["engine"], "incremental")
+        self.assertEqual([s["id"] for s in updated["ordered_shipments"]], order[1:])
+        self.assertEqual(updated["legs"], first["legs"][1:])
+        self.assertEqual(set(updated["stop_offsets"]), set(order[1:]))
+
+    def test_incident_in_the_middle_only_computes_the_bridging_leg(self):
+        first = self.planner.execute(2)
+        order = [s["id"] for s in first["ordered_shipments"]]
+        middle = order[2]
+
+        self.shipment_repo.update.side_effect = lambda shipment_id, fields: [
+            s.update(estado=fields["estado"]) for s in self.shipments if s["id"] == shipment_id]
+        ReportIncident(self.shipment_repo, MagicMock(), self.clock, self.cache).execute(
+            {"id": 2, "role": "COURIER"}, middle, "Portal cerrado")
+        updated = self.planner.execute(2)
+
+        self.assertEqual(self.route_service.calculate_optimized_route.call_count, 1)
+        self.assertEqual(self.route_service.leg_costs.call_count, 1)
+        self.assertEqual(len(self.route_service.leg_costs.call_args[0][0]), 1)
+        self.assertEqual([s["id"] for s in updated["ordered_shipments"]], [sid for sid in order if sid != middle])
+
+    def test_new_stop_triggers_full_optimization(self):
+        self.planner.execute(2)
+        self.cache.mark_stale(2)
+        self.shipments.append(shipment(6, 42.610, -5.560))
+
+        self.assertNotEqual(self.planner.execute(2)["engine"], "incremental")
+        self.assertEqual(self.route_service.calculate_optimized_route.call_count, 2)
+
+    def test_degraded_route_is_reoptimized(self):
+        # Plan: almacén -> A -> B -> almacén. El mensajero entrega B desde muy lejos de lo previsto
+        previous = {
+            "points": [(42.60, -5.57), (42.60, -5.56), (42.60, -5.55), (42.60, -5.57)],
+            "ordered_shipments": [{"id": 1, "latitud": 42.60, "longitud": -5.56},
+                                  {"id": 2, "latitud": 42.60, "longitud": -5.55}],
+            "legs": [{"duration": 100}, {"duration": 100}, {"duration": 200}],
+        }
+        packages = [{"id": 2, "latitud": 42.60, "longitud": -5.55}]
+        far = lambda pairs: [{"duration": 1000, "distance": 10000} for _ in pairs]
+        near = lambda pairs: [{"duration": 90, "distance": 900} for _ in pairs]
+
+        self.assertIsNone(remaining_route(previous, packages, (42.70, -5.40), far, max_degradation=0.15))
+        route = remaining_route(previous, packages, (42.60, -5.565), near, max_degradation=0.15)
+        self.assertEqual(route["waypoints_order"], [0, 1, 2])
+        self.assertLess(route["degradation"], 0)
+
+    def test_drift_accumulates_against_the_last_full_optimization(self):
+        # Plan completo: almacén -> 1 -> 2 -> almacén, 300 s. Cada actualización empeora un 12-14%
+        # respecto a la anterior, pero la segunda ya va un 28% por encima del plan completo
+        stops = [{"id": 1, "latitud": 42.60, "longitud": -5.56}, {"id": 2, "latitud": 42.60, "longitud": -5.55}]
+        full = {
+            "points": [(42.60, -5.57), (42.60, -5.56), (42.60, -5.55), (42.60, -5.57)],
+            "ordered_shipments": stops,
+            "legs": [{"duration": 100}, {"duration": 100}, {"duration": 100}],
+        }
+        leg = lambda seconds: (lambda pairs: [{"duration": seconds, "distance": 1000} for _ in pairs])
+
+        first = remaining_route(full, stops, (42.61, -5.57), leg(140), max_degradation=0.15)
+        self.assertAlmostEqual(first["degradation"], 40 / 300)
+        self.assertEqual(first["baseline_duration"], {1: 300, 2: 200})
+        first["ordered_shipments"] = stops
+
+        self.assertIsNone(remaining_route(first, stops, (42.62, -5.57), leg(185), max_degradation=0.15))
+
+
+if __name__ == '__main__':
+    unittest.main()
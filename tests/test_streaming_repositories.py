@@ -0,0 +1,102 @@
+import unittest
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import psycopg2.extensions
+from moval.persistence.connection_pool import ConnectionPool
+from moval.persistence.repositories import ShipmentRepo, RatingRepo
+
+
+class FakeNamedCursor:
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+        self.itersize = None
+        self.query = None
+
+    def __enter__(self): return self
+    def __exit__(self, *exc):
+        self.conn.closed_cursors += 1
+        return False
+
+    def execute(self, query, params=None):
+        self.query, self.params = query, params
+
+    def fetchall(self):
+        return list(self)
+
+    def __iter__(self):
+        for i in range(1, self.conn.rows + 1):
+            self.conn.fetched += 1
+            yield {"id": i}
+
+
+class FakeConnection:
+    def __init__(self, rows):
+        self.rows = rows
+        self.closed = 0
+        self.fetched = 0
+        self.closed_cursors = 0
+        self.cursors = []
+
+    def cursor(self, name=None, cursor_factory=None):
+        cursor = FakeNamedCursor(self, name)
+        self.cursors.append(cursor)
+        return cursor
+
+    def commit(self): pass
+    def rollback(self): pass
+    def get_transaction_status(self): return psycopg2.extensions.TRANSACTION_STATUS_IDLE
+    def close(self): self.closed = 1
+
+
+class TestStreamingRepositories(unittest.TestCase):
+
+    def setUp(self):
+        self.conn = FakeConnection(rows=10)
+        self.pool = ConnectionPool({"database": "stream_test"}, connect=lambda **kw: self.conn)
+
+    def repo(self, cls):
+        repo = cls({"database": "stream_test"})
+        repo._get_pool = lambda: self.pool
+        return repo
+
+    def test_iter_all_uses_server_side_cursor_with_itersize(self):
+        rows = list(self.repo(ShipmentRepo).iter_all(statuses=["ENTREGADO"], itersize=500))
+
+        self.assertEqual([r["id"] for r in rows], list(range(1, 11)))
+        cursor = self.conn.cursors[0]
+        self.assertTrue(cursor.name)
+        self.assertEqual(cursor.itersize, 500)
+        self.assertIn("ORDER BY p.id", cursor.query)
+        self.assertEqual(cursor.params, [["ENTREGADO"]])
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+    def test_rows_are_fetched_lazily_and_connection_released_on_close(self):
+        stream = self.repo(RatingRepo).iter_all()
+        next(stream)
+        next(stream)
+        self.assertEqual(self.conn.fetched, 2)
+        self.assertEqual(self.pool.stats()["in_use"], 1)
+
+        stream.close()
+
+        self.assertEqual(self.conn.closed_cursors, 1)
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+    def test_rating_pages_use_a_keyset_cursor(self):
+        after = ("2024-05-01 10:00:00", 42)
+        self.repo(RatingRepo).list_all(page_size=50, after=after)
+
+        cursor = self.conn.cursors[-1]
+        self.assertIsNone(cursor.name)
+        self.assertIn("WHERE (v.fecha, v.id) < (%s, %s)", cursor.query)
+        self.assertIn("ORDER BY v.fecha DESC, v.id DESC LIMIT %s", cursor.query)
+        self.assertEqual(cursor.params, ["2024-05-01 10:00:00", 42, 50])
+        self.assertEqual(self.pool.stats()["in_use"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
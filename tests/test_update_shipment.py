@@ -0,0 +1,65 @@
+import unittest
+from unittest.mock import MagicMock
+
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from moval.usecases.update_shipment import UpdateShipment
+from moval.usecases.errors import ValidationError, PermissionError
+
+
+class TestUpdateShipment(unittest.TestCase):
+
+    def setUp(self):
+        self.shipment_repo = MagicMock()
+        self.resolver = MagicMock()
+        self.route_cache = MagicMock()
+        self.usecase = UpdateShipment(self.shipment_repo, self.resolver, self.route_cache)
+        self.admin = {"id": 1, "role": "ADMIN"}
+
+    def test_corrected_address_of_failed_geocode_goes_back_to_pending(self):
+        self.shipment_repo.get.return_value = {
+            "id": 7, "estado": "REGISTRADO", "direccion_destino": "Calle Inventada 7, León",
+            "estado_geocodificacion": "FALLIDA", "id_mensajero": None}
+
+        self.usecase.execute(self.admin, 7, {"direccion_destino": "  Calle Ancha 7, León "})
+
+        fields = self.shipment_repo.update.call_args[0][1]
+        self.assertEqual(fields["direccion_destino"], "Calle Ancha 7, León")
+        self.assertEqual(fields["estado_geocodificacion"], "PENDIENTE")
+        self.assertEqual(fields["intentos_geocodificacion"], 0)
+        self.assertIsNone(fields["latitud"])
+        self.resolver.enqueue.assert_called_once_with(7)
+
+    def test_new_address_leaves_the_courier_route(self):
+        self.shipment_repo.get.return_value = {
+            "id": 8, "estado": "ASIGNADO", "direccion_destino": "Calle Ancha 3, León",
+            "estado_geocodificacion": "RESUELTA", "id_mensajero": 2}
+
+        self.usecase.execute(self.admin, 8, {"direccion_destino": "Plaza Mayor 1, León"})
+
+        self.resolver.enqueue.assert_called_once_with(8)
+        self.route_cache.invalidate_courier.assert_called_once_with(2)
+
+    def test_other_fields_keep_coordinates(self):
+        self.shipment_repo.get.return_value = {
+            "id": 9, "estado": "REGISTRADO", "direccion_destino": "Calle Ancha 3, León",
+            "estado_geocodificacion": "RESUELTA"}
+
+        self.usecase.execute(self.admin, 9, {"descripcion": "Libros", "direccion_destino": "Calle Ancha 3, León"})
+
+        self.shipment_repo.update.assert_called_once_with(
+            9, {"descripcion": "Libros", "direccion_destino": "Calle Ancha 3, León"})
+        self.resolver.enqueue.assert_not_called()
+
+    def test_rejects_empty_address_and_non_admins(self):
+        self.shipment_repo.get.return_value = {"id": 7, "estado": "REGISTRADO", "direccion_destino": "X"}
+        with self.assertRaises(ValidationError):
+            self.usecase.execute(self.admin, 7, {"direccion_destino": "   "})
+        with self.assertRaises(PermissionError):
+            self.usecase.execute({"id": 5, "role": "COURIER"}, 7, {"direccion_destino": "Y"})
+
+
+if __name__ == '__main__':
+    unittest.main()